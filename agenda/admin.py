@@ -1,16 +1,25 @@
 from django.contrib import admin
-from .models import Usuario, Agendamento, Servico, Disponibilidade, Barbearia
+from .models import (
+    Usuario, Agendamento, Servico, Disponibilidade, Barbearia, ResumoDiario, HorarioSemanal, ExcecaoHorario, Cep,
+)
 
 # ------------------------------
 # Barbearia
 # ------------------------------
 @admin.register(Barbearia)
 class BarbeariaAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'endereco', 'telefone', 'criado_em')
-    search_fields = ('nome', 'endereco', 'telefone')
+    list_display = ('nome', 'endereco', 'cidade', 'cep', 'telefone', 'criado_em')
+    search_fields = ('nome', 'endereco', 'cidade', 'cep', 'telefone')
     ordering = ('nome',)
 
 
+@admin.register(Cep)
+class CepAdmin(admin.ModelAdmin):
+    list_display = ('cep', 'cidade', 'uf', 'latitude', 'longitude')
+    list_filter = ('uf',)
+    search_fields = ('cep', 'cidade')
+
+
 # ------------------------------
 # Usuário
 # ------------------------------
@@ -42,6 +51,7 @@ class AgendamentoAdmin(admin.ModelAdmin):
     list_filter = ('barbeiro', 'barbearia', 'status', 'data')
     search_fields = ('cliente__username', 'barbeiro__username', 'servico__nome', 'barbearia__nome')
     ordering = ('-data',)
+    list_select_related = ('cliente', 'barbeiro', 'barbearia', 'servico__barbeiro', 'servico__barbearia')  # __str__ do serviço
 
 
 # ------------------------------
@@ -53,7 +63,38 @@ class DisponibilidadeAdmin(admin.ModelAdmin):
     list_filter = ('barbeiro', 'barbeiro__barbearia', 'dia')
     search_fields = ('barbeiro__username', 'barbeiro__barbearia__nome')
     ordering = ('-dia',)
+    list_select_related = ('barbeiro__barbearia',)
 
     def barbeiro_barbearia(self, obj):
         return obj.barbeiro.barbearia
     barbeiro_barbearia.short_description = 'Barbearia'
+
+
+# ------------------------------
+# Horários semanais e exceções
+# ------------------------------
+@admin.register(HorarioSemanal)
+class HorarioSemanalAdmin(admin.ModelAdmin):
+    list_display = ('barbeiro', 'dia_semana', 'hora_inicio', 'hora_fim', 'valido_de', 'valido_ate')
+    list_filter = ('barbeiro__barbearia', 'dia_semana')
+    search_fields = ('barbeiro__username',)
+    ordering = ('barbeiro', 'dia_semana', 'hora_inicio')
+
+
+@admin.register(ExcecaoHorario)
+class ExcecaoHorarioAdmin(admin.ModelAdmin):
+    list_display = ('barbeiro', 'dia', 'tipo', 'hora_inicio', 'hora_fim')
+    list_filter = ('tipo', 'barbeiro__barbearia', 'dia')
+    search_fields = ('barbeiro__username',)
+    ordering = ('-dia',)
+
+
+# ------------------------------
+# Resumo Diário
+# ------------------------------
+@admin.register(ResumoDiario)
+class ResumoDiarioAdmin(admin.ModelAdmin):
+    list_display = ('dia', 'barbearia', 'barbeiro', 'agendamentos', 'cancelamentos', 'faturamento', 'clientes')
+    list_filter = ('barbearia', 'dia')
+    search_fields = ('barbeiro__username', 'barbearia__nome')
+    ordering = ('-dia',)
@@ -0,0 +1,67 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .horarios import janelas_por_barbeiro
+from .models import Agendamento, Usuario
+
+
+class HorarioIndisponivel(Exception):
+    """O horário pedido está fora da disponibilidade ou já foi reservado."""
+
+
+def criar_agendamento(cliente, barbeiro, servico, data_hora):
+    """
+    Cria o agendamento verificando disponibilidade e conflito na mesma transação.
+
+    A linha do barbeiro é travada com SELECT ... FOR UPDATE, serializando as
+    reservas concorrentes do mesmo barbeiro no PostgreSQL. A constraint de
+    exclusão (ou os triggers no SQLite) da migração 0004 garante que nenhuma
+    sobreposição escape, mesmo fora deste caminho.
+    """
+    if timezone.is_naive(data_hora):
+        data_hora = timezone.make_aware(data_hora)
+    data_fim = data_hora + servico.duracao
+    dia = timezone.localdate(data_hora)
+
+    try:
+        with transaction.atomic():
+            barbeiro = Usuario.objects.select_for_update().get(pk=barbeiro.pk)
+
+            janelas = janelas_por_barbeiro([barbeiro.pk], dia, dia).get((barbeiro.pk, dia), [])
+            if not any(inicio <= data_hora and data_fim <= fim for inicio, fim in janelas):
+                raise HorarioIndisponivel("Horário não disponível.")
+
+            conflito = Agendamento.objects.ativos().filter(
+                barbeiro=barbeiro,
+                data__lt=data_fim,
+                data_fim__gt=data_hora,
+            ).exists()
+            if conflito:
+                raise HorarioIndisponivel("Esse horário já foi reservado.")
+
+            return Agendamento.objects.create(
+                cliente=cliente,
+                barbeiro=barbeiro,
+                barbearia_id=barbeiro.barbearia_id,
+                servico=servico,
+                data=data_hora,
+                status="ativo",
+            )
+    except IntegrityError:
+        raise HorarioIndisponivel("Esse horário já foi reservado.")
+
+
+def recalcular_termino(servico):
+    """
+    Ajusta data_fim dos agendamentos ativos e futuros do serviço à duração atual, em
+    um UPDATE. Se algum passar a se sobrepor a outro, a proteção da migração 0004
+    recusa o UPDATE inteiro e nada muda. Retorna quantos foram ajustados.
+    """
+    try:
+        with transaction.atomic():
+            return Agendamento.objects.ativos().filter(servico=servico, data__gte=timezone.now()).update(
+                data_fim=F("data") + servico.duracao
+            )
+    except IntegrityError:
+        raise HorarioIndisponivel("Com essa duração, agendamentos futuros deste serviço se sobreporiam.")
@@ -0,0 +1,53 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+TAMANHO_HASH = 20
+# Nomes gerados por ArmazenamentoPorConteudo e as variantes deles (ver agenda/imagens.py)
+NOME_POR_CONTEUDO = re.compile(rf"/[0-9a-f]{{{TAMANHO_HASH}}}(_\d+w)?\.\w+$")
+
+
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """
+    Grava cada upload com o hash SHA-256 do conteúdo no nome (logos/3f9a...c1.jpg).
+
+    Arquivos iguais viram um só e um nome nunca muda de conteúdo, então a mídia
+    pode ser servida como imutável (ver agenda/midia.py).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        nome = self.nome_por_conteudo(name, content)
+        if self.exists(nome):
+            return nome
+        return super().save(nome, content, max_length=max_length)
+
+    @staticmethod
+    def nome_por_conteudo(name, content):
+        sha = hashlib.sha256()
+        for bloco in content.chunks():
+            sha.update(bloco)
+        content.seek(0)
+        pasta, base = posixpath.split(name.replace("\\", "/"))
+        extensao = posixpath.splitext(base)[1].lower()
+        return posixpath.join(pasta, f"{sha.hexdigest()[:TAMANHO_HASH]}{extensao}")
+
+    def salvar_derivado(self, name, content):
+        """
+        Grava um arquivo derivado de outro (ex.: miniatura) exatamente em `name`,
+        substituindo o anterior; o nome já é estável porque vem do original.
+        """
+        if self.exists(name):
+            self.delete(name)
+        return super().save(name, content)
+
+
+def armazenamento_midia():
+    """Storage dos ImageField de uploads (callable para não fixar o caminho nas migrações)."""
+    return ArmazenamentoPorConteudo()
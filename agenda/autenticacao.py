@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .cache import PREFIXO
+from .models import Usuario
+
+# Colunas do request.user vindas do cache; as demais ficam adiadas e são
+# carregadas do banco juntas, numa consulta, no primeiro acesso
+CAMPOS_PROJECAO = ("id", "username", "tipo", "barbearia_id", "is_active", "is_staff", "is_superuser")
+# Na ordem de concrete_fields, como Model.from_db espera
+_ATRIBUTOS = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in CAMPOS_PROJECAO]
+_CARREGAR = [campo.name for campo in Usuario._meta.concrete_fields if campo.attname in CAMPOS_PROJECAO] + ["password"]
+
+
+def _chave(usuario_id):
+    return f"{PREFIXO}:usuario:{usuario_id}"
+
+
+def _projecao(usuario):
+    """O que vai para o cache: as colunas da projeção e o hash de sessão (HMAC da senha, não a senha)."""
+    return {
+        "valores": [getattr(usuario, atributo) for atributo in _ATRIBUTOS],
+        "hash_sessao": usuario.get_session_auth_hash(),
+    }
+
+
+def _montar(dados):
+    """
+    Usuario com as colunas da projeção e as demais adiadas. Só esta instância muda:
+    o hash de sessão vem do cache enquanto a senha não é lida, e o primeiro campo
+    adiado acessado traz os outros na mesma consulta. O modelo segue intacto.
+    """
+    usuario = Usuario.from_db(Usuario.objects.db, _ATRIBUTOS, dados["valores"])
+    hash_sessao = dados["hash_sessao"]
+
+    def get_session_auth_hash():
+        if "password" in usuario.get_deferred_fields():
+            return hash_sessao
+        return Usuario.get_session_auth_hash(usuario)
+
+    def refresh_from_db(using=None, fields=None, from_queryset=None):
+        if fields:
+            fields = {*fields, *usuario.get_deferred_fields()}
+        Usuario.refresh_from_db(usuario, using=using, fields=fields, from_queryset=from_queryset)
+
+    usuario.get_session_auth_hash = get_session_auth_hash
+    usuario.refresh_from_db = refresh_from_db
+    return usuario
+
+
+def esquecer(usuario_id):
+    cache.delete(_chave(usuario_id))
+
+
+class UsuarioEmCacheBackend(ModelBackend):
+    """
+    ModelBackend que monta o request.user a partir de uma projeção em cache (id,
+    username, tipo, barbearia_id e flags de acesso): as verificações de tipo e
+    barbearia das views não consultam o banco. Invalidada pelos sinais ao salvar.
+    """
+
+    def get_user(self, user_id):
+        dados = cache.get(_chave(user_id))
+        if dados is None:
+            usuario = Usuario.objects.only(*_CARREGAR).filter(pk=user_id).first()
+            if usuario is None:
+                return None
+            dados = _projecao(usuario)
+            cache.set(_chave(user_id), dados, settings.AGENDA_USUARIO_CACHE_SEGUNDOS)
+        usuario = _montar(dados)
+        return usuario if self.user_can_authenticate(usuario) else None
+
+    async def aget_user(self, user_id):
+        dados = await cache.aget(_chave(user_id))
+        if dados is None:
+            usuario = await Usuario.objects.only(*_CARREGAR).filter(pk=user_id).afirst()
+            if usuario is None:
+                return None
+            dados = _projecao(usuario)
+            await cache.aset(_chave(user_id), dados, settings.AGENDA_USUARIO_CACHE_SEGUNDOS)
+        usuario = _montar(dados)
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,132 @@
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+
+from .cache import invalidar
+from .models import Barbearia, Servico
+from .paginacao import (
+    Pagina, codificar_cursor_posicao, decodificar_cursor_posicao, paginar_por_nome,
+)
+
+# Índice FTS5 da coluna Barbearia.busca no SQLite (rowid = id da barbearia), criado na
+# migração 0009; no PostgreSQL a mesma coluna tem um índice GIN de trigramas
+TABELA_FTS = "agenda_barbearia_busca"
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços colapsados: "São  João" -> "sao joao"."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def termos(texto):
+    return re.findall(r"\w+", normalizar(texto))
+
+
+def documento(nome, endereco, cidade, servicos):
+    """Texto pesquisável de uma barbearia: nome, endereço, cidade e nomes dos serviços."""
+    partes = [nome, endereco, cidade, *sorted(set(servicos))]
+    return normalizar(" ".join(parte for parte in partes if parte))
+
+
+def _sincronizar_fts(documentos):
+    if connection.vendor != "sqlite" or not documentos:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABELA_FTS} WHERE rowid = %s", [(id_,) for id_ in documentos])
+        cursor.executemany(f"INSERT INTO {TABELA_FTS}(rowid, busca) VALUES (%s, %s)", list(documentos.items()))
+
+
+def indexar(*barbearia_ids):
+    """
+    Recalcula a coluna `busca` (e o FTS5, no SQLite) das barbearias dadas, gravando só
+    as que mudaram. Escreve com bulk_update, sem sinais: o cache da home é invalidado aqui.
+    """
+    ids = {barbearia_id for barbearia_id in barbearia_ids if barbearia_id}
+    if not ids:
+        return 0
+    servicos = {}
+    for barbearia_id, nome in Servico.objects.filter(barbearia_id__in=ids).values_list("barbearia_id", "nome"):
+        servicos.setdefault(barbearia_id, []).append(nome)
+    alterados = {}
+    linhas = Barbearia.objects.filter(id__in=ids).values_list("id", "nome", "endereco", "cidade", "busca")
+    for id_, nome, endereco, cidade, atual in linhas:
+        texto = documento(nome, endereco, cidade, servicos.get(id_, []))
+        if texto != atual:
+            alterados[id_] = texto
+    if alterados:
+        Barbearia.objects.bulk_update(
+            [Barbearia(id=id_, busca=texto) for id_, texto in alterados.items()], ["busca"], batch_size=500
+        )
+        _sincronizar_fts(alterados)
+        invalidar("barbearias")
+    return len(alterados)
+
+
+def desindexar(barbearia_id):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELA_FTS} WHERE rowid = %s", [barbearia_id])
+
+
+def reindexar(lote=500):
+    """Recalcula todas as barbearias e reconstrói o FTS5 a partir da coluna. Retorna quantas mudaram."""
+    ids = list(Barbearia.objects.order_by("id").values_list("id", flat=True))
+    alteradas = sum(indexar(*ids[i:i + lote]) for i in range(0, len(ids), lote))
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELA_FTS}")
+            cursor.execute(
+                f"INSERT INTO {TABELA_FTS}(rowid, busca) SELECT id, busca FROM {Barbearia._meta.db_table}"
+            )
+    return alteradas
+
+
+def _ranqueadas(palavras, inicio, quantidade):
+    """Barbearias com todos os termos (como prefixo no SQLite), da mais relevante para a menos."""
+    if connection.vendor == "sqlite":
+        # bm25 do FTS5; os termos só têm caracteres de palavra, então as aspas bastam
+        expressao = " ".join(f'"{palavra}"*' for palavra in palavras)
+        tabela = Barbearia._meta.db_table
+        return list(Barbearia.objects.raw(
+            f"SELECT {tabela}.* FROM {TABELA_FTS} JOIN {tabela} ON {tabela}.id = {TABELA_FTS}.rowid "
+            f"WHERE {TABELA_FTS} MATCH %s ORDER BY {TABELA_FTS}.rank, {tabela}.nome, {tabela}.id "
+            f"LIMIT %s OFFSET %s",
+            [expressao, quantidade, inicio],
+        ))
+
+    # LIKE '%termo%' sobre a coluna já normalizada usa o índice GIN de trigramas no PostgreSQL
+    consulta = Barbearia.objects.defer("busca").filter(*(Q(busca__contains=palavra) for palavra in palavras))
+    if connection.vendor == "postgresql":
+        relevancia = Func(Value(" ".join(palavras)), F("busca"), function="word_similarity", output_field=FloatField())
+        consulta = consulta.annotate(relevancia=relevancia).order_by("-relevancia", "nome", "id")
+    else:
+        consulta = consulta.order_by("nome", "id")
+    return list(consulta[inicio:inicio + quantidade])
+
+
+def buscar(texto="", cursor=None, tamanho=None):
+    """
+    Página de barbearias para a home. Com termos em `texto`, resultados ranqueados,
+    paginados por posição até AGENDA_BUSCA_MAX_RESULTADOS; sem termos, a lista em
+    ordem alfabética paginada por chave. Cada página custa uma consulta limitada.
+    """
+    tamanho = tamanho or settings.AGENDA_BARBEARIAS_POR_PAGINA
+    palavras = termos(texto)
+    if not palavras:
+        return paginar_por_nome(Barbearia.objects.defer("busca"), cursor, tamanho)
+
+    inicio = decodificar_cursor_posicao(cursor) if cursor else 0
+    restantes = settings.AGENDA_BUSCA_MAX_RESULTADOS - inicio
+    if restantes <= 0:
+        return Pagina([], None)
+    pedido = min(tamanho, restantes)
+    # Um item a mais só para saber se existe próxima página
+    itens = _ranqueadas(palavras, inicio, pedido + 1)
+    if len(itens) > pedido and restantes > pedido:
+        return Pagina(itens[:pedido], codificar_cursor_posicao(inicio + pedido))
+    return Pagina(itens[:pedido], None)
@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PREFIXO = "agenda"
+CHAVE_ACERTOS = f"{PREFIXO}:cache:acertos"
+CHAVE_FALHAS = f"{PREFIXO}:cache:falhas"
+
+
+def _chave_versao(escopo):
+    return f"{PREFIXO}:versao:{escopo}"
+
+
+def _incrementar(chave):
+    cache.add(chave, 0, None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Chave expulsa entre o add e o incr
+        cache.set(chave, 1, None)
+
+
+def versoes(escopos):
+    """
+    Versão atual de cada escopo ("barbearias", "barbearia:<id>").
+
+    A versão é um timestamp em nanossegundos: se a chave for expulsa do cache,
+    a nova versão nunca coincide com uma antiga, então nada velho é reaproveitado.
+    """
+    chaves = {escopo: _chave_versao(escopo) for escopo in escopos}
+    atuais = cache.get_many(chaves.values())
+    resultado = {}
+    for escopo, chave in chaves.items():
+        if chave not in atuais:
+            cache.add(chave, time.time_ns(), None)
+            atuais[chave] = cache.get(chave)
+        resultado[escopo] = atuais[chave]
+    return resultado
+
+
+def invalidar(*escopos):
+    """Troca a versão dos escopos; entradas antigas simplesmente deixam de ser lidas."""
+    cache.set_many({_chave_versao(escopo): time.time_ns() for escopo in escopos}, None)
+
+
+def obter(nome, escopos, construir, timeout=None):
+    """
+    Devolve o valor cacheado de `nome` para as versões atuais de `escopos`,
+    ou chama `construir()` e guarda o resultado.
+
+    Sem cache compartilhado (AGENDA_CACHE_COMPARTILHADO), só chama `construir()`.
+    """
+    if not settings.AGENDA_CACHE_COMPARTILHADO:
+        return construir()
+    atuais = versoes(escopos)
+    chave = ":".join([PREFIXO, nome] + [f"{escopo}@{atuais[escopo]}" for escopo in escopos])
+    valor = cache.get(chave)
+    if valor is not None:
+        _incrementar(CHAVE_ACERTOS)
+        return valor
+
+    _incrementar(CHAVE_FALHAS)
+    valor = construir()
+    cache.set(chave, valor, timeout if timeout is not None else settings.AGENDA_CACHE_SEGUNDOS)
+    return valor
+
+
+def estatisticas():
+    contadores = cache.get_many([CHAVE_ACERTOS, CHAVE_FALHAS])
+    acertos = contadores.get(CHAVE_ACERTOS, 0)
+    falhas = contadores.get(CHAVE_FALHAS, 0)
+    total = acertos + falhas
+    return {
+        "backend": settings.CACHES["default"]["BACKEND"],
+        "acertos": acertos,
+        "falhas": falhas,
+        "taxa_acerto": round(acertos / total, 4) if total else 0,
+    }
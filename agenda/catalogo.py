@@ -0,0 +1,88 @@
+from typing import Callable, NamedTuple
+
+from django.db.models import Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .armazenamento import armazenamento_midia
+
+
+class Campo(NamedTuple):
+    origem: object  # nome do campo no modelo ou expressão do ORM
+    converter: Callable | None = None
+
+
+_midia = armazenamento_midia()
+
+
+def _url_midia(nome):
+    return _midia.url(nome) if nome else None
+
+
+def _minutos(duracao):
+    return int(duracao.total_seconds() // 60) if duracao is not None else None
+
+
+# Campos públicos de cada recurso da API v1: nome na resposta -> origem no banco
+RECURSOS = {
+    "barbearias": {
+        "id": Campo("id"),
+        "nome": Campo("nome"),
+        "descricao": Campo("descricao"),
+        "endereco": Campo("endereco"),
+        "cidade": Campo("cidade"),
+        "cep": Campo("cep"),
+        "latitude": Campo("latitude"),
+        "longitude": Campo("longitude"),
+        "telefone": Campo("telefone"),
+        "logo": Campo("logo", _url_midia),
+        "criado_em": Campo("criado_em"),
+    },
+    "barbeiros": {
+        "id": Campo("id"),
+        "nome": Campo(Coalesce(NullIf("apelido", Value("")), NullIf("first_name", Value("")), "username")),
+        "foto": Campo("foto", _url_midia),
+    },
+    "servicos": {
+        "id": Campo("id"),
+        "nome": Campo("nome"),
+        "preco": Campo("preco", str),
+        "duracao_minutos": Campo("duracao", _minutos),
+        "barbeiro": Campo("barbeiro_id"),
+    },
+}
+
+
+def campos_pedidos(recurso, fields=None):
+    """
+    Nomes pedidos em ?fields=a,b (todos quando vazio), sempre com "id", que é a
+    chave do cursor. Levanta ValueError com os campos aceitos se algum não existir.
+    """
+    disponiveis = RECURSOS[recurso]
+    if not fields:
+        return list(disponiveis)
+    nomes = ["id"] + [nome.strip() for nome in fields.split(",") if nome.strip() and nome.strip() != "id"]
+    desconhecidos = [nome for nome in nomes if nome not in disponiveis]
+    if desconhecidos:
+        raise ValueError(
+            f"Campos desconhecidos: {', '.join(desconhecidos)}. Disponíveis: {', '.join(disponiveis)}."
+        )
+    return list(dict.fromkeys(nomes))
+
+
+def serializar(linhas, recurso, nomes):
+    """
+    Converte as tuplas de `selecionar` em dicionários prontos para JSON, sem
+    instanciar modelos.
+    """
+    campos = RECURSOS[recurso]
+    conversores = [campos[nome].converter for nome in nomes]
+    return [
+        {nome: converter(valor) if converter else valor for nome, converter, valor in zip(nomes, conversores, linha)}
+        for linha in linhas
+    ]
+
+
+def selecionar(consulta, recurso, nomes):
+    """values_list só com as colunas (ou expressões) dos campos pedidos, na ordem de `nomes`."""
+    campos = RECURSOS[recurso]
+    return consulta.values_list(*(campos[nome].origem for nome in nomes))
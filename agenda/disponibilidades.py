@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .cache import invalidar
+from .horarios import mesclar_intervalos
+from .models import Disponibilidade, Usuario
+
+
+def dias_selecionados(inicio, fim, dias_semana=None):
+    """Dias entre inicio e fim (inclusive), só nos dias da semana pedidos (0 = segunda)."""
+    dia = inicio
+    while dia <= fim:
+        if dias_semana is None or dia.weekday() in dias_semana:
+            yield dia
+        dia += timedelta(days=1)
+
+
+def _invalidar_cache(barbeiro):
+    # bulk_create e _raw_delete não disparam os sinais de invalidar_cache_disponibilidade
+    if barbeiro.barbearia_id:
+        invalidar(f"barbearia:{barbeiro.barbearia_id}")
+
+
+def gravar_em_lote(barbeiro, inicio, fim, dias_semana, janelas):
+    """
+    Cria as janelas (hora_inicio, hora_fim) em todos os dias selecionados do período.
+
+    As janelas de cada dia são mescladas com as já cadastradas: linhas que mudam
+    são removidas e o resultado é gravado com um único bulk_create, tudo na mesma
+    transação (com a linha do barbeiro travada, como em criar_agendamento).
+    Retorna (criadas, removidas).
+    """
+    dias = list(dias_selecionados(inicio, fim, dias_semana))
+    if not dias or not janelas:
+        return 0, 0
+
+    with transaction.atomic():
+        barbeiro = Usuario.objects.select_for_update().get(pk=barbeiro.pk)
+        existentes = {}
+        for disp in Disponibilidade.objects.filter(barbeiro=barbeiro, dia__in=dias):
+            existentes.setdefault(disp.dia, []).append(disp)
+
+        novas, obsoletas = [], []
+        for dia in dias:
+            atuais = existentes.get(dia, [])
+            mescladas = mesclar_intervalos(
+                [(d.hora_inicio, d.hora_fim) for d in atuais] + list(janelas)
+            )
+            # Linhas idênticas a uma janela mesclada ficam como estão
+            mantidas = set()
+            for disp in atuais:
+                chave = (disp.hora_inicio, disp.hora_fim)
+                if chave in mescladas and chave not in mantidas:
+                    mantidas.add(chave)
+                else:
+                    obsoletas.append(disp.pk)
+            novas += [
+                Disponibilidade(barbeiro=barbeiro, dia=dia, hora_inicio=hora_inicio, hora_fim=hora_fim)
+                for hora_inicio, hora_fim in mescladas
+                if (hora_inicio, hora_fim) not in mantidas
+            ]
+
+        removidas = 0
+        if obsoletas:
+            removidas = Disponibilidade.objects.filter(pk__in=obsoletas)._raw_delete(Disponibilidade.objects.db)
+        Disponibilidade.objects.bulk_create(novas)
+    _invalidar_cache(barbeiro)
+    return len(novas), removidas
+
+
+def remover_em_lote(barbeiro, inicio, fim, dias_semana=None):
+    """
+    Remove as disponibilidades do período (opcionalmente só em alguns dias da semana)
+    com um único DELETE. Retorna quantas linhas saíram.
+    """
+    consulta = Disponibilidade.objects.filter(barbeiro=barbeiro, dia__range=(inicio, fim))
+    if dias_semana is not None:
+        # __week_day do Django: 1 = domingo ... 7 = sábado
+        consulta = consulta.filter(dia__week_day__in=[(d + 1) % 7 + 1 for d in dias_semana])
+    # delete() buscaria cada linha para disparar post_delete; o cache é invalidado abaixo
+    removidas = consulta._raw_delete(consulta.db)
+    _invalidar_cache(barbeiro)
+    return removidas
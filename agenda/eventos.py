@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class MemoriaBackend:
+    """
+    Pub/sub dentro do processo: cada assinante recebe uma asyncio.Queue.
+
+    `publicar` pode ser chamado de código síncrono em qualquer thread; a
+    mensagem é entregue no event loop de cada assinante.
+    """
+
+    def __init__(self):
+        self._assinantes = defaultdict(set)
+        self._trava = threading.Lock()
+
+    def publicar(self, canal, mensagem):
+        with self._trava:
+            assinantes = list(self._assinantes.get(canal, ()))
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(fila.put_nowait, mensagem)
+            except RuntimeError:
+                # Event loop já encerrado: o assinante sai no próximo ciclo
+                pass
+
+    @asynccontextmanager
+    async def assinar(self, canal):
+        fila = asyncio.Queue()
+        assinante = (asyncio.get_running_loop(), fila)
+        with self._trava:
+            self._assinantes[canal].add(assinante)
+        try:
+            yield fila
+        finally:
+            with self._trava:
+                self._assinantes[canal].discard(assinante)
+                if not self._assinantes[canal]:
+                    del self._assinantes[canal]
+
+
+class RedisBackend:
+    """Pub/sub via Redis (ou compatível), para vários workers/processos. Requer o pacote `redis`."""
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.AGENDA_EVENTOS_URL
+        self._cliente = redis.Redis.from_url(self.url)
+
+    def publicar(self, canal, mensagem):
+        self._cliente.publish(canal, json.dumps(mensagem))
+
+    @asynccontextmanager
+    async def assinar(self, canal):
+        import redis.asyncio
+
+        cliente = redis.asyncio.Redis.from_url(self.url)
+        pubsub = cliente.pubsub()
+        await pubsub.subscribe(canal)
+        fila = asyncio.Queue()
+
+        async def ler():
+            async for item in pubsub.listen():
+                if item["type"] == "message":
+                    fila.put_nowait(json.loads(item["data"]))
+
+        tarefa = asyncio.create_task(ler())
+        try:
+            yield fila
+        finally:
+            tarefa.cancel()
+            await pubsub.unsubscribe(canal)
+            await pubsub.aclose()
+            await cliente.aclose()
+
+
+@lru_cache(maxsize=None)
+def backend():
+    """Instância única do backend configurado em settings.AGENDA_EVENTOS_BACKEND."""
+    return import_string(settings.AGENDA_EVENTOS_BACKEND)()
+
+
+def canal_notificacoes(usuario_id):
+    return f"notificacoes:{usuario_id}"
+
+
+def publicar(canal, mensagem):
+    backend().publicar(canal, mensagem)
+
+
+def assinar(canal):
+    return backend().assinar(canal)
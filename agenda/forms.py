@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Usuario, Servico, Agendamento, Disponibilidade, Barbearia
+from .geo import normalizar_cep
+from .models import Usuario, Servico, Agendamento, Disponibilidade, Barbearia, HorarioSemanal, ExcecaoHorario
 
 # ------------------------------
 # Registro de Clientes
@@ -132,15 +133,26 @@ class RegistroAdminBarbeariaForm(UserCreationForm):
 class BarbeariaForm(forms.ModelForm):
     class Meta:
         model = Barbearia
-        fields = ['nome', 'endereco', 'telefone', 'descricao', 'logo']
+        fields = ['nome', 'endereco', 'cidade', 'cep', 'telefone', 'descricao', 'logo']
         widgets = {
             'nome': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Digite o nome da barbearia'}),
-            'endereco': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Rua, número, bairro, cidade'}),
+            'endereco': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Rua, número, bairro'}),
+            'cidade': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Cidade'}),
+            'cep': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '00000-000'}),
             'telefone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '(XX) XXXX-XXXX'}),
             'descricao': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Breve descrição da barbearia', 'rows': 3}),
             'logo': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
+    def clean_cep(self):
+        cep = self.cleaned_data.get("cep")
+        if not cep:
+            return cep
+        digitos = normalizar_cep(cep)
+        if not digitos:
+            raise forms.ValidationError("Informe um CEP com 8 dígitos.")
+        return f"{digitos[:5]}-{digitos[5:]}"
+
 
 # ------------------------------
 # Serviços
@@ -170,6 +182,105 @@ class DisponibilidadeForm(forms.ModelForm):
         }
 
 
+# ------------------------------
+# Disponibilidade em lote
+# ------------------------------
+class PeriodoDisponibilidadeForm(forms.Form):
+    """Período e dias da semana de uma operação em lote; sem dias marcados vale a semana toda."""
+    MAX_DIAS = 366
+
+    inicio = forms.DateField(label="De", widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}))
+    fim = forms.DateField(label="Até", widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}))
+    dias_semana = forms.TypedMultipleChoiceField(
+        label="Dias da semana",
+        choices=HorarioSemanal.DIAS_SEMANA,
+        coerce=int,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    def clean(self):
+        dados = super().clean()
+        inicio, fim = dados.get("inicio"), dados.get("fim")
+        if inicio and fim:
+            if fim < inicio:
+                self.add_error("fim", "A data final deve ser igual ou posterior à inicial.")
+            elif (fim - inicio).days >= self.MAX_DIAS:
+                self.add_error("fim", f"O período pode ter no máximo {self.MAX_DIAS} dias.")
+        dados["dias_semana"] = set(dados.get("dias_semana") or []) or None
+        return dados
+
+
+class DisponibilidadeLoteForm(PeriodoDisponibilidadeForm):
+    janelas = forms.CharField(
+        label="Horários",
+        widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "09:00-12:00, 14:00-18:00"}),
+    )
+
+    def clean_janelas(self):
+        """Converte "HH:MM-HH:MM, ..." em pares (inicio, fim) de time."""
+        campo = forms.TimeField()
+        janelas = []
+        for trecho in self.cleaned_data["janelas"].split(","):
+            partes = trecho.split("-")
+            if len(partes) != 2:
+                raise forms.ValidationError(f"Horário inválido: {trecho.strip()!r}. Use HH:MM-HH:MM.")
+            inicio, fim = (campo.clean(parte.strip()) for parte in partes)
+            if fim <= inicio:
+                raise forms.ValidationError(f"Em {trecho.strip()!r} o término deve ser depois do início.")
+            janelas.append((inicio, fim))
+        return janelas
+
+
+# ------------------------------
+# Horário Semanal
+# ------------------------------
+class HorarioSemanalForm(forms.ModelForm):
+    class Meta:
+        model = HorarioSemanal
+        fields = ["dia_semana", "hora_inicio", "hora_fim", "valido_de", "valido_ate"]
+        widgets = {
+            "dia_semana": forms.Select(attrs={"class": "form-control"}),
+            "hora_inicio": forms.TimeInput(attrs={"type": "time", "class": "form-control"}),
+            "hora_fim": forms.TimeInput(attrs={"type": "time", "class": "form-control"}),
+            "valido_de": forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+            "valido_ate": forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+        }
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get("hora_inicio") and dados.get("hora_fim") and dados["hora_fim"] <= dados["hora_inicio"]:
+            self.add_error("hora_fim", "O término deve ser depois do início.")
+        if dados.get("valido_de") and dados.get("valido_ate") and dados["valido_ate"] < dados["valido_de"]:
+            self.add_error("valido_ate", "A data final deve ser igual ou posterior à inicial.")
+        return dados
+
+
+# ------------------------------
+# Exceção de Horário
+# ------------------------------
+class ExcecaoHorarioForm(forms.ModelForm):
+    class Meta:
+        model = ExcecaoHorario
+        fields = ["dia", "tipo", "hora_inicio", "hora_fim"]
+        widgets = {
+            "dia": forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+            "tipo": forms.Select(attrs={"class": "form-control"}),
+            "hora_inicio": forms.TimeInput(attrs={"type": "time", "class": "form-control"}),
+            "hora_fim": forms.TimeInput(attrs={"type": "time", "class": "form-control"}),
+        }
+
+    def clean(self):
+        """Horário extra exige início e fim; folga sem horários vale para o dia inteiro."""
+        dados = super().clean()
+        inicio, fim = dados.get("hora_inicio"), dados.get("hora_fim")
+        if bool(inicio) != bool(fim) or (dados.get("tipo") == "extra" and not inicio):
+            raise forms.ValidationError("Informe início e término.")
+        if inicio and fim and fim <= inicio:
+            self.add_error("hora_fim", "O término deve ser depois do início.")
+        return dados
+
+
 # ------------------------------
 # Agendamento
 # ------------------------------
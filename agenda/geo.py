@@ -0,0 +1,138 @@
+import heapq
+import math
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+from .cache import invalidar
+from .models import Barbearia, Cep
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def normalizar_cep(texto):
+    """Só os dígitos do CEP ("01310-100" -> "01310100"); None se não forem 8."""
+    digitos = re.sub(r"\D", "", texto or "")
+    return digitos if len(digitos) == 8 else None
+
+
+def geocodificar(cep):
+    """
+    Ponto do CEP na base local (importar_ceps), sem serviço externo. Sem o CEP exato,
+    usa o primeiro do mesmo setor (5 primeiros dígitos). None se nada for encontrado.
+    """
+    digitos = normalizar_cep(cep)
+    if not digitos:
+        return None
+    return (
+        Cep.objects.filter(cep=digitos).first()
+        or Cep.objects.filter(cep__startswith=digitos[:5]).order_by("cep").first()
+    )
+
+
+def aplicar_cep(barbearia):
+    """Preenche latitude/longitude (e a cidade, se vazia) a partir do CEP; limpa se não achar."""
+    ponto = geocodificar(barbearia.cep)
+    barbearia.latitude = ponto.latitude if ponto else None
+    barbearia.longitude = ponto.longitude if ponto else None
+    if ponto and ponto.cidade and not barbearia.cidade:
+        barbearia.cidade = ponto.cidade
+
+
+def geocodificar_pendentes():
+    """Geocodifica as barbearias com CEP e sem coordenadas (após importar a base). Retorna quantas."""
+    pendentes = list(
+        Barbearia.objects.filter(latitude__isnull=True).exclude(cep__isnull=True).exclude(cep="")
+        .only("id", "cep", "cidade")
+    )
+    for barbearia in pendentes:
+        aplicar_cep(barbearia)
+    encontradas = [barbearia for barbearia in pendentes if barbearia.latitude is not None]
+    # bulk_update não dispara sinais: invalida o cache aqui
+    Barbearia.objects.bulk_update(encontradas, ["latitude", "longitude", "cidade"], batch_size=500)
+    if encontradas:
+        invalidar("barbearias", *(f"barbearia:{barbearia.id}" for barbearia in encontradas))
+    return len(encontradas)
+
+
+def coordenadas(dados):
+    """(lat, lon) de ?lat=&lon=; None sem nenhum dos dois, ValueError se inválidos."""
+    if not dados.get("lat") and not dados.get("lon"):
+        return None
+    try:
+        latitude, longitude = float(dados["lat"]), float(dados["lon"])
+    except (KeyError, ValueError) as e:
+        raise ValueError("Informe lat e lon em graus decimais.") from e
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Coordenadas fora do intervalo.")
+    return latitude, longitude
+
+
+def raio_km(dados):
+    """?raio= em km, limitado a AGENDA_PROXIMIDADE_RAIO_MAX_KM."""
+    try:
+        raio = float(dados.get("raio") or settings.AGENDA_PROXIMIDADE_RAIO_KM)
+    except ValueError:
+        raio = 0
+    if not 0 < raio <= settings.AGENDA_PROXIMIDADE_RAIO_MAX_KM:
+        raise ValueError(f"raio deve estar entre 0 e {settings.AGENDA_PROXIMIDADE_RAIO_MAX_KM} km.")
+    return raio
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    dfi, dlambda = fi2 - fi1, math.radians(lon2 - lon1)
+    a = math.sin(dfi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _caixa(latitude, longitude, raio):
+    """Filtro do retângulo que contém o círculo de `raio` km (usa o índice em latitude, longitude)."""
+    angulo = raio / RAIO_TERRA_KM
+    dlat = math.degrees(angulo)
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat <= math.sin(angulo) else math.degrees(math.asin(math.sin(angulo) / cos_lat))
+    filtro = Q(latitude__range=(latitude - dlat, latitude + dlat))
+    oeste, leste = longitude - dlon, longitude + dlon
+    if dlon >= 180:
+        return filtro & Q(longitude__isnull=False)
+    if oeste < -180:
+        return filtro & (Q(longitude__gte=oeste + 360) | Q(longitude__lte=leste))
+    if leste > 180:
+        return filtro & (Q(longitude__gte=oeste) | Q(longitude__lte=leste - 360))
+    return filtro & Q(longitude__range=(oeste, leste))
+
+
+def candidatos(latitude, longitude, raio):
+    """(id, lat, lon) das barbearias dentro do retângulo; só colunas do índice e a chave."""
+    # Sem o ordering padrão (nome): a ordem é dada pela distância, em Python
+    return (
+        Barbearia.objects.filter(_caixa(latitude, longitude, raio))
+        .order_by().values_list("id", "latitude", "longitude")
+    )
+
+
+def proximas(latitude, longitude, raio=None, limite=None):
+    """
+    [(id, distância em km), ...] das barbearias a até `raio` km, da mais próxima para a
+    mais distante. Uma consulta: o retângulo pré-filtra pelo índice e só os candidatos
+    têm a distância exata (haversine) calculada.
+    """
+    raio = raio or settings.AGENDA_PROXIMIDADE_RAIO_KM
+    limite = limite or settings.AGENDA_BARBEARIAS_POR_PAGINA
+    linhas = candidatos(latitude, longitude, raio)
+    distancias = ((haversine_km(latitude, longitude, lat, lon), id_) for id_, lat, lon in linhas)
+    return [(id_, distancia) for distancia, id_ in heapq.nsmallest(limite, (d for d in distancias if d[0] <= raio))]
+
+
+def barbearias_proximas(latitude, longitude, raio=None, limite=None):
+    """As barbearias de `proximas`, em ordem, com o atributo distancia_km."""
+    ranking = proximas(latitude, longitude, raio, limite)
+    por_id = Barbearia.objects.defer("busca").in_bulk([id_ for id_, _ in ranking])
+    resultado = []
+    for id_, distancia in ranking:
+        if id_ in por_id:
+            por_id[id_].distancia_km = distancia
+            resultado.append(por_id[id_])
+    return resultado
@@ -0,0 +1,232 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Agendamento, Disponibilidade, ExcecaoHorario, HorarioSemanal
+
+
+def intervalo_padrao():
+    """Granularidade dos horários ofertados (settings.AGENDA_INTERVALO_MINUTOS, padrão 30)."""
+    return timedelta(minutes=getattr(settings, "AGENDA_INTERVALO_MINUTOS", 30))
+
+
+def _aware(dt):
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def mesclar_intervalos(intervalos):
+    """Ordena e une intervalos (inicio, fim) sobrepostos ou encostados."""
+    mesclados = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            if fim > mesclados[-1][1]:
+                mesclados[-1][1] = fim
+        else:
+            mesclados.append([inicio, fim])
+    return [(inicio, fim) for inicio, fim in mesclados]
+
+
+def varrer_horarios(janelas, ocupados, duracao, intervalo):
+    """
+    Calcula os inícios livres em cada janela de disponibilidade.
+
+    `janelas` e `ocupados` são listas de (inicio, fim) em datetime; `ocupados`
+    é mesclado e percorrido uma única vez por janela, então agendamentos que
+    começam antes do horário candidato também bloqueiam o horário.
+    """
+    ocupados = mesclar_intervalos(ocupados)
+    fins = [fim for _, fim in ocupados]
+    livres = []
+    for janela_inicio, janela_fim in sorted(janelas):
+        hora_atual = janela_inicio
+        # Primeiro bloco que ainda não terminou no início da janela
+        i = bisect_right(fins, hora_atual)
+        while hora_atual + duracao <= janela_fim:
+            fim_candidato = hora_atual + duracao
+            # Descarta blocos que já terminaram antes do candidato
+            while i < len(ocupados) and ocupados[i][1] <= hora_atual:
+                i += 1
+            if i < len(ocupados) and ocupados[i][0] < fim_candidato:
+                # Conflito: salta direto para o primeiro passo após o fim do bloco
+                passos = -(-(ocupados[i][1] - janela_inicio) // intervalo)
+                hora_atual = janela_inicio + passos * intervalo
+                continue
+            livres.append(hora_atual)
+            hora_atual += intervalo
+    return livres
+
+
+def janela(dia, hora_inicio, hora_fim):
+    """Intervalo (inicio, fim) aware de uma janela de disponibilidade."""
+    return (_aware(datetime.combine(dia, hora_inicio)), _aware(datetime.combine(dia, hora_fim)))
+
+
+def subtrair_intervalo(janelas, bloqueio):
+    """Remove o intervalo `bloqueio` de cada janela (inicio, fim), partindo-a quando preciso."""
+    bloqueio_inicio, bloqueio_fim = bloqueio
+    restantes = []
+    for inicio, fim in janelas:
+        if bloqueio_fim <= inicio or bloqueio_inicio >= fim:
+            restantes.append((inicio, fim))
+            continue
+        if inicio < bloqueio_inicio:
+            restantes.append((inicio, bloqueio_inicio))
+        if bloqueio_fim < fim:
+            restantes.append((bloqueio_fim, fim))
+    return restantes
+
+
+def dias_da_semana(dia_semana, inicio, fim):
+    """Datas entre `inicio` e `fim` (inclusivas) que caem no dia da semana (0 = segunda)."""
+    dia = inicio + timedelta(days=(dia_semana - inicio.weekday()) % 7)
+    while dia <= fim:
+        yield dia
+        dia += timedelta(days=7)
+
+
+def _consultas_janelas(barbeiro_ids, inicio, fim):
+    """As três consultas de janelas_por_barbeiro: disponibilidades, horários semanais e exceções."""
+    disponibilidades = (
+        Disponibilidade.objects.filter(barbeiro_id__in=barbeiro_ids, dia__range=(inicio, fim))
+        .order_by()
+        .values_list("barbeiro_id", "dia", "hora_inicio", "hora_fim")
+    )
+    semanais = (
+        HorarioSemanal.objects.filter(barbeiro_id__in=barbeiro_ids, valido_de__lte=fim)
+        .filter(Q(valido_ate__isnull=True) | Q(valido_ate__gte=inicio))
+        .order_by()
+        .values_list("barbeiro_id", "dia_semana", "hora_inicio", "hora_fim", "valido_de", "valido_ate")
+    )
+    excecoes = (
+        ExcecaoHorario.objects.filter(barbeiro_id__in=barbeiro_ids, dia__range=(inicio, fim))
+        .order_by()
+        .values_list("barbeiro_id", "dia", "tipo", "hora_inicio", "hora_fim")
+    )
+    return disponibilidades, semanais, excecoes
+
+
+def _montar_janelas(inicio, fim, disponibilidades, semanais, excecoes):
+    janelas = defaultdict(list)
+    for barbeiro_id, dia, hora_inicio, hora_fim in disponibilidades:
+        janelas[barbeiro_id, dia].append(janela(dia, hora_inicio, hora_fim))
+
+    for barbeiro_id, dia_semana, hora_inicio, hora_fim, valido_de, valido_ate in semanais:
+        for dia in dias_da_semana(dia_semana, max(inicio, valido_de), min(fim, valido_ate or fim)):
+            janelas[barbeiro_id, dia].append(janela(dia, hora_inicio, hora_fim))
+
+    folgas = []
+    for barbeiro_id, dia, tipo, hora_inicio, hora_fim in excecoes:
+        if tipo == "folga":
+            folgas.append((barbeiro_id, dia, hora_inicio, hora_fim))
+        elif hora_inicio and hora_fim:
+            janelas[barbeiro_id, dia].append(janela(dia, hora_inicio, hora_fim))
+
+    # Folgas valem sobre tudo, inclusive horários extras do mesmo dia
+    for barbeiro_id, dia, hora_inicio, hora_fim in folgas:
+        chave = (barbeiro_id, dia)
+        if chave not in janelas:
+            continue
+        if hora_inicio and hora_fim:
+            janelas[chave] = subtrair_intervalo(janelas[chave], janela(dia, hora_inicio, hora_fim))
+        else:
+            del janelas[chave]
+
+    return {chave: mesclar_intervalos(lista) for chave, lista in janelas.items() if lista}
+
+
+def janelas_por_barbeiro(barbeiro_ids, inicio, fim):
+    """
+    Janelas de atendimento {(barbeiro_id, dia): [(inicio, fim), ...]} entre as datas
+    `inicio` e `fim` (inclusivas).
+
+    Junta as disponibilidades avulsas, os horários semanais (expandidos apenas para
+    os dias pedidos) e os horários extras, e depois retira as folgas. São três
+    consultas, não importa por quanto tempo os horários semanais valham.
+    """
+    consultas = _consultas_janelas(barbeiro_ids, inicio, fim)
+    return _montar_janelas(inicio, fim, *(list(consulta) for consulta in consultas))
+
+
+async def ajanelas_por_barbeiro(barbeiro_ids, inicio, fim):
+    """Versão assíncrona de janelas_por_barbeiro (ORM assíncrono, mesmas três consultas)."""
+    consultas = _consultas_janelas(barbeiro_ids, inicio, fim)
+    linhas = [[linha async for linha in consulta] for consulta in consultas]
+    return _montar_janelas(inicio, fim, *linhas)
+
+
+def consulta_ocupados(janelas):
+    """
+    Agendamentos ativos que tocam as janelas, inclusive os iniciados antes delas:
+    a mesma sobreposição de intervalos da proteção contra conflitos, sobre data_fim.
+    """
+    inicio_periodo = min(i for lista in janelas.values() for i, _ in lista)
+    fim_periodo = max(f for lista in janelas.values() for _, f in lista)
+    return (
+        Agendamento.objects.ativos().filter(
+            barbeiro_id__in={barbeiro_id for barbeiro_id, _ in janelas},
+            data__lt=fim_periodo,
+            data_fim__gt=inicio_periodo,
+        )
+        .order_by()
+        .values_list("barbeiro_id", "data", "data_fim")
+    )
+
+
+def _varrer_barbeiros(janelas, agendamentos, duracao, intervalo):
+    ocupados = defaultdict(list)
+    for barbeiro_id, data, data_fim in agendamentos:
+        ocupados[barbeiro_id].append((data, data_fim))
+
+    resultado = defaultdict(dict)
+    for (barbeiro_id, dia), janelas_dia in janelas.items():
+        livres = varrer_horarios(janelas_dia, ocupados[barbeiro_id], duracao, intervalo)
+        resultado[barbeiro_id][dia] = sorted(set(livres))
+    return dict(resultado)
+
+
+def livres_por_barbeiro(barbeiro_ids, inicio, fim, duracao, intervalo=None):
+    """
+    Horários livres de vários barbeiros entre as datas `inicio` e `fim` (inclusivas).
+
+    Retorna {barbeiro_id: {dia: [datetime, ...]}} com quatro consultas (três das
+    janelas e uma dos agendamentos), independentemente do número de barbeiros e de dias.
+    """
+    janelas = janelas_por_barbeiro(barbeiro_ids, inicio, fim)
+    if not janelas:
+        return {}
+    agendamentos = list(consulta_ocupados(janelas))
+    return _varrer_barbeiros(janelas, agendamentos, duracao, intervalo or intervalo_padrao())
+
+
+async def alivres_por_barbeiro(barbeiro_ids, inicio, fim, duracao, intervalo=None):
+    """Versão assíncrona de livres_por_barbeiro, para as views sob ASGI."""
+    janelas = await ajanelas_por_barbeiro(barbeiro_ids, inicio, fim)
+    if not janelas:
+        return {}
+    agendamentos = [linha async for linha in consulta_ocupados(janelas)]
+    return _varrer_barbeiros(janelas, agendamentos, duracao, intervalo or intervalo_padrao())
+
+
+def formatar_horarios(horarios):
+    return [timezone.localtime(h).strftime("%H:%M") for h in horarios]
+
+
+def horarios_livres(barbeiro, dia, duracao, intervalo=None):
+    """
+    Horários livres ("HH:MM") do barbeiro no dia para um serviço de `duracao`.
+
+    Consulta as janelas do dia (disponibilidades, horários semanais e exceções)
+    e os agendamentos ativos que podem tocar essas janelas.
+    """
+    livres = livres_por_barbeiro([barbeiro.pk], dia, dia, duracao, intervalo)
+    return formatar_horarios(livres.get(barbeiro.pk, {}).get(dia, []))
+
+
+async def ahorarios_livres(barbeiro, dia, duracao, intervalo=None):
+    """Versão assíncrona de horarios_livres."""
+    livres = await alivres_por_barbeiro([barbeiro.pk], dia, dia, duracao, intervalo)
+    return formatar_horarios(livres.get(barbeiro.pk, {}).get(dia, []))
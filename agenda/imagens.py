@@ -0,0 +1,133 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+def formato_fallback(nome):
+    """Formato das miniaturas para navegadores sem WebP: PNG só quando o original é PNG (transparência)."""
+    return "png" if nome.lower().endswith(".png") else "jpg"
+
+
+def nome_variante(nome, largura, extensao):
+    """logos/marca.jpg -> logos/marca_320w.webp; as variantes ficam ao lado do original."""
+    raiz, _ = os.path.splitext(nome)
+    return f"{raiz}_{largura}w.{extensao}"
+
+
+def _abrir(arquivo):
+    imagem = Image.open(arquivo)
+    # Aplica a rotação do EXIF antes de descartá-lo
+    return ImageOps.exif_transpose(imagem)
+
+
+def _codificar(imagem, extensao):
+    """Salva sem metadados (EXIF, ICC, XMP): o Pillow só grava o que recebe explicitamente."""
+    saida = BytesIO()
+    qualidade = settings.AGENDA_IMAGEM_QUALIDADE
+    if extensao == "webp":
+        imagem.save(saida, "WEBP", quality=qualidade, method=6)
+    elif extensao == "png":
+        imagem.save(saida, "PNG", optimize=True)
+    else:
+        imagem.convert("RGB").save(saida, "JPEG", quality=qualidade, optimize=True, progressive=True)
+    return saida.getvalue()
+
+
+def _normalizar_modo(imagem, extensao):
+    if extensao == "jpg":
+        return imagem.convert("RGB")
+    if imagem.mode not in ("RGB", "RGBA"):
+        return imagem.convert("RGBA" if "transparency" in imagem.info or imagem.mode in ("LA", "PA") else "RGB")
+    return imagem
+
+
+def limpar_original(arquivo, nome):
+    """
+    Versão do upload sem metadados e limitada a AGENDA_IMAGEM_MAX_PX no maior lado,
+    no mesmo formato (JPEG ou PNG). Retorna um ContentFile pronto para o campo.
+    """
+    extensao = formato_fallback(nome)
+    arquivo.seek(0)
+    imagem = _normalizar_modo(_abrir(arquivo), extensao)
+    imagem.thumbnail((settings.AGENDA_IMAGEM_MAX_PX,) * 2, Image.LANCZOS)
+    raiz, _ = os.path.splitext(os.path.basename(nome))
+    return ContentFile(_codificar(imagem, extensao), name=f"{raiz}.{extensao}")
+
+
+def gerar_variantes(campo):
+    """
+    Gera, para cada largura de AGENDA_IMAGEM_LARGURAS, uma miniatura no formato de
+    fallback e outra em WebP, gravadas ao lado do original (ArmazenamentoPorConteudo).
+    Larguras maiores que o original não são ampliadas. Retorna os nomes gravados.
+    """
+    storage = campo.storage
+    fallback = formato_fallback(campo.name)
+    with storage.open(campo.name, "rb") as arquivo:
+        original = _normalizar_modo(_abrir(arquivo), fallback)
+        original.load()
+
+    gravados = []
+    for largura in settings.AGENDA_IMAGEM_LARGURAS:
+        miniatura = original
+        if original.width > largura:
+            altura = round(original.height * largura / original.width)
+            miniatura = original.resize((largura, altura), Image.LANCZOS)
+        for extensao in (fallback, "webp"):
+            destino = nome_variante(campo.name, largura, extensao)
+            gravados.append(storage.salvar_derivado(destino, ContentFile(_codificar(miniatura, extensao))))
+    return gravados
+
+
+def campo_larguras(nome):
+    """Campo do modelo com as larguras das variantes já geradas: logo -> logo_larguras."""
+    return f"{nome}_larguras"
+
+
+def processar_variantes(campo, forcar=False):
+    """
+    Gera as variantes do campo, a não ser que já estejam no storage (upload repetido, que
+    o storage por conteúdo reaproveitou), e registra as larguras no modelo. Retorna os
+    nomes gravados.
+    """
+    larguras = list(settings.AGENDA_IMAGEM_LARGURAS)
+    existentes = campo.storage.exists(nome_variante(campo.name, larguras[0], formato_fallback(campo.name)))
+    gravados = gerar_variantes(campo) if forcar or not existentes else []
+    instancia, nome = campo.instance, campo_larguras(campo.field.name)
+    setattr(instancia, nome, larguras)
+    # save() com update_fields: os sinais de cache veem as novas variantes
+    instancia.save(update_fields=[nome])
+    return gravados
+
+
+def remover_variantes(storage, nome, larguras):
+    """Apaga as miniaturas do arquivo `nome`, depois que ele deixou de ser usado."""
+    fallback = formato_fallback(nome)
+    for largura in larguras:
+        for extensao in (fallback, "webp"):
+            storage.delete(nome_variante(nome, largura, extensao))
+
+
+def variantes(campo):
+    """
+    [(largura, url_fallback, url_webp), ...] das miniaturas registradas no modelo
+    (campo <nome>_larguras), sem consultar o storage. Lista vazia quando o arquivo
+    ainda não foi processado (ex.: upload anterior ao pipeline).
+    """
+    if not campo:
+        return []
+    larguras = getattr(campo.instance, campo_larguras(campo.field.name), None)
+    if not larguras:
+        return []
+    storage = campo.storage
+    fallback = formato_fallback(campo.name)
+    return [
+        (
+            largura,
+            storage.url(nome_variante(campo.name, largura, fallback)),
+            storage.url(nome_variante(campo.name, largura, "webp")),
+        )
+        for largura in larguras
+    ]
@@ -0,0 +1,126 @@
+import json
+import logging
+import random
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger("agenda.instrumentacao")
+
+# Coleta da requisição em andamento; None quando a requisição não foi amostrada.
+# Uma ContextVar acompanha a requisição também nas threads do sync_to_async (ASGI).
+_coleta = ContextVar("agenda_coleta", default=None)
+
+
+class OrcamentoExcedido(Exception):
+    pass
+
+
+class Coleta:
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.mais_lenta = (0.0, "")
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """Execute wrapper instalado em todas as conexões (ver signals): mede só quando há coleta."""
+    coleta = _coleta.get()
+    if coleta is None:
+        return execute(sql, params, many, context)
+    inicio = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracao = perf_counter() - inicio
+        coleta.consultas += 1
+        coleta.tempo_sql += duracao
+        if duracao > coleta.mais_lenta[0]:
+            coleta.mais_lenta = (duracao, sql)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Para uma amostra das requisições (AGENDA_INSTRUMENTACAO_AMOSTRA), mede consultas,
+    tempo de SQL e tempo total; devolve tudo em Server-Timing, registra uma linha JSON
+    no logger "agenda.instrumentacao" e confere AGENDA_ORCAMENTO_CONSULTAS da view.
+
+    O tempo "app" é o total menos o SQL: como as views chamam render() diretamente,
+    é nele que está a renderização dos templates.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def amostrar(self):
+        amostra = settings.AGENDA_INSTRUMENTACAO_AMOSTRA
+        return amostra >= 1 or (amostra > 0 and random.random() < amostra)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.amostrar():
+            return self.get_response(request)
+
+        coleta = Coleta()
+        token = _coleta.set(coleta)
+        inicio = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self.finalizar(request, response, coleta, perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        if not self.amostrar():
+            return await self.get_response(request)
+
+        coleta = Coleta()
+        token = _coleta.set(coleta)
+        inicio = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self.finalizar(request, response, coleta, perf_counter() - inicio)
+        return response
+
+    def finalizar(self, request, response, coleta, total):
+        sql_ms = coleta.tempo_sql * 1000
+        total_ms = total * 1000
+        timing = (
+            f'db;dur={sql_ms:.1f};desc="{coleta.consultas} consultas", '
+            f"app;dur={total_ms - sql_ms:.1f}, total;dur={total_ms:.1f}"
+        )
+        if response.has_header("Server-Timing"):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response["Server-Timing"] = timing
+
+        view = request.resolver_match.view_name if request.resolver_match else None
+        logger.info(json.dumps({
+            "metodo": request.method,
+            "caminho": request.path,
+            "view": view,
+            "status": response.status_code,
+            "consultas": coleta.consultas,
+            "sql_ms": round(sql_ms, 2),
+            "app_ms": round(total_ms - sql_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "mais_lenta_ms": round(coleta.mais_lenta[0] * 1000, 2),
+            "mais_lenta_sql": coleta.mais_lenta[1][:300],
+        }, ensure_ascii=False))
+
+        orcamento = settings.AGENDA_ORCAMENTO_CONSULTAS.get(view)
+        if orcamento is not None and coleta.consultas > orcamento:
+            mensagem = f"{view} fez {coleta.consultas} consultas (orçamento: {orcamento})"
+            logger.warning(mensagem)
+            if settings.AGENDA_ORCAMENTO_ESTRITO:
+                raise OrcamentoExcedido(mensagem)
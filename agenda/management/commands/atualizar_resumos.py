@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from agenda.models import Agendamento
+from agenda.resumos import reconstruir_resumos
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Data inválida: {valor} (use AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Preenche ou reconstrói a tabela ResumoDiario a partir dos agendamentos, em lotes de dias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--inicio", type=_data, help="Primeiro dia (padrão: agendamento mais antigo)")
+        parser.add_argument("--fim", type=_data, help="Último dia (padrão: agendamento mais recente)")
+        parser.add_argument("--lote", type=int, default=31, help="Dias por transação")
+
+    def handle(self, *args, **opts):
+        limites = Agendamento.objects.aggregate(primeiro=Min("data"), ultimo=Max("data"))
+        if not limites["primeiro"]:
+            self.stdout.write("Nenhum agendamento encontrado.")
+            return
+
+        inicio = opts["inicio"] or timezone.localdate(limites["primeiro"])
+        fim = opts["fim"] or timezone.localdate(limites["ultimo"])
+        total = reconstruir_resumos(inicio, fim, dias_por_lote=opts["lote"], saida=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"{total} resumos gravados de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}."))
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from agenda.management.commands.benchmark_views import percentil
+from agenda.management.commands.carga_agendamentos import (
+    SENHA, SERVIDORES, ClienteVirtual, limpar_cenario, preparar_cenario, subir_servidor,
+)
+from agenda.models import Notificacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Vazão das views JSON (horários disponíveis e notificações) com muitas requisições simultâneas, "
+        "comparando workers síncronos (gunicorn/WSGI) com workers assíncronos (uvicorn/ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servidores", nargs="+", choices=sorted(SERVIDORES), default=sorted(SERVIDORES))
+        parser.add_argument("--workers", type=int, default=2, help="Workers de cada servidor")
+        parser.add_argument("--porta", type=int, default=8766)
+        parser.add_argument("--concorrencia", type=int, default=32, help="Requisições simultâneas")
+        parser.add_argument("--requisicoes", type=int, default=2000, help="Total de requisições por servidor")
+        parser.add_argument("--aquecimento", type=int, default=50, help="Requisições descartadas por servidor")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--saida", help="Grava o JSON também neste arquivo")
+
+    def handle(self, *args, **opts):
+        if opts["concorrencia"] < 1 or opts["requisicoes"] < 1:
+            raise CommandError("--concorrencia e --requisicoes devem ser maiores que zero.")
+        limpar_cenario()
+        dia = timezone.localdate() + timedelta(days=1)
+        # Cada conexão simultânea tem seu próprio cliente logado
+        _, equipe, fregueses = preparar_cenario(2, opts["concorrencia"], dia)
+        Notificacao.objects.bulk_create([
+            Notificacao(usuario=cliente, mensagem=f"Aviso {i}") for cliente in fregueses for i in range(5)
+        ])
+        resultado = {
+            "banco": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "workers": opts["workers"],
+            "concorrencia": opts["concorrencia"],
+            "servidores": {},
+        }
+        try:
+            for nome in opts["servidores"]:
+                processo, base = subir_servidor(nome, opts["porta"], opts["workers"])
+                try:
+                    resultado["servidores"][nome] = self.medir(base, equipe, fregueses, dia, opts)
+                finally:
+                    processo.terminate()
+                    processo.wait(timeout=10)
+                medida = resultado["servidores"][nome]
+                self.stderr.write(
+                    f"{nome}: {medida['requisicoes_por_segundo']} req/s, p95={medida['latencia_ms']['p95']} ms"
+                )
+        finally:
+            limpar_cenario()
+
+        vazoes = {nome: medida["requisicoes_por_segundo"] for nome, medida in resultado["servidores"].items()}
+        if vazoes.get("gunicorn") and "uvicorn" in vazoes:
+            resultado["ganho_uvicorn"] = round(vazoes["uvicorn"] / vazoes["gunicorn"], 2)
+
+        texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+        self.stdout.write(texto)
+        if opts["saida"]:
+            with open(opts["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto)
+
+    def medir(self, base, equipe, fregueses, dia, opts):
+        """Dispara `requisicoes` GETs com `concorrencia` clientes; devolve vazão e latência."""
+        url_login = reverse("agenda:login_cliente")
+        urls = [
+            f"{reverse('agenda:horarios_disponiveis')}?"
+            + urlencode({"barbeiro": barbeiro.id, "servico": servico.id, "dia": dia.isoformat()})
+            for barbeiro, servico in equipe
+        ] + [reverse("agenda:lista_notificacoes")]
+
+        navegadores = []
+        for cliente in fregueses:
+            navegador = ClienteVirtual(base, opts["timeout"])
+            navegador.requisitar(url_login)
+            status, _, _ = navegador.requisitar(url_login, {"username": cliente.username, "password": SENHA})
+            if status != 302:
+                raise CommandError(f"Login de {cliente.username} falhou (HTTP {status}).")
+            navegadores.append(navegador)
+
+        total = opts["aquecimento"] + opts["requisicoes"]
+        tempos, status_http = [], Counter()
+        trava = threading.Lock()
+        proxima = iter(range(total))
+        largada = threading.Barrier(len(navegadores) + 1)
+        marcos = {}
+
+        def trabalhar(navegador):
+            largada.wait()
+            while True:
+                with trava:
+                    n = next(proxima, None)
+                    if n == opts["aquecimento"]:
+                        marcos["inicio"] = time.perf_counter()
+                if n is None:
+                    return
+                status, _, segundos = navegador.requisitar(urls[n % len(urls)])
+                with trava:
+                    if n >= opts["aquecimento"]:
+                        tempos.append(segundos * 1000)
+                        status_http[status] += 1
+
+        trabalhadores = [threading.Thread(target=trabalhar, args=(navegador,)) for navegador in navegadores]
+        for t in trabalhadores:
+            t.start()
+        largada.wait()
+        for t in trabalhadores:
+            t.join()
+        duracao = time.perf_counter() - marcos.get("inicio", time.perf_counter())
+
+        return {
+            "requisicoes": len(tempos),
+            "segundos": round(duracao, 2),
+            "requisicoes_por_segundo": round(len(tempos) / duracao, 1) if duracao else 0,
+            "erros": sum(quantidade for status, quantidade in status_http.items() if status != 200),
+            "status": {str(status): quantidade for status, quantidade in sorted(status_http.items())},
+            "latencia_ms": {
+                "p50": round(percentil(tempos, 50), 1),
+                "p95": round(percentil(tempos, 95), 1),
+                "p99": round(percentil(tempos, 99), 1),
+            },
+        }
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from agenda.horarios import horarios_livres
+from agenda.models import Agendamento, Barbearia, Disponibilidade, Servico, Usuario
+
+
+class _Rollback(Exception):
+    pass
+
+
+def horarios_legado(barbeiro, dia, duracao):
+    """Loop original de horarios_disponiveis: uma consulta exists() por passo de 30 minutos."""
+    livres = []
+    for d in Disponibilidade.objects.filter(barbeiro=barbeiro, dia=dia):
+        hora_atual = timezone.make_aware(datetime.combine(d.dia, d.hora_inicio))
+        hora_fim = timezone.make_aware(datetime.combine(d.dia, d.hora_fim)) - duracao
+        while hora_atual <= hora_fim:
+            conflito = Agendamento.objects.filter(
+                barbeiro=barbeiro,
+                status="ativo",
+                data__lt=hora_atual + duracao,
+                data__gte=hora_atual,
+            ).exists()
+            if not conflito:
+                livres.append(hora_atual.strftime("%H:%M"))
+            hora_atual += timedelta(minutes=30)
+    return livres
+
+
+class Command(BaseCommand):
+    help = "Compara consultas e latência do cálculo de horários livres (loop antigo x varredura)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=50)
+        parser.add_argument("--agendamentos", type=int, default=8, help="Agendamentos ativos no dia")
+        parser.add_argument("--abertura", type=int, default=8, help="Hora de abertura")
+        parser.add_argument("--fechamento", type=int, default=18, help="Hora de fechamento")
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._executar(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _executar(self, opts):
+        dia = timezone.localdate() + timedelta(days=1)
+        barbearia = Barbearia.objects.create(nome="Benchmark")
+        barbeiro = Usuario.objects.create(username="bench_barbeiro", tipo="barbeiro", barbearia=barbearia)
+        cliente = Usuario.objects.create(username="bench_cliente", tipo="cliente")
+        servico = Servico.objects.create(
+            barbearia=barbearia, barbeiro=barbeiro, nome="Corte", preco=40, duracao=timedelta(minutes=30)
+        )
+        Disponibilidade.objects.create(
+            barbeiro=barbeiro, dia=dia, hora_inicio=dtime(opts["abertura"]), hora_fim=dtime(opts["fechamento"])
+        )
+        inicio = timezone.make_aware(datetime.combine(dia, dtime(opts["abertura"])))
+        Agendamento.objects.bulk_create([
+            Agendamento(
+                barbearia=barbearia, cliente=cliente, barbeiro=barbeiro, servico=servico,
+                data=inicio + timedelta(hours=i), data_fim=inicio + timedelta(hours=i) + servico.duracao,
+                status="ativo",
+            )
+            for i in range(opts["agendamentos"])
+        ])
+
+        resultados = {}
+        for nome, funcao in (("legado", horarios_legado), ("varredura", horarios_livres)):
+            with CaptureQueriesContext(connection) as ctx:
+                funcao(barbeiro, dia, servico.duracao)
+            consultas = len(ctx.captured_queries)
+
+            inicio_bench = time.perf_counter()
+            for _ in range(opts["repeticoes"]):
+                funcao(barbeiro, dia, servico.duracao)
+            media_ms = (time.perf_counter() - inicio_bench) * 1000 / opts["repeticoes"]
+            resultados[nome] = (consultas, media_ms)
+            self.stdout.write(f"{nome:<10} consultas={consultas:<4} media={media_ms:.2f} ms")
+
+        ganho = resultados["legado"][1] / resultados["varredura"][1] if resultados["varredura"][1] else 0
+        self.stdout.write(self.style.SUCCESS(f"Varredura {ganho:.1f}x mais rápida"))
@@ -0,0 +1,115 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from agenda.geo import candidatos, haversine_km, proximas
+from agenda.management.commands.benchmark_views import percentil
+from agenda.models import Barbearia
+
+# Retângulo aproximado do estado de São Paulo: lat mín., lat máx., lon mín., lon máx.
+REGIAO_PADRAO = "-25.3,-19.8,-53.1,-44.2"
+
+
+class _Rollback(Exception):
+    pass
+
+
+def proximas_varredura(latitude, longitude, raio, limite):
+    """Sem pré-filtro: haversine em todas as barbearias (referência de comparação)."""
+    distancias = sorted(
+        (haversine_km(latitude, longitude, lat, lon), id_)
+        for id_, lat, lon in Barbearia.objects.exclude(latitude=None).values_list("id", "latitude", "longitude")
+    )
+    return [(id_, distancia) for distancia, id_ in distancias if distancia <= raio][:limite]
+
+
+class Command(BaseCommand):
+    help = (
+        "Latência da busca \"perto de mim\" (retângulo no índice latitude/longitude + haversine) "
+        "com muitas barbearias sintéticas, comparada com a varredura completa. Tudo é desfeito no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--barbearias", type=int, default=100_000)
+        parser.add_argument("--consultas", type=int, default=500, help="Pontos consultados")
+        parser.add_argument("--varreduras", type=int, default=5, help="Consultas da varredura completa")
+        parser.add_argument("--raio", type=float, default=settings.AGENDA_PROXIMIDADE_RAIO_KM, help="km")
+        parser.add_argument("--limite", type=int, default=settings.AGENDA_BARBEARIAS_POR_PAGINA)
+        parser.add_argument("--regiao", default=REGIAO_PADRAO, help="lat_min,lat_max,lon_min,lon_max")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        try:
+            regiao = [float(valor) for valor in opts["regiao"].split(",")]
+            lat_min, lat_max, lon_min, lon_max = regiao
+        except ValueError:
+            raise CommandError("--regiao deve ter quatro números: lat_min,lat_max,lon_min,lon_max.")
+        if opts["consultas"] < 1 or opts["barbearias"] < 1:
+            raise CommandError("--consultas e --barbearias devem ser maiores que zero.")
+        rnd = random.Random(opts["seed"])
+
+        def ponto():
+            return rnd.uniform(lat_min, lat_max), rnd.uniform(lon_min, lon_max)
+
+        try:
+            with transaction.atomic():
+                inicio = time.perf_counter()
+                Barbearia.objects.bulk_create(
+                    [Barbearia(nome=f"Bench {i}", latitude=lat, longitude=lon)
+                     for i, (lat, lon) in enumerate(ponto() for _ in range(opts["barbearias"]))],
+                    batch_size=2000,
+                )
+                self.stderr.write(f"{opts['barbearias']} barbearias criadas em {time.perf_counter() - inicio:.1f} s")
+                if connection.vendor in ("sqlite", "postgresql"):
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"ANALYZE {Barbearia._meta.db_table}")
+                self.medir(ponto, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def medir(self, ponto, opts):
+        raio, limite = opts["raio"], opts["limite"]
+        exemplo = ponto()
+        self.stdout.write(self.style.MIGRATE_HEADING("== Plano do pré-filtro"))
+        self.stdout.write(candidatos(*exemplo, raio).explain())
+
+        pontos = [ponto() for _ in range(opts["consultas"])]
+        tempos, encontradas, lidas = [], [], []
+        for latitude, longitude in pontos:
+            inicio = time.perf_counter()
+            resultado = proximas(latitude, longitude, raio, limite)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            encontradas.append(len(resultado))
+        # Candidatos lidos do índice, fora da medição
+        for latitude, longitude in pontos[:50]:
+            lidas.append(candidatos(latitude, longitude, raio).count())
+
+        varredura = []
+        for latitude, longitude in pontos[:opts["varreduras"]]:
+            inicio = time.perf_counter()
+            referencia = proximas_varredura(latitude, longitude, raio, limite)
+            varredura.append((time.perf_counter() - inicio) * 1000)
+            if [id_ for id_, _ in referencia] != [id_ for id_, _ in proximas(latitude, longitude, raio, limite)]:
+                raise CommandError(f"Resultado diferente da varredura em ({latitude}, {longitude}).")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {opts['barbearias']} barbearias, raio {raio:g} km, {len(pontos)} consultas"
+        ))
+        self.stdout.write(
+            f"índice     p50={percentil(tempos, 50):.2f} ms  p95={percentil(tempos, 95):.2f} ms  "
+            f"p99={percentil(tempos, 99):.2f} ms  máx={max(tempos):.2f} ms"
+        )
+        self.stdout.write(
+            f"           candidatos/consulta={sum(lidas) / len(lidas):.0f}  "
+            f"resultados/consulta={sum(encontradas) / len(encontradas):.1f}"
+        )
+        if varredura:
+            media = sum(varredura) / len(varredura)
+            self.stdout.write(f"varredura  média={media:.1f} ms ({len(varredura)} consultas, mesmos resultados)")
+        p95 = percentil(tempos, 95)
+        estilo = self.style.SUCCESS if p95 < 10 else self.style.WARNING
+        self.stdout.write(estilo(f"p95 {'abaixo' if p95 < 10 else 'acima'} de 10 ms ({p95:.2f} ms)"))
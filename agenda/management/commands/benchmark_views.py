@@ -0,0 +1,192 @@
+import json
+import math
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from agenda.horarios import livres_por_barbeiro
+from agenda.models import Servico, Usuario
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo (valores não vazios)."""
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (p50/p95) e consultas de cada view com o cliente de testes do Django e "
+        "imprime o resultado em JSON. Use numa base criada por popular_dados; nada é gravado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=30)
+        parser.add_argument("--aquecimento", type=int, default=2, help="Requisições descartadas por caso")
+        parser.add_argument("--sem-cache", action="store_true", help="Limpa o cache antes de cada requisição")
+        parser.add_argument("--saida", help="Grava o JSON também neste arquivo")
+        parser.add_argument("--comparar", help="JSON de uma execução anterior para mostrar as diferenças")
+
+    def handle(self, *args, **opts):
+        if "testserver" not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+        resultado = {}
+        try:
+            with transaction.atomic():
+                resultado = self.executar(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+        self.stdout.write(texto)
+        if opts["saida"]:
+            with open(opts["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto)
+        if opts["comparar"]:
+            with open(opts["comparar"], encoding="utf-8") as arquivo:
+                self.comparar(json.load(arquivo), resultado)
+
+    def cenario(self):
+        barbeiro = Usuario.objects.filter(tipo="barbeiro", barbearia__isnull=False).order_by("pk").first()
+        if not barbeiro:
+            raise CommandError("Banco sem dados: rode popular_dados antes.")
+        barbearia = barbeiro.barbearia
+        usuarios = {
+            "cliente": Usuario.objects.filter(tipo="cliente").order_by("pk").first(),
+            "barbeiro": barbeiro,
+            "admin": Usuario.objects.filter(tipo="admin_barbearia", barbearia=barbearia).order_by("pk").first(),
+            "superadmin": Usuario.objects.filter(tipo="superadmin").order_by("pk").first(),
+        }
+        faltando = [tipo for tipo, usuario in usuarios.items() if usuario is None]
+        if faltando:
+            raise CommandError(f"Faltam usuários do tipo: {', '.join(faltando)}")
+        servico = Servico.objects.filter(barbeiro=barbeiro).order_by("pk").first()
+        return barbearia, barbeiro, servico, usuarios
+
+    def casos(self, barbearia, barbeiro, servico):
+        """(nome, perfil logado ou None, método, url, dados) de cada caso medido."""
+        amanha = timezone.localdate() + timedelta(days=1)
+        return [
+            ("home", None, "get", reverse("agenda:home"), None),
+            ("barbearia_detail", None, "get", reverse("agenda:barbearia_detail", args=[barbearia.id]), None),
+            ("horarios_disponiveis", "cliente", "get", reverse("agenda:horarios_disponiveis"), {
+                "barbeiro": barbeiro.id, "servico": servico.id, "dia": amanha.isoformat(),
+            }),
+            ("calendario_disponivel", "cliente", "get", reverse("agenda:calendario_disponivel"), {
+                "barbearia": barbearia.id, "servico": servico.id,
+                "inicio": amanha.isoformat(), "fim": (amanha + timedelta(days=13)).isoformat(),
+            }),
+            ("agenda_cliente", "cliente", "get", reverse("agenda:agenda_cliente"), None),
+            ("lista_notificacoes", "barbeiro", "get", reverse("agenda:lista_notificacoes"), None),
+            ("dashboard_barbeiro", "barbeiro", "get", reverse("agenda:dashboard_barbeiro"), None),
+            ("dashboard_admin", "admin", "get", reverse("agenda:dashboard_admin"), None),
+            ("dashboard_superadmin", "superadmin", "get", reverse("agenda:dashboard_super_admin"), None),
+        ]
+
+    def horarios_para_agendar(self, barbeiro, servico):
+        """Horários livres do barbeiro, em ordem, para os POSTs de agendamento."""
+        inicio = timezone.localdate() + timedelta(days=1)
+        fim = inicio + timedelta(days=settings.AGENDA_HORIZONTE_DIAS)
+        livres = livres_por_barbeiro([barbeiro.id], inicio, fim, servico.duracao)[barbeiro.id]
+        return [timezone.localtime(h) for dia in sorted(livres) for h in livres[dia]]
+
+    def medir(self, client, metodo, url, dados, opts, quantidade):
+        tempos, consultas, status = [], [], set()
+        for i in range(quantidade):
+            if opts["sem_cache"]:
+                cache.clear()
+            dados_req = dados() if callable(dados) else dados
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                resposta = getattr(client, metodo)(url, dados_req)
+                duracao = time.perf_counter() - inicio
+            if i >= opts["aquecimento"]:
+                tempos.append(duracao * 1000)
+                consultas.append(len(ctx.captured_queries))
+                status.add(resposta.status_code)
+        return {
+            "p50_ms": round(percentil(tempos, 50), 2),
+            "p95_ms": round(percentil(tempos, 95), 2),
+            "media_ms": round(sum(tempos) / len(tempos), 2),
+            "consultas": max(consultas),
+            "status": sorted(status),
+        }
+
+    def executar(self, opts):
+        if opts["repeticoes"] < 1:
+            raise CommandError("--repeticoes deve ser maior que zero.")
+        barbearia, barbeiro, servico, usuarios = self.cenario()
+        clientes = {None: Client()}
+        for perfil, usuario in usuarios.items():
+            clientes[perfil] = Client()
+            clientes[perfil].force_login(usuario)
+
+        quantidade = opts["repeticoes"] + opts["aquecimento"]
+        views = {}
+        for nome, perfil, metodo, url, dados in self.casos(barbearia, barbeiro, servico):
+            views[nome] = self.medir(clientes[perfil], metodo, url, dados, opts, quantidade)
+            self.stderr.write(f"{nome}: p50={views[nome]['p50_ms']} ms, consultas={views[nome]['consultas']}")
+
+        # POST de agendamento: cada requisição ocupa um horário livre diferente
+        livres = self.horarios_para_agendar(barbeiro, servico)
+        if len(livres) < quantidade:
+            raise CommandError("Horários livres insuficientes para o POST de agendamento.")
+        proximos = iter(livres)
+
+        def dados_post():
+            horario = next(proximos)
+            return {
+                "barbeiro": barbeiro.id, "servico": servico.id,
+                "data": horario.strftime("%Y-%m-%d"), "hora": horario.strftime("%H:%M"),
+            }
+
+        views["agendar"] = self.medir(
+            clientes["cliente"], "post", reverse("agenda:agenda_cliente"), dados_post, opts, quantidade
+        )
+        self.stderr.write(f"agendar: p50={views['agendar']['p50_ms']} ms, consultas={views['agendar']['consultas']}")
+
+        return {
+            "commit": _commit_atual(),
+            "banco": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "repeticoes": opts["repeticoes"],
+            "sem_cache": opts["sem_cache"],
+            "views": views,
+        }
+
+    def comparar(self, anterior, atual):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nComparação com {anterior.get('commit') or 'anterior'}"))
+        for nome, medida in atual.get("views", {}).items():
+            antes = anterior.get("views", {}).get(nome)
+            if not antes:
+                continue
+            variacao = (medida["p50_ms"] / antes["p50_ms"] - 1) * 100 if antes["p50_ms"] else 0
+            linha = (
+                f"{nome:<22} p50 {antes['p50_ms']:>8.2f} -> {medida['p50_ms']:>8.2f} ms ({variacao:+.0f}%)  "
+                f"consultas {antes['consultas']} -> {medida['consultas']}"
+            )
+            piorou = medida["consultas"] > antes["consultas"] or variacao > 20
+            self.stdout.write(self.style.WARNING(linha) if piorou else linha)
@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import time as dtime, timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener, urlopen
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from agenda.management.commands.benchmark_views import percentil
+from agenda.management.commands.stress_agendamentos import contar_sobreposicoes
+from agenda.models import Barbearia, Disponibilidade, Servico, Usuario
+
+PREFIXO = "carga_"
+SENHA = "senha123"
+# Servidores que o comando sabe subir sozinho; {porta} e {workers} são preenchidos na hora
+SERVIDORES = {
+    "gunicorn": [
+        sys.executable, "-m", "gunicorn", "barbearia.wsgi:application",
+        "--bind", "127.0.0.1:{porta}", "--workers", "{workers}", "--log-level", "warning",
+    ],
+    # Mesma configuração do Procfile: views assíncronas sem bloquear o worker
+    "uvicorn": [
+        sys.executable, "-m", "gunicorn", "barbearia.asgi:application", "-k", "uvicorn_worker.UvicornWorker",
+        "--bind", "127.0.0.1:{porta}", "--workers", "{workers}", "--log-level", "warning",
+    ],
+}
+RECUSAS = ("Esse horário já foi reservado.", "Horário não disponível.")
+
+
+class _SemRedirecionamento(HTTPRedirectHandler):
+    """Devolve o 302 como resposta: é assim que login e agendamento sinalizam sucesso."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteVirtual:
+    """Um navegador simplificado: cookies próprios, token CSRF e tempo de cada requisição."""
+
+    def __init__(self, base, timeout):
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _SemRedirecionamento)
+
+    def csrf(self):
+        return next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), "")
+
+    def requisitar(self, caminho, dados=None):
+        """(status, corpo, segundos); falhas de rede viram status 0."""
+        corpo = None
+        if dados is not None:
+            corpo = urlencode({**dados, "csrfmiddlewaretoken": self.csrf()}).encode()
+        requisicao = Request(self.base + caminho, data=corpo, headers={"Referer": self.base + caminho})
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(requisicao, timeout=self.timeout) as resposta:
+                status, conteudo = resposta.status, resposta.read()
+        except HTTPError as e:
+            status, conteudo = e.code, e.read()
+        except (URLError, OSError):
+            status, conteudo = 0, b""
+        return status, conteudo.decode("utf-8", "replace"), time.perf_counter() - inicio
+
+
+def preparar_cenario(barbeiros, clientes, dia):
+    """Barbearia, barbeiros com expediente em `dia` e clientes com senha, todos com o prefixo de carga."""
+    barbearia = Barbearia.objects.create(nome=f"{PREFIXO}barbearia")
+    senha = make_password(SENHA)
+    equipe = Usuario.objects.bulk_create([
+        Usuario(username=f"{PREFIXO}barbeiro{i}", tipo="barbeiro", barbearia=barbearia, password=senha)
+        for i in range(barbeiros)
+    ])
+    fregueses = Usuario.objects.bulk_create([
+        Usuario(username=f"{PREFIXO}cliente{i}", tipo="cliente", password=senha) for i in range(clientes)
+    ])
+    servicos = Servico.objects.bulk_create([
+        Servico(barbearia=barbearia, barbeiro=b, nome="Corte", preco=40, duracao=timedelta(minutes=30))
+        for b in equipe
+    ])
+    Disponibilidade.objects.bulk_create([
+        Disponibilidade(barbeiro=b, dia=dia, hora_inicio=dtime(9), hora_fim=dtime(18)) for b in equipe
+    ])
+    return barbearia, list(zip(equipe, servicos)), fregueses
+
+
+def subir_servidor(nome, porta, workers):
+    """Sobe o servidor `nome` de SERVIDORES e espera a primeira resposta. Retorna (processo, url base)."""
+    comando = [parte.format(porta=porta, workers=workers) for parte in SERVIDORES[nome]]
+    processo = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=os.environ.copy())
+    base = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise CommandError(f"O servidor terminou com código {processo.returncode}.")
+        try:
+            urlopen(base + reverse("agenda:login_cliente"), timeout=1).close()
+            return processo, base
+        except (URLError, OSError):
+            time.sleep(0.2)
+    processo.terminate()
+    raise CommandError("O servidor não respondeu em 30 segundos.")
+
+
+def limpar_cenario():
+    Usuario.objects.filter(username__startswith=PREFIXO).delete()
+    Barbearia.objects.filter(nome__startswith=PREFIXO).delete()
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga do fluxo de agendamento via HTTP (login, horários disponíveis, POST) com "
+        "clientes concorrentes disputando os mesmos barbeiros. Sobe um servidor local ou usa --url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Servidor já em execução (ex.: http://127.0.0.1:8000)")
+        parser.add_argument("--servidor", choices=sorted(SERVIDORES), default="gunicorn")
+        parser.add_argument("--workers", type=int, default=4, help="Workers do servidor iniciado pelo comando")
+        parser.add_argument("--porta", type=int, default=8765)
+        parser.add_argument("--clientes", type=int, default=20, help="Clientes virtuais simultâneos")
+        parser.add_argument("--iteracoes", type=int, default=5, help="Fluxos completos por cliente")
+        parser.add_argument("--barbeiros", type=int, default=2)
+        parser.add_argument("--disputa", type=int, default=3, help="Escolhe entre os N primeiros horários livres")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **opts):
+        limpar_cenario()
+        dia = timezone.localdate() + timedelta(days=1)
+        _, equipe, fregueses = preparar_cenario(opts["barbeiros"], opts["clientes"], dia)
+        servidor = None
+        try:
+            base = opts["url"]
+            if not base:
+                servidor, base = subir_servidor(opts["servidor"], opts["porta"], opts["workers"])
+            resultado = self.executar(base, equipe, fregueses, dia, opts)
+            resultado["sobreposicoes"] = contar_sobreposicoes([barbeiro.id for barbeiro, _ in equipe])
+        finally:
+            if servidor:
+                servidor.terminate()
+                servidor.wait(timeout=10)
+            limpar_cenario()
+
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+        if resultado["sobreposicoes"]:
+            raise CommandError(f"{resultado['sobreposicoes']} agendamentos sobrepostos encontrados!")
+
+    def executar(self, base, equipe, fregueses, dia, opts):
+        tempos = defaultdict(list)
+        resultados = Counter()
+        trava = threading.Lock()
+        largada = threading.Barrier(len(fregueses))
+        url_login = reverse("agenda:login_cliente")
+        url_horarios = reverse("agenda:horarios_disponiveis")
+        url_agendar = reverse("agenda:agenda_cliente")
+
+        def registrar(etapa, status, segundos):
+            with trava:
+                tempos[etapa].append(segundos * 1000)
+                resultados["requisicoes"] += 1
+                if status == 0 or status >= 500:
+                    resultados["erros_http"] += 1
+
+        def fluxo(cliente, rnd):
+            navegador = ClienteVirtual(base, opts["timeout"])
+            status, _, segundos = navegador.requisitar(url_login)
+            registrar("pagina_login", status, segundos)
+            status, _, segundos = navegador.requisitar(url_login, {"username": cliente.username, "password": SENHA})
+            registrar("login", status, segundos)
+            if status != 302:
+                with trava:
+                    resultados["erro"] += opts["iteracoes"]
+                # Libera quem já espera na largada: sem isto a barreira nunca completa
+                largada.abort()
+                return
+            try:
+                largada.wait()
+            except threading.BrokenBarrierError:
+                pass  # algum login falhou; os demais seguem sem a largada conjunta
+
+            for _ in range(opts["iteracoes"]):
+                barbeiro, servico = rnd.choice(equipe)
+                consulta = urlencode({"barbeiro": barbeiro.id, "servico": servico.id, "dia": dia.isoformat()})
+                status, corpo, segundos = navegador.requisitar(f"{url_horarios}?{consulta}")
+                registrar("horarios", status, segundos)
+                if status != 200:
+                    chave = "erro"
+                else:
+                    horarios = json.loads(corpo)["horarios"][:opts["disputa"]]
+                    if not horarios:
+                        chave = "sem_horario"
+                    else:
+                        status, corpo, segundos = navegador.requisitar(url_agendar, {
+                            "barbeiro": barbeiro.id, "servico": servico.id,
+                            "data": dia.isoformat(), "hora": rnd.choice(horarios),
+                        })
+                        registrar("agendar", status, segundos)
+                        if status == 302:
+                            chave = "sucesso"
+                        elif status == 200 and any(recusa in corpo for recusa in RECUSAS):
+                            chave = "recusado"
+                        else:
+                            chave = "erro"
+                with trava:
+                    resultados[chave] += 1
+
+        trabalhadores = [
+            threading.Thread(target=fluxo, args=(cliente, random.Random(opts["seed"] + i)))
+            for i, cliente in enumerate(fregueses)
+        ]
+        inicio = time.perf_counter()
+        for t in trabalhadores:
+            t.start()
+        for t in trabalhadores:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+        fluxos = len(fregueses) * opts["iteracoes"]
+        return {
+            "url": base,
+            "banco": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "clientes": len(fregueses),
+            "fluxos": fluxos,
+            "segundos": round(duracao, 2),
+            "requisicoes_por_segundo": round(resultados["requisicoes"] / duracao, 1) if duracao else 0,
+            "agendamentos_por_segundo": round(resultados["sucesso"] / duracao, 1) if duracao else 0,
+            "sucesso": resultados["sucesso"],
+            "recusado": resultados["recusado"],
+            "sem_horario": resultados["sem_horario"],
+            "erro": resultados["erro"],
+            "taxa_erro": round(resultados["erro"] / fluxos, 4) if fluxos else 0,
+            "erros_http": resultados["erros_http"],
+            "latencia_ms": {
+                etapa: {
+                    "p50": round(percentil(valores, 50), 1),
+                    "p95": round(percentil(valores, 95), 1),
+                    "p99": round(percentil(valores, 99), 1),
+                }
+                for etapa, valores in tempos.items()
+            },
+        }
@@ -0,0 +1,66 @@
+from datetime import datetime, time as dtime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from agenda.geo import candidatos
+from agenda.horarios import consulta_ocupados
+from agenda.models import Agendamento, Barbearia, Disponibilidade, Notificacao, Usuario
+
+
+class Command(BaseCommand):
+    help = "Mostra o plano de execução (EXPLAIN) das consultas mais frequentes do sistema."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (apenas PostgreSQL)")
+
+    def consultas(self):
+        """Consultas quentes, montadas como nas views, usando dados existentes no banco."""
+        barbeiro = Usuario.objects.filter(tipo="barbeiro").order_by("pk").first()
+        cliente = Usuario.objects.filter(tipo="cliente").order_by("pk").first()
+        barbearia = Barbearia.objects.order_by("pk").first()
+        if not (barbeiro and cliente and barbearia):
+            raise CommandError("Banco sem dados suficientes: rode com uma base populada.")
+
+        dia = timezone.localdate()
+        inicio = timezone.make_aware(datetime.combine(dia, dtime(9)))
+        fim = inicio + timedelta(minutes=30)
+
+        return [
+            ("Conflito ao agendar", Agendamento.objects.filter(
+                barbeiro=barbeiro, status="ativo", data__lt=fim, data_fim__gt=inicio,
+            )),
+            ("Horários livres: disponibilidades", Disponibilidade.objects.filter(
+                barbeiro=barbeiro, dia=dia,
+            ).values_list("dia", "hora_inicio", "hora_fim")),
+            ("Horários livres: agendamentos", consulta_ocupados({(barbeiro.pk, dia): [(inicio, fim)]})),
+            ("Dashboard do barbeiro", Agendamento.objects.filter(
+                barbeiro=barbeiro, status="ativo", data__date__gte=dia - timedelta(days=6),
+            )),
+            ("Dashboard da barbearia: próximos", Agendamento.objects.filter(
+                barbearia=barbearia, data__gte=inicio,
+            ).order_by("data", "id")[:settings.AGENDA_ITENS_POR_PAGINA + 1]),
+            ("Agenda do cliente: anteriores", Agendamento.objects.filter(
+                cliente=cliente, status="ativo", data__lt=inicio,
+            ).order_by("-data", "-id")[:settings.AGENDA_ITENS_POR_PAGINA + 1]),
+            ("Polling de notificações", Notificacao.objects.filter(usuario=cliente, lida=False, id__gt=0).order_by("id")),
+            ("Notificações pendentes", Notificacao.objects.filter(usuario=cliente, lida=False)),
+            ("Perto de mim: retângulo", candidatos(
+                barbearia.latitude or -23.55, barbearia.longitude or -46.63, settings.AGENDA_PROXIMIDADE_RAIO_KM,
+            )),
+        ]
+
+    def handle(self, *args, **opts):
+        opcoes = {}
+        if opts["analyze"]:
+            if connection.vendor != "postgresql":
+                raise CommandError("--analyze só é suportado no PostgreSQL.")
+            opcoes = {"analyze": True, "buffers": True}
+
+        for titulo, queryset in self.consultas():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {titulo}"))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**opcoes))
+            self.stdout.write("")
@@ -0,0 +1,73 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agenda.geo import geocodificar_pendentes, normalizar_cep
+from agenda.models import Cep
+
+LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa a base local de CEPs (CSV com as colunas cep, latitude, longitude e, opcionais, cidade e uf) "
+        "usada para geocodificar as barbearias, e geocodifica as que ainda não têm coordenadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do CSV")
+        parser.add_argument("--delimitador", default=",")
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **opts):
+        try:
+            arquivo = open(opts["arquivo"], newline="", encoding=opts["encoding"])
+        except OSError as erro:
+            raise CommandError(str(erro))
+
+        importados = ignorados = 0
+        with arquivo, transaction.atomic():
+            leitor = csv.DictReader(arquivo, delimiter=opts["delimitador"])
+            faltando = {"cep", "latitude", "longitude"} - set(leitor.fieldnames or [])
+            if faltando:
+                raise CommandError(f"Colunas ausentes no CSV: {', '.join(sorted(faltando))}.")
+            # Por CEP: repetidos no mesmo lote fariam o upsert falhar no PostgreSQL
+            lote = {}
+            for linha in leitor:
+                ponto = self.ler(linha)
+                if ponto is None:
+                    ignorados += 1
+                    continue
+                lote[ponto.cep] = ponto
+                if len(lote) >= LOTE:
+                    importados += self.gravar(lote)
+                    lote = {}
+            importados += self.gravar(lote)
+            geocodificadas = geocodificar_pendentes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{importados} CEPs importados, {ignorados} linhas ignoradas, {geocodificadas} barbearias geocodificadas"
+        ))
+
+    @staticmethod
+    def ler(linha):
+        cep = normalizar_cep(linha["cep"])
+        try:
+            latitude, longitude = float(linha["latitude"]), float(linha["longitude"])
+        except (TypeError, ValueError):
+            return None
+        if not cep or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return None
+        return Cep(
+            cep=cep, latitude=latitude, longitude=longitude,
+            cidade=(linha.get("cidade") or "").strip(), uf=(linha.get("uf") or "").strip().upper()[:2],
+        )
+
+    @staticmethod
+    def gravar(lote):
+        Cep.objects.bulk_create(
+            lote.values(), update_conflicts=True, unique_fields=["cep"],
+            update_fields=["latitude", "longitude", "cidade", "uf"],
+        )
+        return len(lote)
@@ -0,0 +1,189 @@
+import random
+from datetime import datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from agenda.busca import indexar
+from agenda.cache import invalidar
+from agenda.models import Agendamento, Barbearia, Disponibilidade, Notificacao, Servico, Usuario
+from agenda.resumos import reconstruir_resumos
+
+PREFIXO = "seed_"
+SENHA = "senha123"
+ABERTURA, FECHAMENTO = 9, 18
+PASSO = timedelta(minutes=30)
+# Cidade e centro aproximado (lat, lon); as lojas ficam espalhadas a alguns km dele
+CIDADES = [
+    ("São Paulo", -23.55, -46.63),
+    ("Campinas", -22.91, -47.06),
+    ("Santos", -23.96, -46.33),
+    ("Ribeirão Preto", -21.18, -47.81),
+    ("Sorocaba", -23.50, -47.46),
+]
+SERVICOS = [
+    ("Corte", Decimal("40.00"), 30),
+    ("Barba", Decimal("30.00"), 30),
+    ("Corte e barba", Decimal("65.00"), 60),
+    ("Pigmentação", Decimal("50.00"), 45),
+    ("Sobrancelha", Decimal("15.00"), 15),
+    ("Hidratação", Decimal("35.00"), 30),
+]
+LOTE = 1000
+
+
+def _dias_uteis(inicio, fim):
+    """Dias entre inicio e fim (exclusive), sem domingos."""
+    dia = inicio
+    while dia < fim:
+        if dia.weekday() != 6:
+            yield dia
+        dia += timedelta(days=1)
+
+
+def popular(seed=42, barbearias=10, barbeiros=3, servicos=4, clientes=200, dias=30, meses=6,
+            ocupacao=0.6, notificacoes=3, saida=None):
+    """
+    Gera uma base sintética, sempre igual para a mesma seed, só com bulk_create.
+
+    Os agendamentos de cada barbeiro são sequenciais dentro do expediente (nunca se
+    sobrepõem) e cobrem `meses` para trás e `dias` para frente; as disponibilidades
+    cobrem os `dias` futuros. Como bulk_create não dispara sinais, os resumos diários,
+    o índice de busca e o cache são atualizados explicitamente no fim. Retorna as
+    quantidades criadas.
+    """
+    rnd = random.Random(seed)
+    log = saida or (lambda mensagem: None)
+    senha = make_password(SENHA)
+    hoje = timezone.localdate()
+    inicio_historico = hoje - timedelta(days=30 * meses)
+    fim_agenda = hoje + timedelta(days=dias)
+
+    with transaction.atomic():
+        lojas = []
+        for i in range(barbearias):
+            cidade, latitude, longitude = CIDADES[i % len(CIDADES)]
+            lojas.append(Barbearia(
+                nome=f"Barbearia {i + 1:03d}", endereco=f"Rua {i + 1}, Centro", cidade=cidade,
+                latitude=latitude + rnd.uniform(-0.05, 0.05), longitude=longitude + rnd.uniform(-0.05, 0.05),
+                telefone=f"1199{i:07d}",
+            ))
+        lojas = Barbearia.objects.bulk_create(lojas)
+        usuarios = [Usuario(username=f"{PREFIXO}superadmin", tipo="superadmin", password=senha)]
+        for loja in lojas:
+            usuarios.append(Usuario(
+                username=f"{PREFIXO}admin{loja.id}", tipo="admin_barbearia", barbearia=loja, password=senha
+            ))
+            usuarios += [
+                Usuario(
+                    username=f"{PREFIXO}barbeiro{loja.id}_{j}", first_name=f"Barbeiro {j + 1}",
+                    tipo="barbeiro", barbearia=loja, password=senha,
+                )
+                for j in range(barbeiros)
+            ]
+        usuarios += [
+            Usuario(username=f"{PREFIXO}cliente{i}", tipo="cliente", telefone=f"1198{i:07d}", password=senha)
+            for i in range(clientes)
+        ]
+        usuarios = Usuario.objects.bulk_create(usuarios, batch_size=LOTE)
+        equipe = [u for u in usuarios if u.tipo == "barbeiro"]
+        fregueses = [u for u in usuarios if u.tipo == "cliente"]
+        log(f"{len(lojas)} barbearias, {len(equipe)} barbeiros, {len(fregueses)} clientes")
+
+        catalogo = Servico.objects.bulk_create([
+            Servico(barbearia_id=barbeiro.barbearia_id, barbeiro=barbeiro, nome=nome, preco=preco,
+                    duracao=timedelta(minutes=minutos))
+            for barbeiro in equipe
+            for nome, preco, minutos in rnd.sample(SERVICOS, min(servicos, len(SERVICOS)))
+        ], batch_size=LOTE)
+        servicos_por_barbeiro = {}
+        for servico in catalogo:
+            servicos_por_barbeiro.setdefault(servico.barbeiro_id, []).append(servico)
+
+        disponibilidades = Disponibilidade.objects.bulk_create([
+            Disponibilidade(barbeiro=barbeiro, dia=dia, hora_inicio=dtime(ABERTURA), hora_fim=dtime(FECHAMENTO))
+            for barbeiro in equipe
+            for dia in _dias_uteis(hoje, fim_agenda)
+        ], batch_size=LOTE)
+
+        agendamentos = []
+        for barbeiro in equipe:
+            opcoes = servicos_por_barbeiro.get(barbeiro.id)
+            if not opcoes:
+                continue
+            for dia in _dias_uteis(inicio_historico, fim_agenda):
+                hora = timezone.make_aware(datetime.combine(dia, dtime(ABERTURA)))
+                fechamento = timezone.make_aware(datetime.combine(dia, dtime(FECHAMENTO)))
+                while hora < fechamento:
+                    servico = rnd.choice(opcoes)
+                    fim = hora + servico.duracao
+                    if fim <= fechamento and rnd.random() < ocupacao:
+                        agendamentos.append(Agendamento(
+                            barbearia_id=barbeiro.barbearia_id, barbeiro=barbeiro, cliente=rnd.choice(fregueses),
+                            servico=servico, data=hora, data_fim=fim,
+                            status="cancelado" if rnd.random() < 0.1 else "ativo",
+                        ))
+                        # Próximo início no primeiro passo da grade depois do término
+                        hora += -(-servico.duracao // PASSO) * PASSO
+                    else:
+                        hora += PASSO
+        agendamentos = Agendamento.objects.bulk_create(agendamentos, batch_size=LOTE)
+        log(f"{len(catalogo)} serviços, {len(disponibilidades)} disponibilidades, {len(agendamentos)} agendamentos")
+
+        avisos = Notificacao.objects.bulk_create([
+            Notificacao(
+                usuario=usuario, mensagem=f"Aviso {k + 1} para {usuario.username}", lida=rnd.random() < 0.7
+            )
+            for usuario in equipe + fregueses
+            for k in range(rnd.randint(0, 2 * notificacoes))
+        ], batch_size=LOTE)
+
+        resumos = reconstruir_resumos(inicio_historico, fim_agenda)
+        indexar(*(loja.id for loja in lojas))
+    invalidar("barbearias", *(f"barbearia:{loja.id}" for loja in lojas))
+    log(f"{len(avisos)} notificações, {resumos} resumos diários")
+
+    return {
+        "barbearias": len(lojas),
+        "usuarios": len(usuarios),
+        "servicos": len(catalogo),
+        "disponibilidades": len(disponibilidades),
+        "agendamentos": len(agendamentos),
+        "notificacoes": len(avisos),
+        "resumos": resumos,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula o banco com dados sintéticos (determinísticos pela --seed) para medir desempenho. "
+        f"Todos os usuários criados começam com '{PREFIXO}' e usam a senha '{SENHA}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--barbearias", type=int, default=10)
+        parser.add_argument("--barbeiros", type=int, default=3, help="Barbeiros por barbearia")
+        parser.add_argument("--servicos", type=int, default=4, help="Serviços por barbeiro")
+        parser.add_argument("--clientes", type=int, default=200)
+        parser.add_argument("--dias", type=int, default=30, help="Dias futuros com disponibilidade")
+        parser.add_argument("--meses", type=int, default=6, help="Meses de histórico de agendamentos")
+        parser.add_argument("--ocupacao", type=float, default=0.6, help="Fração dos horários ocupados")
+        parser.add_argument("--notificacoes", type=int, default=3, help="Média de notificações por usuário")
+
+    def handle(self, *args, **opts):
+        if Usuario.objects.filter(username__startswith=PREFIXO).exists():
+            raise CommandError("O banco já tem dados sintéticos: use uma base nova (veja DATABASE_URL).")
+
+        parametros = {
+            chave: opts[chave]
+            for chave in ("seed", "barbearias", "barbeiros", "servicos", "clientes", "dias", "meses",
+                          "ocupacao", "notificacoes")
+        }
+        totais = popular(**parametros, saida=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{quantidade} {nome}" for nome, quantidade in totais.items())
+        ))
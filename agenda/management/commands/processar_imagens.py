@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from agenda.imagens import processar_variantes, variantes
+from agenda.models import Barbearia, Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas (JPEG/PNG e WebP) dos logos e fotos já enviados. Uploads novos são "
+        "processados automaticamente; use este comando para imagens anteriores ao pipeline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forcar", action="store_true", help="Regera também as que já têm variantes")
+
+    def handle(self, *args, **opts):
+        campos = [
+            b.logo for b in Barbearia.objects.exclude(logo="").exclude(logo__isnull=True).only("logo", "logo_larguras")
+        ]
+        campos += [
+            u.foto for u in Usuario.objects.exclude(foto="").exclude(foto__isnull=True)
+            .only("foto", "foto_larguras", "barbearia_id")
+        ]
+        geradas = ignoradas = falhas = 0
+        for campo in campos:
+            if variantes(campo) and not opts["forcar"]:
+                ignoradas += 1
+                continue
+            try:
+                geradas += len(processar_variantes(campo, forcar=opts["forcar"]))
+            except (OSError, ValueError) as erro:
+                falhas += 1
+                self.stderr.write(f"{campo.name}: {erro}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{geradas} variantes geradas, {ignoradas} imagens já processadas, {falhas} falhas"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from agenda.busca import reindexar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o texto de busca de todas as barbearias e reconstrói o índice FTS5 (SQLite). "
+        "Cadastros pelo site são indexados automaticamente; use após cargas ou SQL direto no banco."
+    )
+
+    def handle(self, *args, **opts):
+        alteradas = reindexar()
+        self.stdout.write(self.style.SUCCESS(f"{alteradas} barbearias reindexadas"))
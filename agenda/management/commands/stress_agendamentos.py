@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from agenda.agendamentos import HorarioIndisponivel, criar_agendamento
+from agenda.models import Agendamento, Barbearia, Disponibilidade, Servico, Usuario
+
+
+def contar_sobreposicoes(barbeiro_ids):
+    """Pares de agendamentos ativos do mesmo barbeiro que se sobrepõem."""
+    sobreposicoes = 0
+    agendamentos = (
+        Agendamento.objects.ativos().filter(barbeiro_id__in=barbeiro_ids)
+        .order_by("barbeiro_id", "data")
+        .values_list("barbeiro_id", "data", "data_fim")
+    )
+    anterior = None
+    for barbeiro_id, inicio, fim in agendamentos:
+        if anterior and anterior[0] == barbeiro_id and inicio < anterior[1]:
+            sobreposicoes += 1
+        if not anterior or anterior[0] != barbeiro_id or fim > anterior[1]:
+            anterior = (barbeiro_id, fim)
+    return sobreposicoes
+
+
+def disputar_horarios(barbeiros, servicos, clientes, inicios, threads):
+    """
+    Dispara `threads` threads que tentam reservar, todas ao mesmo tempo, cada
+    horário de `inicios` com cada barbeiro. Retorna contadores e vazão.
+    """
+    tentativas = [
+        (cliente, barbeiro, servicos[barbeiro.pk], inicio)
+        for inicio in inicios
+        for barbeiro in barbeiros
+        for cliente in clientes
+    ]
+    resultados = Counter()
+    trava = threading.Lock()
+    largada = threading.Barrier(threads)
+
+    def trabalhador(fatia):
+        largada.wait()
+        try:
+            for cliente, barbeiro, servico, inicio in fatia:
+                try:
+                    criar_agendamento(cliente, barbeiro, servico, inicio)
+                    chave = "sucesso"
+                except HorarioIndisponivel:
+                    chave = "recusado"
+                except Exception:
+                    chave = "erro"
+                with trava:
+                    resultados[chave] += 1
+        finally:
+            connection.close()
+
+    grupo = [threading.Thread(target=trabalhador, args=(tentativas[i::threads],)) for i in range(threads)]
+    inicio_teste = time.perf_counter()
+    for t in grupo:
+        t.start()
+    for t in grupo:
+        t.join()
+    duracao = time.perf_counter() - inicio_teste
+
+    return {
+        "tentativas": len(tentativas),
+        "sucesso": resultados["sucesso"],
+        "recusado": resultados["recusado"],
+        "erro": resultados["erro"],
+        "segundos": duracao,
+        "tentativas_por_segundo": len(tentativas) / duracao if duracao else 0,
+        "sobreposicoes": contar_sobreposicoes([b.pk for b in barbeiros]),
+    }
+
+
+class Command(BaseCommand):
+    help = "Teste de estresse: várias threads disputando os mesmos horários de agendamento."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--barbeiros", type=int, default=2)
+        parser.add_argument("--clientes", type=int, default=8)
+        parser.add_argument("--horarios", type=int, default=10, help="Horários de 30 minutos disputados")
+
+    def handle(self, *args, **opts):
+        dia = timezone.localdate() + timedelta(days=1)
+        barbearia = Barbearia.objects.create(nome="Estresse")
+        barbeiros, clientes = [], []
+        try:
+            barbeiros = [
+                Usuario.objects.create(username=f"stress_barbeiro_{i}", tipo="barbeiro", barbearia=barbearia)
+                for i in range(opts["barbeiros"])
+            ]
+            clientes = [
+                Usuario.objects.create(username=f"stress_cliente_{i}", tipo="cliente")
+                for i in range(opts["clientes"])
+            ]
+            servicos = {}
+            for b in barbeiros:
+                servicos[b.pk] = Servico.objects.create(
+                    barbearia=barbearia, barbeiro=b, nome="Corte", preco=40, duracao=timedelta(minutes=30)
+                )
+                Disponibilidade.objects.create(barbeiro=b, dia=dia, hora_inicio=dtime(8), hora_fim=dtime(22))
+            abertura = timezone.make_aware(datetime.combine(dia, dtime(8)))
+            inicios = [abertura + timedelta(minutes=30 * i) for i in range(opts["horarios"])]
+
+            r = disputar_horarios(barbeiros, servicos, clientes, inicios, opts["threads"])
+            self.stdout.write(
+                f"tentativas={r['tentativas']} sucesso={r['sucesso']} recusado={r['recusado']} erro={r['erro']} "
+                f"vazao={r['tentativas_por_segundo']:.1f}/s sobreposicoes={r['sobreposicoes']}"
+            )
+            if r["sobreposicoes"]:
+                self.stderr.write(self.style.ERROR("Agendamentos duplicados encontrados!"))
+        finally:
+            Usuario.objects.filter(pk__in=[u.pk for u in barbeiros + clientes]).delete()
+            barbearia.delete()
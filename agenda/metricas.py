@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, DateField, F, Max, Subquery, Sum, Value
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils.timezone import localdate
+
+# Agrupamentos aceitos: função de truncamento de ResumoDiario.dia e formato do rótulo
+AGRUPAMENTOS = {
+    "dia": (None, "%d/%m"),
+    "semana": (TruncWeek, "%d/%m"),
+    "mes": (TruncMonth, "%m/%Y"),
+}
+PERIODOS = (7, 30, 90)
+
+
+def inicio_do_periodo(dia, agrupamento):
+    """Primeiro dia do balde que contém `dia`."""
+    if agrupamento == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if agrupamento == "mes":
+        return dia.replace(day=1)
+    return dia
+
+
+def proximo_periodo(dia, agrupamento):
+    if agrupamento == "semana":
+        return dia + timedelta(days=7)
+    if agrupamento == "mes":
+        return date(dia.year + dia.month // 12, dia.month % 12 + 1, 1)
+    return dia + timedelta(days=1)
+
+
+def serie_temporal(resumos, dias=7, agrupamento="dia"):
+    """
+    Quantidade e faturamento de agendamentos ativos nos últimos `dias`, por dia,
+    semana ou mês, com uma única consulta GROUP BY sobre ResumoDiario.
+    O início recua até o começo da semana ou do mês, para o primeiro balde não
+    sair cortado. Períodos sem agendamentos são preenchidos com zero.
+    """
+    trunc, formato = AGRUPAMENTOS[agrupamento]
+    hoje = localdate()
+    inicio = inicio_do_periodo(hoje - timedelta(days=dias - 1), agrupamento)
+
+    periodo = F("dia") if trunc is None else trunc("dia", output_field=DateField())
+    linhas = (
+        resumos.filter(dia__range=(inicio, hoje))
+        .annotate(periodo=periodo)
+        .order_by()
+        .values("periodo")
+        .annotate(total=Sum("agendamentos"), faturamento=Sum("faturamento"))
+    )
+    por_periodo = {linha["periodo"]: linha for linha in linhas}
+
+    serie = []
+    periodo = inicio
+    while periodo <= hoje:
+        linha = por_periodo.get(periodo, {})
+        serie.append({
+            "data": periodo.strftime(formato),
+            "total": linha.get("total") or 0,
+            "faturamento": linha.get("faturamento") or 0,
+        })
+        periodo = proximo_periodo(periodo, agrupamento)
+    return serie
+
+
+def indicadores(resumos, agendamentos):
+    """
+    Total de agendamentos ativos, clientes distintos e ticket médio em uma consulta.
+
+    Total e faturamento somam o ResumoDiario. Clientes distintos não se somam entre
+    dias: vêm de uma subconsulta sobre os agendamentos ativos, no mesmo SELECT.
+    O ticket médio é o faturamento dividido pelos agendamentos ativos, então um
+    agendamento sem serviço entra na média como R$ 0.
+    """
+    clientes = (
+        agendamentos.ativos().order_by()
+        .annotate(todos=Value(1)).values("todos")  # um único grupo: COUNT sobre todas as linhas
+        .annotate(n=Count("cliente", distinct=True)).values("n")
+    )
+    totais = resumos.aggregate(
+        total=Sum("agendamentos"), faturamento=Sum("faturamento"), clientes=Max(Subquery(clientes)),
+    )
+    total = totais["total"] or 0
+    return {
+        "total_agendamentos": total,
+        "total_clientes": totais["clientes"] or 0,
+        "ticket_medio": totais["faturamento"] / total if total else 0,
+    }
@@ -0,0 +1,62 @@
+from urllib.parse import urlparse
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.string_utils import ensure_leading_trailing_slash
+
+from .armazenamento import NOME_POR_CONTEUDO
+
+
+class MidiaMiddleware(WhiteNoise):
+    """
+    Serve MEDIA_ROOT com o WhiteNoise: ETag, Last-Modified, 304 e Range.
+
+    Nomes gerados por ArmazenamentoPorConteudo (e suas variantes) recebem
+    Cache-Control imutável de um ano+; os demais (uploads antigos), max-age curto.
+    Como a mídia muda em tempo de execução, o disco é consultado a cada requisição,
+    exceto para os arquivos imutáveis já encontrados, guardados em memória.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        super().__init__(
+            application=None,
+            autorefresh=True,
+            max_age=settings.AGENDA_MIDIA_MAX_AGE,
+            allow_all_origins=False,
+        )
+        self.prefixo = ensure_leading_trailing_slash(urlparse(settings.MEDIA_URL).path)
+        self.add_files(settings.MEDIA_ROOT, prefix=self.prefixo)
+
+    def immutable_file_test(self, path, url):
+        return bool(NOME_POR_CONTEUDO.search(url))
+
+    def servir(self, request):
+        """Resposta do arquivo de mídia pedido, ou None se não houver (segue para as views)."""
+        url = request.path_info
+        arquivo = self.files.get(url) or self.find_file(url)
+        if arquivo is None:
+            return None
+        if self.immutable_file_test(None, url):
+            self.files[url] = arquivo
+        return WhiteNoiseMiddleware.serve(arquivo, request)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        resposta = self.servir(request) if request.path_info.startswith(self.prefixo) else None
+        return self.get_response(request) if resposta is None else resposta
+
+    async def __acall__(self, request):
+        # Só a mídia (stat e abertura do arquivo) vai para uma thread; as views seguem direto
+        resposta = None
+        if request.path_info.startswith(self.prefixo):
+            resposta = await sync_to_async(self.servir)(request)
+        return await self.get_response(request) if resposta is None else resposta
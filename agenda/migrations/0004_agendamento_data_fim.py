@@ -0,0 +1,120 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:47
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+POSTGRES_CRIAR = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE agenda_agendamento ADD CONSTRAINT agendamento_sem_sobreposicao
+    EXCLUDE USING gist (barbeiro_id WITH =, tstzrange(data, data_fim, '[)') WITH &&)
+    WHERE (status = 'ativo')
+    """,
+]
+POSTGRES_REMOVER = [
+    "ALTER TABLE agenda_agendamento DROP CONSTRAINT IF EXISTS agendamento_sem_sobreposicao",
+]
+
+# SQLite não tem exclusion constraint: triggers abortam inserts/updates sobrepostos
+SQLITE_CONDICAO = """
+    NEW.status = 'ativo' AND EXISTS (
+        SELECT 1 FROM agenda_agendamento a
+        WHERE a.barbeiro_id = NEW.barbeiro_id
+          AND a.status = 'ativo'
+          AND a.id <> COALESCE(NEW.id, -1)
+          AND a.data < NEW.data_fim
+          AND a.data_fim > NEW.data
+    )
+"""
+SQLITE_CRIAR = [
+    f"""
+    CREATE TRIGGER agendamento_sem_sobreposicao_{evento.lower()}
+    BEFORE {evento} ON agenda_agendamento
+    WHEN {SQLITE_CONDICAO}
+    BEGIN
+        SELECT RAISE(ABORT, 'agendamento_sem_sobreposicao');
+    END
+    """
+    for evento in ("INSERT", "UPDATE")
+]
+SQLITE_REMOVER = [
+    "DROP TRIGGER IF EXISTS agendamento_sem_sobreposicao_insert",
+    "DROP TRIGGER IF EXISTS agendamento_sem_sobreposicao_update",
+]
+
+
+def preencher_data_fim(apps, schema_editor):
+    Agendamento = apps.get_model("agenda", "Agendamento")
+    pendentes = Agendamento.objects.filter(data_fim__isnull=True).select_related("servico")
+    for agendamento in pendentes.iterator():
+        duracao = agendamento.servico.duracao if agendamento.servico else None
+        agendamento.data_fim = agendamento.data + (duracao or timedelta(minutes=30))
+        agendamento.save(update_fields=["data_fim"])
+
+
+def cancelar_sobrepostos(apps, schema_editor):
+    """
+    A proteção não pode ser criada com dados que já a violam: de cada grupo de
+    agendamentos ativos sobrepostos do mesmo barbeiro, fica o que começa primeiro
+    e os seguintes são cancelados, com o motivo em mensagem_cancelamento.
+    """
+    Agendamento = apps.get_model("agenda", "Agendamento")
+    ativos = (
+        Agendamento.objects.filter(status="ativo")
+        .order_by("barbeiro_id", "data", "id")
+        .values_list("id", "barbeiro_id", "data", "data_fim")
+    )
+    conflitos = {}
+    barbeiro_atual, mantido, fim_mantido = None, None, None
+    for agendamento_id, barbeiro_id, data, data_fim in ativos.iterator():
+        if barbeiro_id == barbeiro_atual and data < fim_mantido:
+            conflitos[agendamento_id] = mantido
+            continue
+        barbeiro_atual, mantido, fim_mantido = barbeiro_id, agendamento_id, data_fim
+
+    for agendamento_id, mantido in conflitos.items():
+        Agendamento.objects.filter(id=agendamento_id).update(
+            status="cancelado",
+            mensagem_cancelamento=f"Cancelado automaticamente: sobreposto ao agendamento #{mantido} do mesmo barbeiro.",
+        )
+
+
+def _executar(schema_editor, comandos):
+    for sql in comandos:
+        schema_editor.execute(sql)
+
+
+def criar_protecao(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _executar(schema_editor, POSTGRES_CRIAR)
+    elif vendor == "sqlite":
+        _executar(schema_editor, SQLITE_CRIAR)
+
+
+def remover_protecao(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _executar(schema_editor, POSTGRES_REMOVER)
+    elif vendor == "sqlite":
+        _executar(schema_editor, SQLITE_REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0003_alter_barbearia_options_alter_servico_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendamento',
+            name='data_fim',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Término'),
+        ),
+        migrations.RunPython(preencher_data_fim, migrations.RunPython.noop),
+        migrations.RunPython(cancelar_sobrepostos, migrations.RunPython.noop),
+        migrations.RunPython(criar_protecao, remover_protecao),
+    ]
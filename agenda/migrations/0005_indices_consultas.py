@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0004_agendamento_data_fim'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['barbeiro', 'status', 'data'], name='agend_barbeiro_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(condition=models.Q(('status', 'ativo')), fields=['barbeiro', 'data'], name='agend_barbeiro_ativo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['barbearia', 'data'], name='agend_barbearia_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['cliente', 'data'], name='agend_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disponibilidade',
+            index=models.Index(fields=['barbeiro', 'dia', 'hora_inicio'], name='disp_barbeiro_dia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['usuario', 'lida', 'criado_em'], name='notif_usuario_lida_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0005_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('agendamentos', models.PositiveIntegerField(default=0, verbose_name='Agendamentos ativos')),
+                ('cancelamentos', models.PositiveIntegerField(default=0, verbose_name='Cancelamentos')),
+                ('faturamento', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento (R$)')),
+                ('clientes', models.PositiveIntegerField(default=0, verbose_name='Clientes distintos')),
+                ('barbearia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to='agenda.barbearia', verbose_name='Barbearia')),
+                ('barbeiro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário',
+                'verbose_name_plural': 'Resumos Diários',
+                'ordering': ['dia'],
+                'indexes': [models.Index(fields=['barbearia', 'dia'], name='resumo_barbearia_dia_idx'), models.Index(fields=['barbeiro', 'dia'], name='resumo_barbeiro_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('barbearia', 'barbeiro', 'dia'), name='resumo_diario_unico')],
+            },
+        ),
+    ]
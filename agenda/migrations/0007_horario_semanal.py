@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0006_resumo_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExcecaoHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('tipo', models.CharField(choices=[('folga', 'Folga'), ('extra', 'Horário extra')], max_length=10, verbose_name='Tipo')),
+                ('hora_inicio', models.TimeField(blank=True, null=True, verbose_name='Início')),
+                ('hora_fim', models.TimeField(blank=True, null=True, verbose_name='Fim')),
+                ('barbeiro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes_horario', to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Horário',
+                'verbose_name_plural': 'Exceções de Horário',
+                'ordering': ['dia', 'hora_inicio'],
+                'indexes': [models.Index(fields=['barbeiro', 'dia'], name='excecao_barbeiro_dia_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HorarioSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da semana')),
+                ('hora_inicio', models.TimeField(verbose_name='Início')),
+                ('hora_fim', models.TimeField(verbose_name='Fim')),
+                ('valido_de', models.DateField(verbose_name='Válido a partir de')),
+                ('valido_ate', models.DateField(blank=True, null=True, verbose_name='Válido até')),
+                ('barbeiro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios_semanais', to=settings.AUTH_USER_MODEL, verbose_name='Barbeiro')),
+            ],
+            options={
+                'verbose_name': 'Horário Semanal',
+                'verbose_name_plural': 'Horários Semanais',
+                'ordering': ['dia_semana', 'hora_inicio'],
+                'indexes': [models.Index(fields=['barbeiro', 'dia_semana'], name='semanal_barbeiro_dia_idx')],
+            },
+        ),
+    ]
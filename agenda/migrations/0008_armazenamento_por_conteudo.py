@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:22
+
+import agenda.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0007_horario_semanal'),
+    ]
+
+    # storage não muda o schema: só o estado, sem recriar as tabelas no SQLite
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='barbearia',
+                name='logo',
+                field=models.ImageField(blank=True, null=True, storage=agenda.armazenamento.armazenamento_midia, upload_to='logos/', verbose_name='Logotipo'),
+            ),
+            migrations.AlterField(
+                model_name='usuario',
+                name='foto',
+                field=models.ImageField(blank=True, null=True, storage=agenda.armazenamento.armazenamento_midia, upload_to='fotos_barbeiro/', verbose_name='Foto'),
+            ),
+        ]),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+POSTGRES_CRIAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS barbearia_busca_trgm_idx ON agenda_barbearia USING gin (busca gin_trgm_ops)",
+]
+POSTGRES_REMOVER = [
+    "DROP INDEX IF EXISTS barbearia_busca_trgm_idx",
+]
+
+# FTS5 com conteúdo próprio (não "external content"): sobrevive às recriações de
+# agenda_barbearia que o SQLite faz em AlterField; mantido por agenda.busca.indexar
+SQLITE_CRIAR = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS agenda_barbearia_busca
+    USING fts5(busca, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+    "INSERT INTO agenda_barbearia_busca(rowid, busca) SELECT id, busca FROM agenda_barbearia",
+]
+SQLITE_REMOVER = [
+    "DROP TABLE IF EXISTS agenda_barbearia_busca",
+]
+
+
+def preencher_busca(apps, schema_editor):
+    from agenda.busca import documento
+
+    Barbearia = apps.get_model("agenda", "Barbearia")
+    Servico = apps.get_model("agenda", "Servico")
+    servicos = {}
+    for barbearia_id, nome in Servico.objects.values_list("barbearia_id", "nome"):
+        servicos.setdefault(barbearia_id, []).append(nome)
+    for barbearia in Barbearia.objects.all():
+        barbearia.busca = documento(barbearia.nome, barbearia.endereco, barbearia.cidade, servicos.get(barbearia.id, []))
+        barbearia.save(update_fields=["busca"])
+
+
+def _executar(schema_editor, comandos):
+    for sql in comandos:
+        schema_editor.execute(sql)
+
+
+def criar_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _executar(schema_editor, POSTGRES_CRIAR)
+    elif vendor == "sqlite":
+        _executar(schema_editor, SQLITE_CRIAR)
+
+
+def remover_indice_busca(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _executar(schema_editor, POSTGRES_REMOVER)
+    elif vendor == "sqlite":
+        _executar(schema_editor, SQLITE_REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0008_armazenamento_por_conteudo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barbearia',
+            name='cidade',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Cidade'),
+        ),
+        migrations.AddField(
+            model_name='barbearia',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Texto de busca'),
+        ),
+        migrations.AddIndex(
+            model_name='barbearia',
+            index=models.Index(fields=['nome', 'id'], name='barbearia_nome_idx'),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
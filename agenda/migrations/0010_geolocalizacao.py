@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0009_busca_barbearias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cep',
+            fields=[
+                ('cep', models.CharField(max_length=8, primary_key=True, serialize=False, verbose_name='CEP')),
+                ('latitude', models.FloatField(verbose_name='Latitude')),
+                ('longitude', models.FloatField(verbose_name='Longitude')),
+                ('cidade', models.CharField(blank=True, default='', max_length=100, verbose_name='Cidade')),
+                ('uf', models.CharField(blank=True, default='', max_length=2, verbose_name='UF')),
+            ],
+            options={
+                'verbose_name': 'CEP',
+                'verbose_name_plural': 'CEPs',
+            },
+        ),
+        migrations.AddField(
+            model_name='barbearia',
+            name='cep',
+            field=models.CharField(blank=True, max_length=9, null=True, verbose_name='CEP'),
+        ),
+        migrations.AddField(
+            model_name='barbearia',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='barbearia',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='barbearia',
+            index=models.Index(fields=['latitude', 'longitude'], name='barbearia_lat_lon_idx'),
+        ),
+    ]
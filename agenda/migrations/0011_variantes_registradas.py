@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def registrar_existentes(apps, schema_editor):
+    """Larguras das imagens já processadas, conferidas no storage uma única vez."""
+    from agenda.imagens import formato_fallback, nome_variante
+
+    larguras = list(settings.AGENDA_IMAGEM_LARGURAS)
+    for modelo, campo in (("Barbearia", "logo"), ("Usuario", "foto")):
+        Modelo = apps.get_model("agenda", modelo)
+        processadas = []
+        for instancia in Modelo.objects.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True}).only("pk", campo):
+            arquivo = getattr(instancia, campo)
+            if arquivo.storage.exists(nome_variante(arquivo.name, larguras[0], formato_fallback(arquivo.name))):
+                setattr(instancia, f"{campo}_larguras", larguras)
+                processadas.append(instancia)
+        Modelo.objects.bulk_update(processadas, [f"{campo}_larguras"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0010_geolocalizacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barbearia',
+            name='logo_larguras',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Larguras das variantes'),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='foto_larguras',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Larguras das variantes'),
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
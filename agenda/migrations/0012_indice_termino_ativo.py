@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0011_variantes_registradas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='agendamento',
+            name='agend_barbeiro_ativo_idx',
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(condition=models.Q(('status', 'ativo')), fields=['barbeiro', 'data_fim'], name='agend_barbeiro_fim_ativo_idx'),
+        ),
+    ]
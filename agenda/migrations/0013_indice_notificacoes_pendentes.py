@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0012_indice_termino_ativo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificacao',
+            name='notif_usuario_lida_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(condition=models.Q(('lida', False)), fields=['usuario', 'criado_em'], name='notif_usuario_pendentes_idx'),
+        ),
+    ]
@@ -2,23 +2,66 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from datetime import timedelta
 
+from .armazenamento import armazenamento_midia
+
 # ------------------ BARBEARIA ------------------
 class Barbearia(models.Model):
     nome = models.CharField("Nome da Barbearia", max_length=150)
     descricao = models.TextField("Descrição", blank=True, null=True)
     endereco = models.CharField("Endereço", max_length=255, blank=True, null=True)
+    cidade = models.CharField("Cidade", max_length=100, blank=True, null=True)
+    cep = models.CharField("CEP", max_length=9, blank=True, null=True)
+    # Preenchidas pelo CEP (agenda/geo.py) ou à mão no admin
+    latitude = models.FloatField("Latitude", blank=True, null=True)
+    longitude = models.FloatField("Longitude", blank=True, null=True)
     telefone = models.CharField("Telefone", max_length=20, blank=True, null=True)
-    logo = models.ImageField("Logotipo", upload_to='logos/', blank=True, null=True)
+    logo = models.ImageField("Logotipo", upload_to='logos/', storage=armazenamento_midia, blank=True, null=True)
+    # Larguras das miniaturas já geradas do logo (agenda/imagens.py)
+    logo_larguras = models.JSONField("Larguras das variantes", default=list, blank=True, editable=False)
     criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+    # Nome, endereço, cidade e serviços normalizados (ver agenda/busca.py)
+    busca = models.TextField("Texto de busca", blank=True, default="", editable=False)
 
     class Meta:
         verbose_name = "Barbearia"
         verbose_name_plural = "Barbearias"
         ordering = ["nome"]
+        indexes = [
+            # Paginação por chave da home
+            models.Index(fields=["nome", "id"], name="barbearia_nome_idx"),
+            # Pré-filtro retangular da busca por proximidade
+            models.Index(fields=["latitude", "longitude"], name="barbearia_lat_lon_idx"),
+        ]
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # CEP carregado, para só geocodificar de novo quando ele mudar
+        instancia._cep_original = instancia.__dict__.get("cep")
+        # Logo carregado e suas variantes, apagadas quando ele for trocado
+        instancia._imagem_original = (instancia.__dict__.get("logo"), instancia.__dict__.get("logo_larguras"))
+        return instancia
+
+
+# ------------------ CEP ------------------
+class Cep(models.Model):
+    """Coordenadas de um CEP, da base local importada com `importar_ceps`."""
+    cep = models.CharField("CEP", max_length=8, primary_key=True)  # só os 8 dígitos
+    latitude = models.FloatField("Latitude")
+    longitude = models.FloatField("Longitude")
+    cidade = models.CharField("Cidade", max_length=100, blank=True, default="")
+    uf = models.CharField("UF", max_length=2, blank=True, default="")
+
+    class Meta:
+        verbose_name = "CEP"
+        verbose_name_plural = "CEPs"
+
+    def __str__(self):
+        return self.cep
+
 
 # ------------------ USUÁRIO ------------------
 class Usuario(AbstractUser):
@@ -62,7 +105,8 @@ class Usuario(AbstractUser):
     numero = models.CharField("Número", max_length=10, blank=True, null=True)
     complemento = models.CharField("Complemento", max_length=50, blank=True, null=True)
     observacao = models.TextField("Observação", blank=True, null=True)
-    foto = models.ImageField("Foto", upload_to='fotos_barbeiro/', blank=True, null=True)
+    foto = models.ImageField("Foto", upload_to='fotos_barbeiro/', storage=armazenamento_midia, blank=True, null=True)
+    foto_larguras = models.JSONField("Larguras das variantes", default=list, blank=True, editable=False)
 
     # Comissão do barbeiro
     comissao = models.DecimalField("Comissão (%)", max_digits=5, decimal_places=2, default=0.0)
@@ -75,6 +119,14 @@ class Usuario(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_tipo_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Barbearia carregada, para invalidar também o cache da barbearia antiga ao trocar
+        instancia._barbearia_original = instancia.__dict__.get("barbearia_id")
+        instancia._imagem_original = (instancia.__dict__.get("foto"), instancia.__dict__.get("foto_larguras"))
+        return instancia
+
 
 # ------------------ SERVIÇOS ------------------
 class Servico(models.Model):
@@ -102,8 +154,34 @@ class Servico(models.Model):
     def __str__(self):
         return f"{self.nome} - {self.barbeiro.username} ({self.barbearia.nome})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Duração e preço carregados: término dos agendamentos e resumos só recalculados quando mudam
+        instancia._duracao_original = instancia.__dict__.get("duracao")
+        instancia._preco_original = instancia.__dict__.get("preco")
+        return instancia
+
 
 # ------------------ AGENDAMENTO ------------------
+class AgendamentoQuerySet(models.QuerySet):
+    def ativos(self):
+        return self.filter(status="ativo")
+
+    def da_barbearia(self, barbearia):
+        return self.filter(barbearia=barbearia)
+
+    def com_relacoes(self):
+        """Cliente, barbeiro, serviço e barbearia na mesma consulta, só com as colunas usadas nas listagens e no __str__."""
+        return self.select_related("cliente", "barbeiro", "servico", "barbearia").only(
+            "data", "data_fim", "status",
+            "cliente__username", "cliente__telefone",
+            "barbeiro__username", "barbeiro__first_name", "barbeiro__apelido",
+            "servico__nome", "servico__preco", "servico__duracao",
+            "barbearia__nome", "barbearia__telefone",
+        )
+
+
 class Agendamento(models.Model):
     STATUS_CHOICES = (
         ("ativo", "Ativo"),
@@ -136,19 +214,48 @@ class Agendamento(models.Model):
         verbose_name="Serviço"
     )
     data = models.DateTimeField("Data e Hora")
+    # Fim do atendimento (data + duração do serviço), usado nas verificações de sobreposição
+    data_fim = models.DateTimeField("Término", null=True, blank=True, editable=False)
     criado_em = models.DateTimeField("Criado em", auto_now_add=True)
     status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default="ativo")
     mensagem_cancelamento = models.TextField("Mensagem de Cancelamento", blank=True, null=True)
 
+    objects = AgendamentoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Agendamento"
         verbose_name_plural = "Agendamentos"
         ordering = ["-data"]
+        indexes = [
+            # Verificação de conflito e agenda do barbeiro
+            models.Index(fields=["barbeiro", "status", "data"], name="agend_barbeiro_status_data_idx"),
+            # Apenas agendamentos ativos: horários livres (data_fim > início da janela)
+            models.Index(
+                fields=["barbeiro", "data_fim"], condition=models.Q(status="ativo"), name="agend_barbeiro_fim_ativo_idx"
+            ),
+            # Dashboards da barbearia
+            models.Index(fields=["barbearia", "data"], name="agend_barbearia_data_idx"),
+            # Agenda do cliente
+            models.Index(fields=["cliente", "data"], name="agend_cliente_data_idx"),
+        ]
 
     def __str__(self):
         servico_nome = self.servico.nome if self.servico else "Serviço"
         return f"{servico_nome} - {self.cliente.username} com {self.barbeiro.username} ({self.barbearia.nome}) em {self.data.strftime('%d/%m/%Y %H:%M')}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Guarda a chave carregada para que o resumo diário antigo seja recalculado ao remarcar
+        campos = instancia.__dict__
+        if all(c in campos for c in ("barbearia_id", "barbeiro_id", "data")):
+            instancia._original = (instancia.barbearia_id, instancia.barbeiro_id, instancia.data)
+        return instancia
+
+    def save(self, *args, **kwargs):
+        self.data_fim = self.horario_fim
+        super().save(*args, **kwargs)
+
     @property
     def horario_fim(self):
         if self.servico and self.servico.duracao:
@@ -172,11 +279,84 @@ class Disponibilidade(models.Model):
         verbose_name = "Disponibilidade"
         verbose_name_plural = "Disponibilidades"
         ordering = ["dia", "hora_inicio"]
+        indexes = [
+            models.Index(fields=["barbeiro", "dia", "hora_inicio"], name="disp_barbeiro_dia_idx"),
+        ]
 
     def __str__(self):
         return f"{self.barbeiro.username} - {self.dia.strftime('%d/%m/%Y')} {self.hora_inicio.strftime('%H:%M')} às {self.hora_fim.strftime('%H:%M')}"
 
 
+# ------------------ HORÁRIO SEMANAL ------------------
+class HorarioSemanal(models.Model):
+    """Expediente que se repete toda semana; expandido só para os dias consultados."""
+    DIAS_SEMANA = (
+        (0, "Segunda-feira"),
+        (1, "Terça-feira"),
+        (2, "Quarta-feira"),
+        (3, "Quinta-feira"),
+        (4, "Sexta-feira"),
+        (5, "Sábado"),
+        (6, "Domingo"),
+    )
+
+    barbeiro = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name="horarios_semanais",
+        verbose_name="Barbeiro"
+    )
+    dia_semana = models.PositiveSmallIntegerField("Dia da semana", choices=DIAS_SEMANA)
+    hora_inicio = models.TimeField("Início")
+    hora_fim = models.TimeField("Fim")
+    valido_de = models.DateField("Válido a partir de")
+    valido_ate = models.DateField("Válido até", blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Horário Semanal"
+        verbose_name_plural = "Horários Semanais"
+        ordering = ["dia_semana", "hora_inicio"]
+        indexes = [
+            models.Index(fields=["barbeiro", "dia_semana"], name="semanal_barbeiro_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.barbeiro.username} - {self.get_dia_semana_display()} {self.hora_inicio.strftime('%H:%M')} às {self.hora_fim.strftime('%H:%M')}"
+
+
+class ExcecaoHorario(models.Model):
+    """Folga (o dia todo ou um trecho) ou horário extra em um dia específico."""
+    TIPO_CHOICES = (
+        ("folga", "Folga"),
+        ("extra", "Horário extra"),
+    )
+
+    barbeiro = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name="excecoes_horario",
+        verbose_name="Barbeiro"
+    )
+    dia = models.DateField("Dia")
+    tipo = models.CharField("Tipo", max_length=10, choices=TIPO_CHOICES)
+    # Folga sem horários vale para o dia inteiro
+    hora_inicio = models.TimeField("Início", blank=True, null=True)
+    hora_fim = models.TimeField("Fim", blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Exceção de Horário"
+        verbose_name_plural = "Exceções de Horário"
+        ordering = ["dia", "hora_inicio"]
+        indexes = [
+            models.Index(fields=["barbeiro", "dia"], name="excecao_barbeiro_dia_idx"),
+        ]
+
+    def __str__(self):
+        if self.hora_inicio and self.hora_fim:
+            return f"{self.barbeiro.username} - {self.get_tipo_display()} {self.dia.strftime('%d/%m/%Y')} {self.hora_inicio.strftime('%H:%M')} às {self.hora_fim.strftime('%H:%M')}"
+        return f"{self.barbeiro.username} - {self.get_tipo_display()} {self.dia.strftime('%d/%m/%Y')}"
+
+
 # ------------------ NOTIFICAÇÃO ------------------
 class Notificacao(models.Model):
     usuario = models.ForeignKey(
@@ -193,6 +373,50 @@ class Notificacao(models.Model):
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
         ordering = ["-criado_em"]
+        indexes = [
+            # Polling de notificações não lidas. Parcial: o Django escreve lida=False como
+            # "NOT lida", que o SQLite não casa com uma coluna do índice, mas casa com a condição
+            models.Index(
+                fields=["usuario", "criado_em"], condition=models.Q(lida=False), name="notif_usuario_pendentes_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.usuario.username} - {self.mensagem[:30]}..."
+
+
+# ------------------ RESUMO DIÁRIO ------------------
+class ResumoDiario(models.Model):
+    """Totais de agendamentos por barbearia, barbeiro e dia, mantidos por agenda.resumos."""
+    barbearia = models.ForeignKey(
+        Barbearia,
+        on_delete=models.CASCADE,
+        related_name="resumos",
+        verbose_name="Barbearia"
+    )
+    barbeiro = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name="resumos",
+        verbose_name="Barbeiro"
+    )
+    dia = models.DateField("Dia")
+    agendamentos = models.PositiveIntegerField("Agendamentos ativos", default=0)
+    cancelamentos = models.PositiveIntegerField("Cancelamentos", default=0)
+    faturamento = models.DecimalField("Faturamento (R$)", max_digits=12, decimal_places=2, default=0)
+    clientes = models.PositiveIntegerField("Clientes distintos", default=0)
+
+    class Meta:
+        verbose_name = "Resumo Diário"
+        verbose_name_plural = "Resumos Diários"
+        ordering = ["dia"]
+        constraints = [
+            models.UniqueConstraint(fields=["barbearia", "barbeiro", "dia"], name="resumo_diario_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["barbearia", "dia"], name="resumo_barbearia_dia_idx"),
+            models.Index(fields=["barbeiro", "dia"], name="resumo_barbeiro_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.barbeiro.username} - {self.dia.strftime('%d/%m/%Y')}: {self.agendamentos} agendamentos"
@@ -0,0 +1,138 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+
+SECOES = {"proximos": "Próximos", "anteriores": "Anteriores"}
+
+
+class Pagina(NamedTuple):
+    itens: list
+    cursor: str | None  # None quando não há mais itens
+
+
+def codificar_cursor(agendamento):
+    """Cursor opaco com a chave (data, id) do último item entregue."""
+    chave = f"{agendamento.data.isoformat()}|{agendamento.id}"
+    return urlsafe_b64encode(chave.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor; levanta ValueError se o cursor for inválido."""
+    try:
+        data, id_ = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(data), int(id_)
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def codificar_cursor_id(id_):
+    return urlsafe_b64encode(f"id|{id_}".encode()).decode()
+
+
+def decodificar_cursor_id(cursor):
+    try:
+        prefixo, id_ = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if prefixo != "id":
+            raise ValueError(prefixo)
+        return int(id_)
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def paginar_por_id(consulta, cursor=None, tamanho=None, chave=lambda item: item.id):
+    """
+    Paginação por chave em id crescente, para listas sem ordem de negócio (API do
+    catálogo). `chave` extrai o id de cada item (ex.: linhas de values_list).
+    """
+    tamanho = tamanho or settings.AGENDA_ITENS_POR_PAGINA
+    consulta = consulta.order_by("id")
+    if cursor:
+        consulta = consulta.filter(id__gt=decodificar_cursor_id(cursor))
+    itens = list(consulta[:tamanho + 1])
+    if len(itens) > tamanho:
+        return Pagina(itens[:tamanho], codificar_cursor_id(chave(itens[tamanho - 1])))
+    return Pagina(itens, None)
+
+
+def codificar_cursor_nome(item):
+    return urlsafe_b64encode(f"nome|{item.nome}|{item.id}".encode()).decode()
+
+
+def decodificar_cursor_nome(cursor):
+    try:
+        prefixo, resto = urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        nome, id_ = resto.rsplit("|", 1)
+        if prefixo != "nome":
+            raise ValueError(prefixo)
+        return nome, int(id_)
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def paginar_por_nome(consulta, cursor=None, tamanho=None):
+    """Paginação por chave em (nome, id), para listas em ordem alfabética (home)."""
+    tamanho = tamanho or settings.AGENDA_ITENS_POR_PAGINA
+    consulta = consulta.order_by("nome", "id")
+    if cursor:
+        nome, id_ = decodificar_cursor_nome(cursor)
+        consulta = consulta.filter(Q(nome__gt=nome) | Q(nome=nome, id__gt=id_))
+    itens = list(consulta[:tamanho + 1])
+    if len(itens) > tamanho:
+        return Pagina(itens[:tamanho], codificar_cursor_nome(itens[tamanho - 1]))
+    return Pagina(itens, None)
+
+
+def codificar_cursor_posicao(posicao):
+    return urlsafe_b64encode(f"pos|{posicao}".encode()).decode()
+
+
+def decodificar_cursor_posicao(cursor):
+    try:
+        prefixo, posicao = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if prefixo != "pos" or int(posicao) < 0:
+            raise ValueError(prefixo)
+        return int(posicao)
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def paginar(agendamentos, secao, cursor=None, tamanho=None, agora=None):
+    """
+    Paginação por chave (seek) em (data, id): "proximos" em ordem crescente a
+    partir de agora, "anteriores" em ordem decrescente. Cada página custa uma
+    consulta limitada, independente do tamanho do histórico.
+    """
+    if secao not in SECOES:
+        raise ValueError("Seção inválida.")
+    tamanho = tamanho or settings.AGENDA_ITENS_POR_PAGINA
+    agora = agora or now()
+
+    if secao == "proximos":
+        agendamentos = agendamentos.filter(data__gte=agora).order_by("data", "id")
+    else:
+        agendamentos = agendamentos.filter(data__lt=agora).order_by("-data", "-id")
+    if cursor:
+        data, id_ = decodificar_cursor(cursor)
+        if secao == "proximos":
+            agendamentos = agendamentos.filter(Q(data__gt=data) | Q(data=data, id__gt=id_))
+        else:
+            agendamentos = agendamentos.filter(Q(data__lt=data) | Q(data=data, id__lt=id_))
+
+    # Um item a mais só para saber se existe próxima página
+    itens = list(agendamentos[:tamanho + 1])
+    if len(itens) > tamanho:
+        return Pagina(itens[:tamanho], codificar_cursor(itens[tamanho - 1]))
+    return Pagina(itens, None)
+
+
+def primeiras_paginas(agendamentos, tamanho=None):
+    """(seção, título, primeira página) de próximos e anteriores, com o mesmo instante de corte."""
+    agora = now()
+    return [
+        (secao, titulo, paginar(agendamentos, secao, tamanho=tamanho, agora=agora))
+        for secao, titulo in SECOES.items()
+    ]
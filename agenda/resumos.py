@@ -0,0 +1,108 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Agendamento, ResumoDiario
+
+ATIVO = Q(status="ativo")
+CHAVE = ["barbearia", "barbeiro", "dia"]
+CAMPOS = ["agendamentos", "cancelamentos", "faturamento", "clientes"]
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _agregar(agendamentos):
+    """Agrupa agendamentos por (barbearia, barbeiro, dia local) com os totais do resumo."""
+    return (
+        agendamentos.annotate(dia=TruncDate("data"))
+        .order_by()
+        .values("barbearia_id", "barbeiro_id", "dia")
+        .annotate(
+            n_agendamentos=Count("id", filter=ATIVO),
+            n_cancelamentos=Count("id", filter=Q(status="cancelado")),
+            soma_faturamento=Sum("servico__preco", filter=ATIVO),
+            n_clientes=Count("cliente", filter=ATIVO, distinct=True),
+        )
+    )
+
+
+def _resumo(linha):
+    return ResumoDiario(
+        barbearia_id=linha["barbearia_id"],
+        barbeiro_id=linha["barbeiro_id"],
+        dia=linha["dia"],
+        agendamentos=linha["n_agendamentos"],
+        cancelamentos=linha["n_cancelamentos"],
+        faturamento=linha["soma_faturamento"] or 0,
+        clientes=linha["n_clientes"],
+    )
+
+
+def chave_resumo(agendamento):
+    """(barbearia_id, barbeiro_id, dia local) do resumo afetado pelo agendamento."""
+    return (agendamento.barbearia_id, agendamento.barbeiro_id, timezone.localdate(agendamento.data))
+
+
+def chaves_do_servico(servico_id):
+    """Resumos cujo faturamento depende do preço do serviço (dias com agendamentos ativos dele)."""
+    return set(
+        Agendamento.objects.ativos().filter(servico_id=servico_id)
+        .annotate(dia=TruncDate("data"))
+        .order_by()
+        .values_list("barbearia_id", "barbeiro_id", "dia")
+        .distinct()
+    )
+
+
+def atualizar_resumo(barbearia_id, barbeiro_id, dia, criar=True):
+    """
+    Recalcula o resumo de um barbeiro em um dia a partir dos agendamentos desse dia.
+
+    Com `criar=False` apenas atualiza ou remove um resumo existente (usado em
+    exclusões em cascata, quando barbearia ou barbeiro podem estar sumindo).
+    """
+    inicio = _inicio_do_dia(dia)
+    linhas = list(_agregar(Agendamento.objects.filter(
+        barbearia_id=barbearia_id, barbeiro_id=barbeiro_id, data__gte=inicio, data__lt=inicio + timedelta(days=1),
+    )))
+    existente = ResumoDiario.objects.filter(barbearia_id=barbearia_id, barbeiro_id=barbeiro_id, dia=dia)
+    if not linhas:
+        existente.delete()
+        return
+
+    novo = _resumo(linhas[0])
+    if criar:
+        # Um INSERT ... ON CONFLICT DO UPDATE, sem o SELECT e os savepoints do update_or_create
+        ResumoDiario.objects.bulk_create(
+            [novo], update_conflicts=True, unique_fields=CHAVE, update_fields=CAMPOS,
+        )
+    else:
+        existente.update(**{campo: getattr(novo, campo) for campo in CAMPOS})
+
+
+def reconstruir_resumos(inicio, fim, dias_por_lote=31, saida=None):
+    """
+    Recria os resumos entre as datas `inicio` e `fim` (inclusivas), um lote de
+    dias por transação: apaga os resumos do lote e grava o GROUP BY com bulk_create.
+    Retorna a quantidade de resumos gravados.
+    """
+    gravados = 0
+    lote_inicio = inicio
+    while lote_inicio <= fim:
+        lote_fim = min(lote_inicio + timedelta(days=dias_por_lote - 1), fim)
+        agendamentos = Agendamento.objects.filter(
+            data__gte=_inicio_do_dia(lote_inicio), data__lt=_inicio_do_dia(lote_fim + timedelta(days=1)),
+        )
+        with transaction.atomic():
+            ResumoDiario.objects.filter(dia__range=(lote_inicio, lote_fim)).delete()
+            resumos = ResumoDiario.objects.bulk_create([_resumo(linha) for linha in _agregar(agendamentos)])
+        gravados += len(resumos)
+        if saida:
+            saida(f"{lote_inicio:%d/%m/%Y} a {lote_fim:%d/%m/%Y}: {len(resumos)} resumos")
+        lote_inicio = lote_fim + timedelta(days=1)
+    return gravados
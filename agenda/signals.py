@@ -0,0 +1,214 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .agendamentos import recalcular_termino
+from .autenticacao import esquecer
+from .busca import desindexar, indexar
+from .cache import invalidar
+from .eventos import canal_notificacoes, publicar
+from .geo import aplicar_cep
+from .imagens import campo_larguras, limpar_original, processar_variantes, remover_variantes
+from .instrumentacao import registrar_consulta
+from .models import (
+    Agendamento, Barbearia, Disponibilidade, ExcecaoHorario, HorarioSemanal, Notificacao, Servico, Usuario,
+)
+from .resumos import atualizar_resumo, chave_resumo, chaves_do_servico
+
+
+# ------------------ RESUMO DIÁRIO ------------------
+@receiver(post_save, sender=Agendamento)
+def atualizar_resumo_ao_salvar(sender, instance, raw=False, **kwargs):
+    """Recalcula o resumo do dia do agendamento (e do dia antigo, se foi remarcado)."""
+    if raw:
+        return
+    chaves = {chave_resumo(instance)}
+    original = getattr(instance, "_original", None)
+    if original:
+        barbearia_id, barbeiro_id, data = original
+        chaves.add((barbearia_id, barbeiro_id, timezone.localdate(data)))
+    for chave in chaves:
+        atualizar_resumo(*chave)
+    instance._original = (instance.barbearia_id, instance.barbeiro_id, instance.data)
+
+
+@receiver(post_delete, sender=Agendamento)
+def atualizar_resumo_ao_excluir(sender, instance, **kwargs):
+    atualizar_resumo(*chave_resumo(instance), criar=False)
+
+
+@receiver(post_save, sender=Servico)
+def atualizar_resumos_ao_mudar_preco(sender, instance, created, raw=False, **kwargs):
+    """O faturamento dos resumos soma o preço atual do serviço."""
+    if raw or created or instance.preco == getattr(instance, "_preco_original", None):
+        return
+    for chave in chaves_do_servico(instance.pk):
+        atualizar_resumo(*chave)
+    instance._preco_original = instance.preco
+
+
+@receiver(pre_delete, sender=Servico)
+def guardar_resumos_do_servico(sender, instance, **kwargs):
+    # Os agendamentos perdem o serviço (SET_NULL) em um UPDATE sem sinais: guarda os dias antes
+    instance._resumos_afetados = chaves_do_servico(instance.pk)
+
+
+@receiver(post_delete, sender=Servico)
+def atualizar_resumos_ao_excluir_servico(sender, instance, **kwargs):
+    for chave in getattr(instance, "_resumos_afetados", ()):
+        atualizar_resumo(*chave, criar=False)
+
+
+# ------------------ DURAÇÃO DO SERVIÇO ------------------
+@receiver(pre_save, sender=Servico)
+def recalcular_termino_agendamentos(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    data_fim é a base da proteção contra sobreposição: acompanha a nova duração antes de
+    gravá-la. Se os agendamentos futuros passariam a colidir, HorarioIndisponivel e nada é salvo.
+    """
+    if raw or instance._state.adding or (update_fields is not None and "duracao" not in update_fields):
+        return
+    if instance.duracao != getattr(instance, "_duracao_original", None):
+        recalcular_termino(instance)
+        instance._duracao_original = instance.duracao
+
+
+# ------------------ CACHE DAS PÁGINAS PÚBLICAS ------------------
+def _invalidar_barbearias(*barbearia_ids):
+    escopos = [f"barbearia:{barbearia_id}" for barbearia_id in set(barbearia_ids) if barbearia_id]
+    if escopos:
+        invalidar(*escopos)
+
+
+@receiver([post_save, post_delete], sender=Barbearia)
+def invalidar_cache_barbearia(sender, instance, **kwargs):
+    invalidar("barbearias", f"barbearia:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_cache_barbeiro(sender, instance, update_fields=None, **kwargs):
+    # Login só atualiza last_login (e às vezes o hash da senha): nada visível muda
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    _invalidar_barbearias(instance.barbearia_id, getattr(instance, "_barbearia_original", None))
+    instance._barbearia_original = instance.barbearia_id
+
+
+@receiver([post_save, post_delete], sender=Servico)
+def invalidar_cache_servico(sender, instance, **kwargs):
+    _invalidar_barbearias(instance.barbearia_id)
+
+
+@receiver([post_save, post_delete], sender=Disponibilidade)
+@receiver([post_save, post_delete], sender=HorarioSemanal)
+@receiver([post_save, post_delete], sender=ExcecaoHorario)
+def invalidar_cache_disponibilidade(sender, instance, **kwargs):
+    _invalidar_barbearias(
+        Usuario.objects.filter(pk=instance.barbeiro_id).values_list("barbearia_id", flat=True).first()
+    )
+
+
+# ------------------ BUSCA ------------------
+@receiver(post_save, sender=Barbearia)
+def indexar_barbearia(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar(instance.pk)
+
+
+@receiver(pre_save, sender=Barbearia)
+def geocodificar_barbearia(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Coordenadas pelo CEP ao cadastrar ou trocar o CEP (sem coordenadas informadas à mão)."""
+    if raw or update_fields is not None:
+        return
+    manual = instance._state.adding and instance.latitude is not None
+    cep_mudou = instance.cep != getattr(instance, "_cep_original", None)
+    if instance.cep and not manual and (cep_mudou or instance.latitude is None):
+        aplicar_cep(instance)
+    elif cep_mudou and not instance.cep and not manual:
+        instance.latitude = instance.longitude = None
+    instance._cep_original = instance.cep
+
+
+@receiver(post_delete, sender=Barbearia)
+def desindexar_barbearia(sender, instance, **kwargs):
+    desindexar(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Servico)
+def indexar_servicos(sender, instance, raw=False, **kwargs):
+    # Nomes dos serviços fazem parte do texto de busca da barbearia
+    if not raw:
+        indexar(instance.barbearia_id)
+
+
+# ------------------ USUÁRIO DA SESSÃO ------------------
+@receiver([post_save, post_delete], sender=Usuario)
+def esquecer_usuario_em_cache(sender, instance, update_fields=None, **kwargs):
+    """Descarta a projeção do request.user; de novo no commit, caso outra requisição a releia antes."""
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    esquecer(instance.pk)
+    transaction.on_commit(lambda: esquecer(instance.pk))
+
+
+# ------------------ NOTIFICAÇÕES EM TEMPO REAL ------------------
+@receiver(post_save, sender=Notificacao)
+def publicar_notificacao(sender, instance, created, raw=False, **kwargs):
+    """Envia a notificação nova aos streams abertos do usuário, após o commit."""
+    if not created or raw:
+        return
+    mensagem = {"id": instance.id, "mensagem": instance.mensagem}
+    transaction.on_commit(lambda: publicar(canal_notificacoes(instance.usuario_id), mensagem))
+
+
+# ------------------ IMAGENS ------------------
+CAMPOS_IMAGEM = {Barbearia: "logo", Usuario: "foto"}
+
+
+@receiver(pre_save, sender=Barbearia)
+@receiver(pre_save, sender=Usuario)
+def limpar_imagem_enviada(sender, instance, raw=False, **kwargs):
+    """Troca o upload ainda não gravado por uma versão sem metadados, antes do FileField salvá-lo."""
+    nome = CAMPOS_IMAGEM[sender]
+    arquivo = getattr(instance, nome)
+    if raw or (arquivo and arquivo._committed):
+        return
+    if arquivo:
+        setattr(instance, nome, limpar_original(arquivo, arquivo.name))
+        instance._imagem_nova = True
+    # Sem variantes até o post_save gerá-las (ou sem imagem)
+    setattr(instance, campo_larguras(nome), [])
+
+
+@receiver(post_save, sender=Barbearia)
+@receiver(post_save, sender=Usuario)
+def gerar_variantes_da_imagem(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    nome = CAMPOS_IMAGEM[sender]
+    campo = getattr(instance, nome)
+    if getattr(instance, "_imagem_nova", False):
+        instance._imagem_nova = False
+        processar_variantes(campo)
+
+    antigo, larguras = getattr(instance, "_imagem_original", (None, None))
+    if antigo and antigo != campo.name and larguras:
+        storage = campo.storage
+
+        def remover():
+            # Nomes por conteúdo: outro registro pode usar o mesmo arquivo
+            if not sender.objects.filter(**{nome: antigo}).exists():
+                remover_variantes(storage, antigo, larguras)
+
+        transaction.on_commit(remover)
+    instance._imagem_original = (campo.name or None, getattr(instance, campo_larguras(nome)))
+
+
+# ------------------ INSTRUMENTAÇÃO ------------------
+@receiver(connection_created)
+def instrumentar_conexao(sender, connection, **kwargs):
+    # execute_wrappers sobrevive a reconexões do mesmo DatabaseWrapper: instala uma vez só
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
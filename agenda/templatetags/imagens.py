@@ -0,0 +1,29 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from agenda.imagens import variantes
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagem_responsiva(campo, alt="", sizes="100vw", loading="lazy", **atributos):
+    """
+    <picture> com as variantes WebP e JPEG/PNG do campo em srcset, carregamento lazy
+    (loading="eager" para imagens no topo da página) e decodificação assíncrona. Sem variantes, cai para o <img> do arquivo original.
+
+    Uso: {% imagem_responsiva barbearia.logo alt=barbearia.nome sizes="150px" class="rounded" %}
+    """
+    extras = format_html_join("", ' {}="{}"', ((nome.replace("_", "-"), valor) for nome, valor in atributos.items()))
+    opcoes = variantes(campo)
+    if not opcoes:
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async"{}>', campo.url, alt, loading, extras
+        )
+    srcset = ", ".join(f"{url} {largura}w" for largura, url, _ in opcoes)
+    srcset_webp = ", ".join(f"{url} {largura}w" for largura, _, url in opcoes)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" decoding="async"{}></picture>',
+        srcset_webp, sizes, opcoes[0][1], srcset, sizes, alt, loading, extras,
+    )
@@ -1,6 +1,1336 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import os
+import re
+import runpy
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from agenda import eventos
+from agenda.agendamentos import HorarioIndisponivel, criar_agendamento
+from agenda.autenticacao import UsuarioEmCacheBackend
+from agenda.cache import versoes
+from agenda.busca import buscar
+from agenda.forms import BarbeariaForm
+from agenda.geo import proximas
+from agenda.disponibilidades import gravar_em_lote, remover_em_lote
+from agenda.horarios import consulta_ocupados, horarios_livres
+from agenda.imagens import nome_variante, variantes
+from agenda.instrumentacao import OrcamentoExcedido
+from agenda.management.commands.benchmark_views import percentil
+from agenda.management.commands.popular_dados import popular
+from agenda.management.commands.stress_agendamentos import contar_sobreposicoes, disputar_horarios
+from agenda.metricas import indicadores, serie_temporal
+from agenda.models import (
+    Agendamento, Barbearia, Cep, Disponibilidade, ExcecaoHorario, HorarioSemanal, Notificacao, ResumoDiario,
+    Servico, Usuario,
+)
+from agenda.resumos import reconstruir_resumos
+
+
+# Configuração comum aos testes, independente do ambiente: cache em memória (um só processo,
+# então compartilhado por todas as requisições do teste), sessão no banco, ModelBackend e
+# todas as requisições medidas, com orçamento de consultas excedido virando exceção
+CONFIGURACAO_TESTES = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "testes"}},
+    AGENDA_CACHE_COMPARTILHADO=True,
+    SESSION_ENGINE="django.contrib.sessions.backends.db",
+    AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"],
+    AGENDA_INSTRUMENTACAO_AMOSTRA=1,
+    AGENDA_ORCAMENTO_ESTRITO=True,
+)
+# Sem a linha JSON de cada requisição na saída dos testes; assertLogs ainda as vê
+logging.getLogger("agenda.instrumentacao").setLevel(logging.WARNING)
+
 
 # Aqui você pode criar testes unitários futuramente.
 class SimpleTest(TestCase):
     def test_soma(self):
         self.assertEqual(1 + 1, 2)
+
+
+def _local(dia, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(dia, time(hora, minuto)))
+
+
+@CONFIGURACAO_TESTES
+class BaseAgendaTestCase(TestCase):
+    """Cenário mínimo: uma barbearia, um barbeiro, um cliente e um serviço de 30 minutos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dia = date.today() + timedelta(days=1)
+        cls.barbearia = Barbearia.objects.create(nome="Barbearia Teste")
+        cls.barbeiro = Usuario.objects.create_user(
+            username="barbeiro", password="senha", tipo="barbeiro", barbearia=cls.barbearia
+        )
+        cls.cliente = Usuario.objects.create_user(username="cliente", password="senha", tipo="cliente")
+        cls.servico = Servico.objects.create(
+            barbearia=cls.barbearia, barbeiro=cls.barbeiro, nome="Corte", preco=40, duracao=timedelta(minutes=30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def agendar(self, hora, minuto=0, servico=None, status="ativo"):
+        return Agendamento.objects.create(
+            barbearia=self.barbearia,
+            cliente=self.cliente,
+            barbeiro=self.barbeiro,
+            servico=servico or self.servico,
+            data=_local(self.dia, hora, minuto),
+            status=status,
+        )
+
+
+# ------------------ HORÁRIOS DISPONÍVEIS ------------------
+class HorariosLivresTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        Disponibilidade.objects.create(barbeiro=self.barbeiro, dia=self.dia, hora_inicio=time(9), hora_fim=time(11))
+
+    def test_janela_sem_agendamentos(self):
+        self.assertEqual(
+            horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)),
+            ["09:00", "09:30", "10:00", "10:30"],
+        )
+
+    def test_agendamento_iniciado_antes_bloqueia_horario(self):
+        longo = Servico.objects.create(
+            barbearia=self.barbearia, barbeiro=self.barbeiro, nome="Barba", preco=30, duracao=timedelta(minutes=60)
+        )
+        self.agendar(9, 0, servico=longo)
+        self.assertEqual(horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)), ["10:00", "10:30"])
+
+    def test_termino_gravado_define_o_bloqueio(self):
+        # Agendamento da véspera que invade a janela: só data_fim diz até quando ele vai
+        ontem = self.agendar(9)
+        Agendamento.objects.filter(pk=ontem.pk).update(
+            data=_local(self.dia - timedelta(days=1), 9), data_fim=_local(self.dia, 10)
+        )
+        self.assertEqual(horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)), ["10:00", "10:30"])
+
+        janelas = {(self.barbeiro.id, self.dia): [(_local(self.dia, 9), _local(self.dia, 11))]}
+        self.assertNotIn("JOIN", str(consulta_ocupados(janelas).query))
+
+    def test_cancelados_nao_bloqueiam(self):
+        self.agendar(9, status="cancelado")
+        self.assertIn("09:00", horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)))
+
+    def test_intervalo_configuravel(self):
+        self.assertEqual(
+            horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30), intervalo=timedelta(minutes=15)),
+            ["09:00", "09:15", "09:30", "09:45", "10:00", "10:15", "10:30"],
+        )
+        with override_settings(AGENDA_INTERVALO_MINUTOS=60):
+            self.assertEqual(horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)), ["09:00", "10:00"])
+
+    def test_consultas_fixas(self):
+        for hora in (9, 10):
+            self.agendar(hora)
+        # disponibilidades + horários semanais + exceções + agendamentos
+        with self.assertNumQueries(4):
+            horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30))
+
+    def test_api(self):
+        self.agendar(9, 30)
+        self.client.force_login(self.cliente)
+        resposta = self.client.get(
+            reverse("agenda:horarios_disponiveis"),
+            {"barbeiro": self.barbeiro.id, "dia": self.dia.isoformat(), "servico": self.servico.id},
+        )
+        self.assertEqual(resposta.json(), {"horarios": ["09:00", "10:00", "10:30"]})
+
+    async def test_api_assincrona(self):
+        await self.async_client.aforce_login(self.cliente)
+        url = reverse("agenda:horarios_disponiveis")
+        resposta = await self.async_client.get(
+            url, {"barbeiro": self.barbeiro.id, "dia": self.dia.isoformat(), "servico": self.servico.id}
+        )
+        self.assertEqual(resposta.json(), {"horarios": ["09:00", "09:30", "10:00", "10:30"]})
+        resposta = await self.async_client.get(url, {"barbeiro": 0, "dia": self.dia.isoformat(), "servico": 0})
+        self.assertEqual(resposta.status_code, 404)
+
+
+class CalendarioDisponivelTest(BaseAgendaTestCase):
+    def test_todos_os_barbeiros_em_consultas_fixas(self):
+        barbeiros = [self.barbeiro] + [
+            Usuario.objects.create(username=f"barbeiro{i}", tipo="barbeiro", barbearia=self.barbearia)
+            for i in range(5)
+        ]
+        for barbeiro in barbeiros:
+            for i in range(7):
+                Disponibilidade.objects.create(
+                    barbeiro=barbeiro, dia=self.dia + timedelta(days=i), hora_inicio=time(9), hora_fim=time(10)
+                )
+        self.agendar(9)
+        self.client.force_login(self.cliente)
+
+        # sessão + usuário + barbearia + serviço + barbeiros + 3 de janelas + agendamentos
+        with self.assertNumQueries(9):
+            resposta = self.client.get(reverse("agenda:calendario_disponivel"), {
+                "barbearia": self.barbearia.id,
+                "servico": self.servico.id,
+                "inicio": self.dia.isoformat(),
+                "fim": (self.dia + timedelta(days=6)).isoformat(),
+            })
+
+        dados = resposta.json()
+        self.assertEqual(len(dados["barbeiros"]), 6)
+        por_id = {b["id"]: b["horarios"] for b in dados["barbeiros"]}
+        self.assertEqual(por_id[self.barbeiro.id][self.dia.isoformat()], ["09:30"])
+        self.assertEqual(por_id[barbeiros[1].id][self.dia.isoformat()], ["09:00", "09:30"])
+        self.assertEqual(len(por_id[self.barbeiro.id]), 7)
+
+    def test_intervalo_invalido(self):
+        self.client.force_login(self.cliente)
+        resposta = self.client.get(reverse("agenda:calendario_disponivel"), {
+            "barbearia": self.barbearia.id,
+            "inicio": self.dia.isoformat(),
+            "fim": (self.dia - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(resposta.status_code, 400)
+
+
+class HorarioSemanalTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        HorarioSemanal.objects.create(
+            barbeiro=self.barbeiro, dia_semana=self.dia.weekday(), hora_inicio=time(9), hora_fim=time(11),
+            valido_de=self.dia,
+        )
+
+    def livres(self, dia=None):
+        return horarios_livres(self.barbeiro, dia or self.dia, timedelta(minutes=30), intervalo=timedelta(hours=1))
+
+    def test_expande_so_nas_semanas_validas(self):
+        HorarioSemanal.objects.update(valido_ate=self.dia + timedelta(days=7))
+        self.assertEqual(self.livres(), ["09:00", "10:00"])
+        self.assertEqual(self.livres(self.dia + timedelta(days=7)), ["09:00", "10:00"])
+        self.assertEqual(self.livres(self.dia + timedelta(days=1)), [])
+        self.assertEqual(self.livres(self.dia - timedelta(days=7)), [])
+        self.assertEqual(self.livres(self.dia + timedelta(days=14)), [])
+
+    def test_folga_do_dia_inteiro_prevalece(self):
+        Disponibilidade.objects.create(barbeiro=self.barbeiro, dia=self.dia, hora_inicio=time(14), hora_fim=time(15))
+        ExcecaoHorario.objects.create(barbeiro=self.barbeiro, dia=self.dia, tipo="folga")
+        self.assertEqual(self.livres(), [])
+
+    def test_folga_parcial_e_horario_extra(self):
+        ExcecaoHorario.objects.create(
+            barbeiro=self.barbeiro, dia=self.dia, tipo="folga", hora_inicio=time(9, 30), hora_fim=time(10)
+        )
+        ExcecaoHorario.objects.create(
+            barbeiro=self.barbeiro, dia=self.dia, tipo="extra", hora_inicio=time(16), hora_fim=time(17)
+        )
+        self.assertEqual(
+            horarios_livres(self.barbeiro, self.dia, timedelta(minutes=30)), ["09:00", "10:00", "10:30", "16:00", "16:30"]
+        )
+
+    def test_agendamento_no_horario_semanal(self):
+        criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 10, 30))
+        with self.assertRaisesMessage(HorarioIndisponivel, "Horário não disponível."):
+            criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 10, 45))
+
+    def test_cadastro_pela_tela(self):
+        self.client.force_login(self.barbeiro)
+        url = reverse("agenda:gerenciar_disponibilidade")
+        resposta = self.client.post(url, {"acao": "excecao", "dia": self.dia.isoformat(), "tipo": "extra"})
+        self.assertContains(resposta, "Informe início e término.")
+        self.client.post(url, {"acao": "excecao", "dia": self.dia.isoformat(), "tipo": "folga"})
+        self.assertEqual(self.livres(), [])
+        excecao = ExcecaoHorario.objects.get()
+        self.client.post(reverse("agenda:remover_excecao", args=[excecao.id]))
+        self.assertEqual(self.livres(), ["09:00", "10:00"])
+
+
+class DisponibilidadeLoteTest(BaseAgendaTestCase):
+    def janelas(self, dia):
+        return list(
+            Disponibilidade.objects.filter(barbeiro=self.barbeiro, dia=dia).values_list("hora_inicio", "hora_fim")
+        )
+
+    def test_mescla_com_existentes_em_um_insert(self):
+        Disponibilidade.objects.create(barbeiro=self.barbeiro, dia=self.dia, hora_inicio=time(8), hora_fim=time(10))
+        fim = self.dia + timedelta(days=13)
+        with CaptureQueriesContext(connection) as ctx:
+            criadas, removidas = gravar_em_lote(
+                self.barbeiro, self.dia, fim, {self.dia.weekday()}, [(time(9), time(12)), (time(14), time(18))]
+            )
+        self.assertEqual(sum(q["sql"].startswith("INSERT") for q in ctx.captured_queries), 1)
+        self.assertEqual((criadas, removidas), (4, 1))
+        self.assertEqual(self.janelas(self.dia), [(time(8), time(12)), (time(14), time(18))])
+        self.assertEqual(self.janelas(self.dia + timedelta(days=7)), [(time(9), time(12)), (time(14), time(18))])
+        self.assertEqual(self.janelas(self.dia + timedelta(days=1)), [])
+
+        # Repetir o lote não duplica nada
+        self.assertEqual(gravar_em_lote(self.barbeiro, self.dia, fim, None, [(time(9), time(12))])[1], 0)
+        self.assertEqual(Disponibilidade.objects.filter(dia=self.dia).count(), 2)
+
+    def test_remover_em_um_delete(self):
+        gravar_em_lote(self.barbeiro, self.dia, self.dia + timedelta(days=6), None, [(time(9), time(12))])
+        with self.assertNumQueries(1):
+            removidas = remover_em_lote(
+                self.barbeiro, self.dia, self.dia + timedelta(days=6), {self.dia.weekday(), 6}
+            )
+        self.assertEqual(removidas, 1 if self.dia.weekday() == 6 else 2)
+        self.assertEqual(self.janelas(self.dia), [])
+        self.assertEqual(Disponibilidade.objects.count(), 7 - removidas)
+
+    def test_tela_valida_lote_e_invalida_cache(self):
+        self.client.force_login(self.barbeiro)
+        url = reverse("agenda:gerenciar_disponibilidade")
+        escopo = f"barbearia:{self.barbearia.id}"
+        periodo = {"lote-inicio": self.dia.isoformat(), "lote-fim": self.dia.isoformat()}
+        versao = versoes([escopo])[escopo]
+
+        resposta = self.client.post(url, {"acao": "lote", **periodo, "lote-janelas": "09:00-10:00, 11:00-10:00"})
+        self.assertContains(resposta, "o término deve ser depois do início")
+        self.assertFalse(Disponibilidade.objects.exists())
+        self.assertEqual(versoes([escopo])[escopo], versao)
+
+        self.client.post(url, {"acao": "lote", **periodo, "lote-janelas": "09:00-10:00"})
+        self.assertEqual(len(self.janelas(self.dia)), 1)
+        self.assertNotEqual(versoes([escopo])[escopo], versao)
+
+        versao = versoes([escopo])[escopo]
+        self.client.post(url, {
+            "acao": "remover_lote", "remover-inicio": self.dia.isoformat(), "remover-fim": self.dia.isoformat(),
+        })
+        self.assertEqual(self.janelas(self.dia), [])
+        self.assertNotEqual(versoes([escopo])[escopo], versao)
+
+
+# ------------------ AGENDAMENTO CONCORRENTE ------------------
+class CriarAgendamentoTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        Disponibilidade.objects.create(barbeiro=self.barbeiro, dia=self.dia, hora_inicio=time(9), hora_fim=time(12))
+
+    def test_recusa_sobreposicao_parcial(self):
+        criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 9))
+        with self.assertRaisesMessage(HorarioIndisponivel, "Esse horário já foi reservado."):
+            criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 9, 15))
+
+    def test_recusa_fora_da_disponibilidade(self):
+        with self.assertRaisesMessage(HorarioIndisponivel, "Horário não disponível."):
+            criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 11, 45))
+
+    def test_banco_bloqueia_sobreposicao_fora_do_servico(self):
+        self.agendar(10)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.agendar(10, 15)
+
+    def test_post_dentro_do_orcamento(self):
+        self.client.force_login(self.cliente)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.post(reverse("agenda:agenda_cliente"), {
+                "barbeiro": self.barbeiro.id, "servico": self.servico.id, "data": self.dia.isoformat(), "hora": "09:00",
+            })
+        self.assertEqual(resposta.status_code, 302)
+        self.assertIn('desc="14 consultas"', resposta["Server-Timing"])
+        # Resumo gravado com um único upsert, sem o SELECT e os savepoints do update_or_create
+        resumo = [consulta["sql"] for consulta in consultas if "agenda_resumodiario" in consulta["sql"]]
+        self.assertEqual(len(resumo), 1)
+        self.assertIn("ON CONFLICT", resumo[0])
+
+    def test_cancelado_libera_horario(self):
+        self.agendar(10, status="cancelado")
+        criar_agendamento(self.cliente, self.barbeiro, self.servico, _local(self.dia, 10))
+
+    def test_nova_duracao_recalcula_termino(self):
+        primeiro, _ = self.agendar(9), self.agendar(9, 30)
+        servico = Servico.objects.get(id=self.servico.id)
+
+        servico.duracao = timedelta(minutes=45)
+        with self.assertRaisesMessage(HorarioIndisponivel, "se sobreporiam"):
+            servico.save()
+        self.assertEqual(Servico.objects.get(id=servico.id).duracao, timedelta(minutes=30))
+
+        servico.duracao = timedelta(minutes=20)
+        servico.save()
+        primeiro.refresh_from_db()
+        self.assertEqual(primeiro.data_fim, _local(self.dia, 9, 20))
+
+
+@CONFIGURACAO_TESTES
+class AgendamentoConcorrenteTest(TransactionTestCase):
+    def test_threads_nao_geram_agendamentos_duplicados(self):
+        dia = date.today() + timedelta(days=1)
+        barbearia = Barbearia.objects.create(nome="Barbearia Teste")
+        barbeiros = [
+            Usuario.objects.create(username=f"barbeiro{i}", tipo="barbeiro", barbearia=barbearia) for i in range(2)
+        ]
+        clientes = [Usuario.objects.create(username=f"cliente{i}", tipo="cliente") for i in range(6)]
+        servicos = {}
+        for b in barbeiros:
+            servicos[b.pk] = Servico.objects.create(
+                barbearia=barbearia, barbeiro=b, nome="Corte", preco=40, duracao=timedelta(minutes=30)
+            )
+            Disponibilidade.objects.create(barbeiro=b, dia=dia, hora_inicio=time(9), hora_fim=time(12))
+        inicios = [_local(dia, 9), _local(dia, 9, 15), _local(dia, 9, 30)]
+
+        resultado = disputar_horarios(barbeiros, servicos, clientes, inicios, threads=6)
+
+        self.assertEqual(resultado["sobreposicoes"], 0)
+        self.assertGreater(resultado["tentativas_por_segundo"], 0)
+        self.assertEqual(resultado["sucesso"] + resultado["recusado"] + resultado["erro"], resultado["tentativas"])
+        # 09:00 e 09:30 cabem para cada barbeiro; 09:15 sempre colide
+        self.assertLessEqual(resultado["sucesso"], 4)
+        self.assertEqual(Agendamento.objects.filter(status="ativo").count(), resultado["sucesso"])
+
+
+# ------------------ MÉTRICAS ------------------
+class MetricasTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hoje = timezone.localdate()
+        for dias_atras, status in ((0, "ativo"), (0, "ativo"), (2, "ativo"), (2, "cancelado"), (40, "ativo")):
+            Agendamento.objects.create(
+                barbearia=self.barbearia, cliente=self.cliente, barbeiro=self.barbeiro, servico=self.servico,
+                data=_local(self.hoje - timedelta(days=dias_atras), 10 + Agendamento.objects.count()), status=status,
+            )
+        self.agendamentos = Agendamento.objects.filter(barbeiro=self.barbeiro)
+        self.resumos = ResumoDiario.objects.filter(barbeiro=self.barbeiro)
+
+    def test_serie_diaria_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            serie = serie_temporal(self.resumos, dias=7)
+        self.assertEqual(len(serie), 7)
+        self.assertEqual([p["total"] for p in serie], [0, 0, 0, 0, 1, 0, 2])
+        self.assertEqual(serie[-1]["faturamento"], 80)
+        self.assertEqual(serie[-1]["data"], self.hoje.strftime("%d/%m"))
+
+    def test_serie_mensal(self):
+        serie = serie_temporal(self.resumos, dias=90, agrupamento="mes")
+        self.assertEqual(serie[-1]["data"], self.hoje.strftime("%m/%Y"))
+        self.assertEqual(sum(p["total"] for p in serie), 4)
+
+    def test_primeiro_balde_completo(self):
+        primeiro = (self.hoje - timedelta(days=29)).replace(day=1)
+        Agendamento.objects.create(
+            barbearia=self.barbearia, cliente=self.cliente, barbeiro=self.barbeiro, servico=self.servico,
+            data=_local(primeiro, 8),
+        )
+        mes = self.resumos.filter(dia__year=primeiro.year, dia__month=primeiro.month)
+
+        serie = serie_temporal(self.resumos, dias=30, agrupamento="mes")
+        self.assertEqual(serie[0]["data"], primeiro.strftime("%m/%Y"))
+        self.assertEqual(serie[0]["total"], mes.aggregate(total=Sum("agendamentos"))["total"])
+
+    def test_indicadores(self):
+        outro = Usuario.objects.create_user(username="outro", password="senha", tipo="cliente")
+        Agendamento.objects.create(
+            barbearia=self.barbearia, cliente=outro, barbeiro=self.barbeiro, data=_local(self.hoje, 18),
+        )
+        with self.assertNumQueries(1):
+            kpis = indicadores(self.resumos, self.agendamentos)
+        self.assertEqual(kpis["total_agendamentos"], 5)
+        # Clientes distintos no período todo, não a soma dos distintos de cada dia
+        self.assertEqual(kpis["total_clientes"], 2)
+        # Faturamento / agendamentos ativos: o agendamento sem serviço entra como R$ 0
+        self.assertEqual(kpis["ticket_medio"], 32)
+
+    def test_dashboard_barbeiro_periodo(self):
+        self.client.force_login(self.barbeiro)
+        resposta = self.client.get(reverse("agenda:dashboard_barbeiro"), {"periodo": "30", "agrupamento": "semana"})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context["total_agendamentos"], 4)
+        self.assertEqual(resposta.context["agrupamento"], "semana")
+
+
+# ------------------ DASHBOARD SUPERADMIN ------------------
+class DashboardSuperadminTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.superadmin = Usuario.objects.create_user(username="super", password="senha", tipo="superadmin")
+        self.client.force_login(self.superadmin)
+
+    def criar_barbearias(self, quantidade):
+        for i in range(quantidade):
+            barbearia = Barbearia.objects.create(nome=f"Extra {Barbearia.objects.count()}")
+            barbeiro = Usuario.objects.create(username=f"b{barbearia.id}", tipo="barbeiro", barbearia=barbearia)
+            servico = Servico.objects.create(
+                barbearia=barbearia, barbeiro=barbeiro, nome="Corte", preco=10 * (i + 1), duracao=timedelta(minutes=30)
+            )
+            Agendamento.objects.create(
+                barbearia=barbearia, cliente=self.cliente, barbeiro=barbeiro, servico=servico,
+                data=_local(self.dia, 9),
+            )
+
+    def contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(reverse("agenda:dashboard_super_admin"))
+        self.assertEqual(resposta.status_code, 200)
+        return len(ctx.captured_queries), resposta
+
+    def test_consultas_nao_crescem_com_barbearias(self):
+        self.criar_barbearias(2)
+        poucas, _ = self.contar_consultas()
+        self.criar_barbearias(8)
+        muitas, _ = self.contar_consultas()
+        self.assertEqual(poucas, muitas)
+
+    def test_faturamento_e_top5(self):
+        self.criar_barbearias(6)
+        self.agendar(9)
+        _, resposta = self.contar_consultas()
+        top5 = resposta.context["top5"]
+        self.assertEqual(len(top5), 5)
+        self.assertEqual(top5[0]["total"], 60)
+        clientes = {g["barbearia"]: g["clientes"] for g in resposta.context["grafico_clientes"]}
+        self.assertEqual(clientes["Barbearia Teste"], 1)
+        self.assertEqual(resposta.context["total_faturamento"], 250)
+
+    def test_nomes_escapados_nos_graficos(self):
+        Barbearia.objects.create(nome="</script><script>alert(1)</script>")
+        _, resposta = self.contar_consultas()
+        self.assertNotContains(resposta, "</script><script>alert(1)")
+        self.assertContains(resposta, "\\u003C/script\\u003E\\u003Cscript\\u003Ealert(1)")
+
+
+# ------------------ RESUMO DIÁRIO ------------------
+class ResumoDiarioTest(BaseAgendaTestCase):
+    def resumo(self, dia=None):
+        return ResumoDiario.objects.get(barbeiro=self.barbeiro, dia=dia or self.dia)
+
+    def test_criacao_e_cancelamento_atualizam_resumo(self):
+        agendamento = self.agendar(9)
+        self.agendar(10)
+        resumo = self.resumo()
+        self.assertEqual((resumo.agendamentos, resumo.cancelamentos, resumo.faturamento, resumo.clientes), (2, 0, 80, 1))
+
+        agendamento.status = "cancelado"
+        agendamento.save()
+        resumo = self.resumo()
+        self.assertEqual((resumo.agendamentos, resumo.cancelamentos, resumo.faturamento), (1, 1, 40))
+
+    def test_remarcacao_e_exclusao(self):
+        agendamento = self.agendar(9)
+        agendamento = Agendamento.objects.get(pk=agendamento.pk)
+        outro_dia = self.dia + timedelta(days=1)
+        agendamento.data = _local(outro_dia, 9)
+        agendamento.save()
+        self.assertFalse(ResumoDiario.objects.filter(dia=self.dia).exists())
+        self.assertEqual(self.resumo(outro_dia).agendamentos, 1)
+
+        agendamento.delete()
+        self.assertFalse(ResumoDiario.objects.exists())
+
+    def test_preco_e_exclusao_do_servico(self):
+        self.agendar(9)
+        self.agendar(10)
+        servico = Servico.objects.get(id=self.servico.id)
+        servico.preco = 50
+        servico.save()
+        self.assertEqual(self.resumo().faturamento, 100)
+
+        servico.delete()
+        resumo = self.resumo()
+        self.assertEqual((resumo.agendamentos, resumo.faturamento), (2, 0))
+
+    def test_reconstrucao_igual_ao_incremental(self):
+        for hora in (9, 10, 11):
+            self.agendar(hora)
+        self.agendar(12, status="cancelado")
+        incremental = list(ResumoDiario.objects.values("barbeiro", "dia", "agendamentos", "cancelamentos", "faturamento", "clientes"))
+
+        ResumoDiario.objects.all().delete()
+        gravados = reconstruir_resumos(self.dia - timedelta(days=3), self.dia + timedelta(days=3), dias_por_lote=2)
+
+        self.assertEqual(gravados, 1)
+        self.assertEqual(
+            list(ResumoDiario.objects.values("barbeiro", "dia", "agendamentos", "cancelamentos", "faturamento", "clientes")),
+            incremental,
+        )
+
+
+# ------------------ DETALHE DA BARBEARIA ------------------
+class BarbeariaDetailTest(BaseAgendaTestCase):
+    def adicionar_barbeiros(self, quantidade):
+        for _ in range(quantidade):
+            barbeiro = Usuario.objects.create(
+                username=f"extra{Usuario.objects.count()}", tipo="barbeiro", barbearia=self.barbearia
+            )
+            Servico.objects.create(
+                barbearia=self.barbearia, barbeiro=barbeiro, nome="Corte", preco=40, duracao=timedelta(minutes=30)
+            )
+            for i in range(3):
+                Disponibilidade.objects.create(
+                    barbeiro=barbeiro, dia=self.dia + timedelta(days=i), hora_inicio=time(9), hora_fim=time(18)
+                )
+
+    def contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(reverse("agenda:barbearia_detail", args=[self.barbearia.id]))
+        self.assertEqual(resposta.status_code, 200)
+        return len(ctx.captured_queries), resposta
+
+    def test_consultas_constantes(self):
+        self.adicionar_barbeiros(1)
+        poucos, _ = self.contar_consultas()
+        self.adicionar_barbeiros(6)
+        muitos, _ = self.contar_consultas()
+        self.assertEqual(poucos, muitos)
+
+    def test_cache_sem_dados_pessoais(self):
+        Usuario.objects.filter(pk=self.barbeiro.pk).update(first_name="Zé", cpf="12345678900", telefone="11999990000")
+        _, resposta = self.contar_consultas()
+        self.assertContains(resposta, "Zé")
+        self.assertEqual(
+            resposta.context["barbeiros"],
+            [{"id": self.barbeiro.id, "username": "barbeiro", "first_name": "Zé", "last_name": "", "apelido": None}],
+        )
+
+
+# ------------------ CACHE DAS PÁGINAS PÚBLICAS ------------------
+class CachePaginasPublicasTest(BaseAgendaTestCase):
+    def get_detalhe(self, barbearia=None):
+        return self.client.get(reverse("agenda:barbearia_detail", args=[(barbearia or self.barbearia).id]))
+
+    def test_home_sem_consultas_apos_primeiro_acesso(self):
+        self.client.get(reverse("agenda:home"))
+        with self.assertNumQueries(0):
+            resposta = self.client.get(reverse("agenda:home"))
+        self.assertContains(resposta, "Barbearia Teste")
+
+        Barbearia.objects.create(nome="Nova Barbearia")
+        self.assertContains(self.client.get(reverse("agenda:home")), "Nova Barbearia")
+
+    def test_detalhe_invalidado_por_servico_e_barbeiro(self):
+        self.get_detalhe()
+        with self.assertNumQueries(0):
+            self.get_detalhe()
+
+        Servico.objects.create(
+            barbearia=self.barbearia, barbeiro=self.barbeiro, nome="Pigmentação", preco=50, duracao=timedelta(minutes=30)
+        )
+        self.assertContains(self.get_detalhe(), "Pigmentação")
+
+        self.barbeiro.apelido = "Navalha"
+        self.barbeiro.save()
+        self.assertContains(self.get_detalhe(), "Navalha")
+
+    def test_invalidacao_e_precisa(self):
+        outra = Barbearia.objects.create(nome="Outra")
+        self.get_detalhe()
+        self.get_detalhe(outra)
+
+        Servico.objects.create(
+            barbearia=outra, barbeiro=self.barbeiro, nome="Barba", preco=30, duracao=timedelta(minutes=30)
+        )
+        with self.assertNumQueries(0):
+            self.get_detalhe()
+
+    def test_login_nao_invalida(self):
+        self.get_detalhe()
+        self.client.login(username="barbeiro", password="senha")
+        self.client.logout()
+        with self.assertNumQueries(0):
+            self.get_detalhe()
+
+    def test_estatisticas(self):
+        self.get_detalhe()
+        self.get_detalhe()
+        superadmin = Usuario.objects.create_user(username="super", password="senha", tipo="superadmin")
+        self.client.force_login(superadmin)
+        dados = self.client.get(reverse("agenda:estatisticas_cache")).json()
+        self.assertEqual((dados["acertos"], dados["falhas"]), (1, 1))
+
+    @override_settings(AGENDA_CACHE_COMPARTILHADO=False)
+    def test_sem_cache_compartilhado_sempre_do_banco(self):
+        self.get_detalhe()
+        # Outro worker alterou o serviço sem passar pelos sinais deste processo
+        Servico.objects.filter(pk=self.servico.pk).update(nome="Degradê")
+        self.assertContains(self.get_detalhe(), "Degradê")
+
+
+# ------------------ BUSCA DE BARBEARIAS ------------------
+class BuscaBarbeariasTest(BaseAgendaTestCase):
+    def nomes(self, q):
+        return [b.nome for b in buscar(q).itens]
+
+    def test_sem_acento_por_prefixo_e_servico(self):
+        loja = Barbearia.objects.create(nome="Barbearia São João", endereco="Av. Brasil, 10", cidade="Ribeirão Preto")
+        Servico.objects.create(
+            barbearia=loja, barbeiro=self.barbeiro, nome="Pigmentação", preco=50, duracao=timedelta(minutes=45)
+        )
+        self.assertEqual(Barbearia.objects.get(pk=loja.pk).busca,
+                         "barbearia sao joao av. brasil, 10 ribeirao preto pigmentacao")
+        for q in ("SAO JOÃO", "ribeirão", "pigment", "joao pigmentação"):
+            self.assertEqual(self.nomes(q), ["Barbearia São João"], q)
+        self.assertEqual(self.nomes("joao corte"), [])
+
+        Servico.objects.filter(barbearia=loja).delete()
+        self.assertEqual(self.nomes("pigment"), [])
+        loja.delete()
+        self.assertEqual(self.nomes("ribeirao"), [])
+
+    def test_relevancia(self):
+        Barbearia.objects.create(nome="Navalha", descricao="Corte", endereco="Rua do Corte")
+        loja = Barbearia.objects.create(nome="Corte Fino", endereco="Rua Corte Fino", cidade="Corte")
+        self.assertEqual(self.nomes("corte")[0], loja.nome)
+
+    @override_settings(AGENDA_BARBEARIAS_POR_PAGINA=2, AGENDA_BUSCA_MAX_RESULTADOS=3)
+    def test_home_paginada(self):
+        for i in range(4):
+            Barbearia.objects.create(nome=f"Loja {i}", cidade="Santos")
+        vistas, parametros = [], {}
+        while True:
+            with self.assertNumQueries(1):
+                resposta = self.client.get(reverse("agenda:home"), parametros)
+            vistas += [b.nome for b in resposta.context["barbearias"]]
+            if not resposta.context["pagina"].cursor:
+                break
+            self.assertContains(resposta, "Mais barbearias")
+            parametros = {"cursor": resposta.context["pagina"].cursor}
+        self.assertEqual(vistas, ["Barbearia Teste", "Loja 0", "Loja 1", "Loja 2", "Loja 3"])
+
+        # Busca limitada a AGENDA_BUSCA_MAX_RESULTADOS
+        primeira = self.client.get(reverse("agenda:home"), {"q": "santos"})
+        self.assertEqual(len(primeira.context["barbearias"]), 2)
+        resto = self.client.get(reverse("agenda:home"), {"q": "santos", "cursor": primeira.context["pagina"].cursor})
+        self.assertEqual(len(resto.context["barbearias"]), 1)
+        self.assertIsNone(resto.context["pagina"].cursor)
+
+        self.assertContains(self.client.get(reverse("agenda:home"), {"q": "xyz"}), "Nenhuma barbearia encontrada")
+        self.assertEqual(self.client.get(reverse("agenda:home"), {"cursor": "xyz"}).status_code, 400)
+
+
+# ------------------ PROXIMIDADE ------------------
+class ProximidadeTest(BaseAgendaTestCase):
+    def test_geocodifica_pelo_cep(self):
+        Cep.objects.create(cep="01310100", latitude=-23.5614, longitude=-46.6559, cidade="São Paulo", uf="SP")
+        Cep.objects.create(cep="13015000", latitude=-22.9050, longitude=-47.0600, cidade="Campinas", uf="SP")
+
+        form = BarbeariaForm({"nome": "Paulista", "cep": "01310 100"})
+        self.assertTrue(form.is_valid())
+        loja = form.save()
+        self.assertEqual((loja.cep, loja.latitude, loja.cidade), ("01310-100", -23.5614, "São Paulo"))
+        self.assertFalse(BarbeariaForm({"nome": "X", "cep": "123"}).is_valid())
+
+        # Trocar o CEP geocodifica de novo; sem o CEP exato, vale o setor (5 dígitos)
+        loja = Barbearia.objects.get(pk=loja.pk)
+        loja.cep = "13015-999"
+        loja.save()
+        self.assertEqual((loja.latitude, loja.longitude), (-22.9050, -47.0600))
+        loja.cep = "99999-999"
+        loja.save()
+        self.assertIsNone(loja.latitude)
+
+        manual = Barbearia.objects.create(nome="Manual", cep="01310-100", latitude=-10.0, longitude=-50.0)
+        self.assertEqual(manual.latitude, -10.0)
+
+    def test_proximas_por_distancia_e_raio(self):
+        centro = (-23.5505, -46.6333)
+        for nome, lat, lon in [
+            ("Longe", -23.62, -46.75),      # ~14 km
+            ("Perto", -23.555, -46.64),     # ~0,8 km
+            ("Meio", -23.58, -46.66),       # ~4,3 km
+            ("Fora", -22.90, -47.06),       # Campinas, ~84 km
+        ]:
+            Barbearia.objects.create(nome=nome, latitude=lat, longitude=lon)
+        Barbearia.objects.create(nome="Sem coordenadas")
+
+        ranking = proximas(*centro, raio=20)
+        nomes = dict(Barbearia.objects.values_list("id", "nome"))
+        self.assertEqual([nomes[id_] for id_, _ in ranking], ["Perto", "Meio", "Longe"])
+        for (_, distancia), esperada in zip(ranking, (0.8, 4.3, 14.2)):
+            self.assertAlmostEqual(distancia, esperada, delta=0.2)
+        self.assertEqual(len(proximas(*centro, raio=5)), 2)
+        self.assertEqual(len(proximas(*centro, raio=20, limite=1)), 1)
+
+        # Retângulo que cruza o antimeridiano
+        Barbearia.objects.create(nome="Fiji", latitude=-17.8, longitude=179.99)
+        self.assertEqual([nomes.get(id_, "Fiji") for id_, _ in proximas(-17.8, -179.99, raio=5)], ["Fiji"])
+
+    def test_api_e_home(self):
+        Barbearia.objects.create(nome="Perto", latitude=-23.555, longitude=-46.64, cidade="São Paulo")
+        Barbearia.objects.create(nome="Longe", latitude=-23.62, longitude=-46.75)
+        url = reverse("agenda:api_barbearias_proximas")
+
+        with self.assertNumQueries(2):
+            dados = self.client.get(url, {"lat": -23.5505, "lon": -46.6333, "fields": "nome"}).json()
+        self.assertEqual([(b["nome"], round(b["distancia_km"])) for b in dados["resultados"]], [("Perto", 1)])
+        dados = self.client.get(url, {"lat": -23.5505, "lon": -46.6333, "raio": 20, "fields": "nome"}).json()
+        self.assertEqual([b["nome"] for b in dados["resultados"]], ["Perto", "Longe"])
+        for parametros in ({}, {"lat": "x", "lon": 1}, {"lat": 95, "lon": 1}, {"lat": 0, "lon": 0, "raio": 500}):
+            self.assertEqual(self.client.get(url, parametros).status_code, 400, parametros)
+
+        with self.assertNumQueries(2):
+            resposta = self.client.get(reverse("agenda:home"), {"lat": -23.5505, "lon": -46.6333})
+        self.assertEqual([b.nome for b in resposta.context["barbearias"]], ["Perto"])
+        self.assertContains(resposta, "A 0,8 km")
+        self.assertEqual(self.client.get(reverse("agenda:home"), {"lat": -23.5}).status_code, 400)
+
+
+# ------------------ API PÚBLICA v1 ------------------
+class CatalogoApiTest(BaseAgendaTestCase):
+    def test_cursor_e_campos(self):
+        for i in range(4):
+            Barbearia.objects.create(nome=f"Loja {i}", telefone=str(i))
+        url = reverse("agenda:api_barbearias")
+
+        with self.assertNumQueries(1):
+            dados = self.client.get(url, {"fields": "nome", "limit": 3}).json()
+        self.assertEqual(list(dados["resultados"][0]), ["id", "nome"])
+        self.assertEqual(len(dados["resultados"]), 3)
+        resto = self.client.get(url, {"fields": "nome", "limit": 3, "cursor": dados["cursor"]}).json()
+        self.assertEqual([b["nome"] for b in resto["resultados"]], ["Loja 2", "Loja 3"])
+        self.assertIsNone(resto["cursor"])
+
+        self.assertEqual(self.client.get(url, {"fields": "nome,senha"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "xyz"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"limit": 1000}).status_code, 400)
+
+    def test_etag_sem_consultas_e_invalidado(self):
+        url = reverse("agenda:api_servicos", args=[self.barbearia.id])
+        primeira = self.client.get(url)
+        self.assertEqual(
+            primeira.json()["resultados"],
+            [{"id": self.servico.id, "nome": "Corte", "preco": "40.00", "duracao_minutos": 30,
+              "barbeiro": self.barbeiro.id}],
+        )
+        self.assertIn("max-age=", primeira["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            resposta = self.client.get(url, HTTP_IF_NONE_MATCH=primeira["ETag"])
+        self.assertEqual(resposta.status_code, 304)
+
+        Servico.objects.create(
+            barbearia=self.barbearia, barbeiro=self.barbeiro, nome="Barba", preco=30, duracao=timedelta(minutes=20)
+        )
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=primeira["ETag"])
+        self.assertEqual(len(resposta.json()["resultados"]), 2)
+
+    @override_settings(AGENDA_CACHE_COMPARTILHADO=False)
+    def test_sem_cache_compartilhado_sem_etag(self):
+        url = reverse("agenda:api_servicos", args=[self.barbearia.id])
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(resposta.has_header("ETag"))
+        self.assertFalse(resposta.has_header("Last-Modified"))
+
+    def test_barbeiros_e_disponibilidade(self):
+        Usuario.objects.filter(pk=self.barbeiro.pk).update(apelido="Zé")
+        cache.clear()
+        barbeiros = self.client.get(reverse("agenda:api_barbeiros", args=[self.barbearia.id])).json()
+        self.assertEqual(barbeiros["resultados"], [{"id": self.barbeiro.id, "nome": "Zé", "foto": None}])
+        self.assertEqual(self.client.get(reverse("agenda:api_barbeiros", args=[999])).status_code, 404)
+        servicos = reverse("agenda:api_servicos", args=[self.barbearia.id])
+        self.assertEqual(len(self.client.get(servicos, {"barbeiro": self.barbeiro.id}).json()["resultados"]), 1)
+        self.assertEqual(self.client.get(servicos, {"barbeiro": "abc"}).status_code, 400)
+
+        Disponibilidade.objects.create(barbeiro=self.barbeiro, dia=self.dia, hora_inicio=time(9), hora_fim=time(10))
+        url = reverse("agenda:api_disponibilidade", args=[self.barbearia.id])
+        parametros = {"inicio": self.dia.isoformat(), "fim": self.dia.isoformat(), "servico": self.servico.id}
+        resposta = self.client.get(url, parametros)
+        self.assertEqual(resposta.json()["barbeiros"][0]["horarios"], {self.dia.isoformat(): ["09:00", "09:30"]})
+        self.assertEqual(self.client.get(url, parametros, HTTP_IF_NONE_MATCH=resposta["ETag"]).status_code, 304)
+        self.agendar(9)
+        self.assertEqual(self.client.get(url, parametros, HTTP_IF_NONE_MATCH=resposta["ETag"]).status_code, 200)
+
+
+# ------------------ NOTIFICAÇÕES EM TEMPO REAL ------------------
+class EventosTest(BaseAgendaTestCase):
+    def test_memoria_entrega_apenas_ao_canal(self):
+        backend = eventos.MemoriaBackend()
+
+        async def cenario():
+            async with backend.assinar("a") as fila_a, backend.assinar("b") as fila_b:
+                backend.publicar("a", {"id": 1})
+                recebido = await asyncio.wait_for(fila_a.get(), timeout=1)
+                self.assertTrue(fila_b.empty())
+                return recebido
+
+        self.assertEqual(asyncio.run(cenario()), {"id": 1})
+        self.assertEqual(backend._assinantes, {})
+
+    def test_notificacao_criada_e_publicada_apos_commit(self):
+        with mock.patch("agenda.signals.publicar") as publicar:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                notificacao = Notificacao.objects.create(usuario=self.barbeiro, mensagem="Cancelado")
+            publicar.assert_not_called()
+            for callback in callbacks:
+                callback()
+        publicar.assert_called_once_with(
+            eventos.canal_notificacoes(self.barbeiro.id), {"id": notificacao.id, "mensagem": "Cancelado"}
+        )
+
+    @override_settings(AGENDA_SSE_DURACAO=0)
+    async def test_stream_asgi_envia_pendentes(self):
+        await Notificacao.objects.acreate(usuario=self.barbeiro, mensagem="Lida", lida=True)
+        pendente = await Notificacao.objects.acreate(usuario=self.barbeiro, mensagem="Pendente")
+        await self.async_client.aforce_login(self.barbeiro)
+
+        resposta = await self.async_client.get(reverse("agenda:stream_notificacoes"))
+        conteudo = "".join([parte.decode() async for parte in resposta.streaming_content])
+
+        self.assertEqual(resposta["Content-Type"], "text/event-stream")
+        self.assertIn(f"id: {pendente.id}\n", conteudo)
+        self.assertIn("Pendente", conteudo)
+        self.assertNotIn("Lida", conteudo)
+
+    def test_stream_wsgi_respeita_last_event_id(self):
+        antiga = Notificacao.objects.create(usuario=self.barbeiro, mensagem="Antiga")
+        Notificacao.objects.create(usuario=self.barbeiro, mensagem="Nova")
+        self.client.force_login(self.barbeiro)
+
+        resposta = self.client.get(reverse("agenda:stream_notificacoes"), HTTP_LAST_EVENT_ID=str(antiga.id))
+
+        self.assertContains(resposta, "retry: 10000")
+        self.assertContains(resposta, "Nova")
+        self.assertNotContains(resposta, "Antiga")
+
+        # Cabeçalho inválido não derruba o stream: reenvia todas as pendentes
+        resposta = self.client.get(reverse("agenda:stream_notificacoes"), HTTP_LAST_EVENT_ID="abc")
+        self.assertContains(resposta, "Antiga")
+
+
+class NotificacoesPollingTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.barbeiro)
+        self.url = reverse("agenda:lista_notificacoes")
+
+    def test_304_quando_nada_mudou(self):
+        Notificacao.objects.create(usuario=self.barbeiro, mensagem="Primeira")
+        primeira = self.client.get(self.url)
+        self.assertEqual(len(primeira.json()["notificacoes"]), 1)
+
+        with self.assertNumQueries(3):  # sessão, usuário e o agregado das pendentes
+            resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=primeira["ETag"])
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b"")
+
+        Notificacao.objects.create(usuario=self.barbeiro, mensagem="Segunda")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=primeira["ETag"]).status_code, 200)
+
+    def test_since_devolve_apenas_novas(self):
+        antiga = Notificacao.objects.create(usuario=self.barbeiro, mensagem="Antiga")
+        nova = Notificacao.objects.create(usuario=self.barbeiro, mensagem="Nova")
+
+        dados = self.client.get(self.url, {"since": antiga.id}).json()
+
+        self.assertEqual(dados["notificacoes"], [{"id": nova.id, "mensagem": "Nova"}])
+        self.assertEqual(dados["cursor"], nova.id)
+        self.assertEqual(self.client.get(self.url, {"since": "x"}).status_code, 400)
+
+    def test_marcar_varias_com_um_update(self):
+        ids = [Notificacao.objects.create(usuario=self.barbeiro, mensagem=str(i)).id for i in range(3)]
+        alheia = Notificacao.objects.create(usuario=self.cliente, mensagem="Outro usuário")
+        url = reverse("agenda:marcar_notificacoes_lidas")
+
+        with self.assertNumQueries(3):
+            resposta = self.client.post(url, {"ids": ",".join(map(str, ids[:2] + [alheia.id]))})
+        self.assertEqual(resposta.json()["marcadas"], 2)
+        self.assertEqual(self.client.post(url, {"ate": ids[-1]}).json()["marcadas"], 1)
+        self.assertFalse(Notificacao.objects.get(id=alheia.id).lida)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    async def test_views_assincronas_pelo_asgi(self):
+        await self.async_client.aforce_login(self.barbeiro)
+        notificacao = await Notificacao.objects.acreate(usuario=self.barbeiro, mensagem="Via ASGI")
+
+        dados = (await self.async_client.get(self.url)).json()
+        self.assertEqual(dados["notificacoes"], [{"id": notificacao.id, "mensagem": "Via ASGI"}])
+
+        url = reverse("agenda:marcar_notificacao_lida", args=[notificacao.id])
+        self.assertEqual((await self.async_client.get(url)).json(), {"status": "ok"})
+        self.assertTrue((await Notificacao.objects.aget(id=notificacao.id)).lida)
+        alheia = await Notificacao.objects.acreate(usuario=self.cliente, mensagem="Outro usuário")
+        url = reverse("agenda:marcar_notificacao_lida", args=[alheia.id])
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+
+# ------------------ PAGINAÇÃO ------------------
+@override_settings(AGENDA_ITENS_POR_PAGINA=3)
+class PaginacaoAgendamentosTest(BaseAgendaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        agora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        cls.futuros = [
+            Agendamento.objects.create(
+                barbearia=cls.barbearia, cliente=cls.cliente, barbeiro=cls.barbeiro,
+                servico=cls.servico, data=agora + timedelta(days=1, hours=i), status=status,
+            )
+            # Dois cancelados no mesmo horário testam o desempate por id
+            for i, status in [(0, "ativo"), (1, "cancelado"), (1, "cancelado"), (2, "ativo"), (3, "ativo"), (4, "ativo")]
+        ]
+        cls.passados = [
+            Agendamento.objects.create(
+                barbearia=cls.barbearia, cliente=cls.cliente, barbeiro=cls.barbeiro,
+                servico=cls.servico, data=agora - timedelta(days=1, hours=i),
+            )
+            for i in range(4)
+        ]
+
+    def percorrer(self, url, secao):
+        ids, cursor = [], ""
+        while cursor is not None:
+            dados = self.client.get(url, {"secao": secao, "cursor": cursor}).json()
+            ids += [int(i) for i in re.findall(r"/cancelar/(\d+)/", dados["html"])]
+            cursor = dados["cursor"]
+        return ids
+
+    def test_admin_percorre_todas_as_paginas(self):
+        admin = Usuario.objects.create_user(
+            username="admin", password="senha", tipo="admin_barbearia", barbearia=self.barbearia
+        )
+        self.client.force_login(admin)
+        url = reverse("agenda:dashboard_admin")
+
+        self.assertEqual(self.percorrer(url, "proximos"), [a.id for a in self.futuros])
+        self.assertEqual(self.percorrer(url, "anteriores"), [a.id for a in self.passados])
+        self.assertEqual(self.client.get(url, {"secao": "proximos", "cursor": "x"}).status_code, 400)
+
+    def test_pagina_inicial_limitada(self):
+        self.client.force_login(self.cliente)
+        resposta = self.client.get(reverse("agenda:agenda_cliente"))
+
+        secoes = {secao: pagina for secao, _, pagina in resposta.context["secoes"]}
+        ativos = [a.id for a in self.futuros if a.status == "ativo"]
+        self.assertEqual([a.id for a in secoes["proximos"].itens], ativos[:3])
+        self.assertIsNotNone(secoes["proximos"].cursor)
+        self.assertEqual(len(secoes["anteriores"].itens), 3)
+        self.assertContains(resposta, "data-carregar-mais data-secao", count=2)
+
+    def test_consultas_nao_crescem_com_historico(self):
+        self.client.force_login(self.barbeiro)
+        url = reverse("agenda:dashboard_barbeiro")
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(url)
+        Agendamento.objects.bulk_create([
+            Agendamento(
+                barbearia=self.barbearia, cliente=self.cliente, barbeiro=self.barbeiro, servico=self.servico,
+                data=self.passados[-1].data - timedelta(days=i), data_fim=self.passados[-1].data - timedelta(days=i, minutes=-30),
+            )
+            for i in range(1, 50)
+        ])
+        with self.assertNumQueries(len(antes)):
+            self.client.get(url)
+
+
+# ------------------ DASHBOARD ADMIN ------------------
+class DashboardAdminTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Usuario.objects.create_user(
+            username="admin", password="senha", tipo="admin_barbearia", barbearia=self.barbearia
+        )
+        self.client.force_login(self.admin)
+
+    def criar_clientes_e_agendamentos(self, n, hora):
+        for i in range(n):
+            cliente = Usuario.objects.create_user(username=f"c{hora}-{i}", password="senha", tipo="cliente")
+            Agendamento.objects.create(
+                barbearia=self.barbearia, cliente=cliente, barbeiro=self.barbeiro, servico=self.servico,
+                data=_local(self.dia, hora, 0) + timedelta(days=i),
+            )
+
+    def test_consultas_nao_crescem_com_agendamentos(self):
+        self.criar_clientes_e_agendamentos(2, 9)
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(reverse("agenda:dashboard_admin"))
+
+        self.criar_clientes_e_agendamentos(8, 10)
+        with self.assertNumQueries(len(antes)):
+            resposta = self.client.get(reverse("agenda:dashboard_admin"))
+        self.assertEqual(resposta.context["total_clientes"], 10)
+
+    def test_com_relacoes_carrega_em_uma_consulta(self):
+        self.agendar(9)
+        with self.assertNumQueries(1):
+            agendamento = Agendamento.objects.da_barbearia(self.barbearia).ativos().com_relacoes().get()
+            str(agendamento)
+
+
+# ------------------ USUÁRIO DA SESSÃO ------------------
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=["agenda.autenticacao.UsuarioEmCacheBackend"],
+)
+class UsuarioEmCacheTest(BaseAgendaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.barbeiro)
+        self.url = reverse("agenda:lista_notificacoes")
+
+    def test_polling_sem_consultar_sessao_nem_usuario(self):
+        etag = self.client.get(self.url)["ETag"]  # primeira requisição: carrega a projeção do usuário
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(len(consultas), 1)  # só o agregado das pendentes
+        sql = " ".join(consulta["sql"] for consulta in consultas)
+        self.assertNotIn("django_session", sql)
+        self.assertNotIn("agenda_usuario", sql)
+
+    def test_salvar_usuario_descarta_a_projecao(self):
+        backend = UsuarioEmCacheBackend()
+        self.assertEqual(backend.get_user(self.barbeiro.id).tipo, "barbeiro")
+
+        self.barbeiro.tipo = "admin_barbearia"
+        self.barbeiro.save()
+        self.assertEqual(backend.get_user(self.barbeiro.id).tipo, "admin_barbearia")
+
+        # Trocar a senha muda o hash de sessão: a sessão antiga deixa de valer
+        self.client.get(self.url)
+        self.barbeiro.set_password("outra")
+        self.barbeiro.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_projecao_so_com_cache_compartilhado(self):
+        def configuracao(cache_backend):
+            with mock.patch.dict(os.environ, {"CACHE_BACKEND": cache_backend}):
+                return runpy.run_module("barbearia.settings")
+
+        locmem, redis = configuracao("locmem"), configuracao("redis")
+        self.assertFalse(locmem["AGENDA_CACHE_COMPARTILHADO"])
+        self.assertTrue(redis["AGENDA_CACHE_COMPARTILHADO"])
+        self.assertEqual(locmem["AUTHENTICATION_BACKENDS"], ["django.contrib.auth.backends.ModelBackend"])
+        self.assertEqual(locmem["SESSION_ENGINE"], "django.contrib.sessions.backends.db")
+        self.assertEqual(redis["AUTHENTICATION_BACKENDS"], ["agenda.autenticacao.UsuarioEmCacheBackend"])
+        self.assertEqual(redis["SESSION_ENGINE"], "django.contrib.sessions.backends.cached_db")
+
+    def test_campos_adiados_carregados_juntos(self):
+        usuario = UsuarioEmCacheBackend().get_user(self.barbeiro.id)
+        self.assertEqual(usuario.get_session_auth_hash(), self.barbeiro.get_session_auth_hash())
+
+        with self.assertNumQueries(1):
+            usuario.telefone, usuario.email, usuario.apelido
+
+        usuario.telefone = "11999990000"
+        usuario.save()
+        salvo = Usuario.objects.get(id=self.barbeiro.id)
+        self.assertEqual((salvo.telefone, salvo.tipo), ("11999990000", "barbeiro"))
+        self.assertTrue(salvo.check_password("senha"))
+
+    def test_modelo_sem_comportamento_alterado(self):
+        # Fora do backend, campos adiados e refresh_from_db seguem o padrão do Django
+        usuario = Usuario.objects.only("id").get(id=self.barbeiro.id)
+        usuario.email
+        self.assertIn("telefone", usuario.get_deferred_fields())
+
+        Usuario.objects.filter(id=self.barbeiro.id).update(tipo="admin_barbearia")
+        em_cache = UsuarioEmCacheBackend().get_user(self.barbeiro.id)
+        em_cache.refresh_from_db()
+        self.assertEqual(em_cache.tipo, "admin_barbearia")
+
+
+# ------------------ ÍNDICES ------------------
+class ExplicarConsultasTest(BaseAgendaTestCase):
+    # Consulta quente -> índice composto (ou parcial) que o plano deve usar
+    ESPERADOS = {
+        "Conflito ao agendar": "agend_barbeiro_status_data_idx",
+        "Horários livres: disponibilidades": "disp_barbeiro_dia_idx",
+        "Horários livres: agendamentos": "agend_barbeiro_fim_ativo_idx",
+        "Dashboard da barbearia: próximos": "agend_barbearia_data_idx",
+        "Agenda do cliente: anteriores": "agend_cliente_data_idx",
+        "Notificações pendentes": "notif_usuario_pendentes_idx",
+    }
+
+    def planos(self):
+        saida = StringIO()
+        call_command("explicar_consultas", stdout=saida)
+        blocos = saida.getvalue().split("== ")[1:]
+        return {bloco.split("\n", 1)[0]: bloco for bloco in blocos}
+
+    def test_consultas_quentes_usam_os_indices(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("planos conferidos no SQLite; no PostgreSQL dependem das estatísticas da base")
+        planos = self.planos()
+        for titulo, indice in self.ESPERADOS.items():
+            self.assertIn(f"USING INDEX {indice}", planos[titulo], titulo)
+        for titulo, plano in planos.items():
+            self.assertNotRegex(plano, r"(?m)SCAN agenda_\w+\s*$", titulo)  # nenhuma leitura da tabela inteira
+
+    def test_banco_vazio(self):
+        Usuario.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "Banco sem dados suficientes"):
+            call_command("explicar_consultas", stdout=StringIO())
+
+
+# ------------------ INSTRUMENTAÇÃO ------------------
+class InstrumentacaoTest(BaseAgendaTestCase):
+    def test_server_timing_e_log(self):
+        self.client.force_login(self.barbeiro)
+        with self.assertLogs("agenda.instrumentacao", "INFO") as logs:
+            resposta = self.client.get(reverse("agenda:lista_notificacoes"))
+
+        self.assertIn('desc="4 consultas"', resposta["Server-Timing"])
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual((registro["view"], registro["consultas"]), ("agenda:lista_notificacoes", 4))
+        self.assertTrue(registro["mais_lenta_sql"].startswith("SELECT"))
+
+    @override_settings(AGENDA_INSTRUMENTACAO_AMOSTRA=0)
+    def test_fora_da_amostra(self):
+        self.assertFalse(self.client.get(reverse("agenda:home")).has_header("Server-Timing"))
+
+    @override_settings(AGENDA_ORCAMENTO_CONSULTAS={"agenda:home": 0})
+    def test_orcamento_excedido_falha_nos_testes(self):
+        with self.assertLogs("agenda.instrumentacao", "WARNING"), self.assertRaises(OrcamentoExcedido):
+            self.client.get(reverse("agenda:home"))
+
+    async def test_conta_consultas_sob_asgi(self):
+        await self.async_client.aforce_login(self.barbeiro)
+        resposta = await self.async_client.get(reverse("agenda:lista_notificacoes"))
+        self.assertIn('desc="4 consultas"', resposta["Server-Timing"])
+
+
+# ------------------ DADOS SINTÉTICOS E BENCHMARK ------------------
+@CONFIGURACAO_TESTES
+class PopularDadosTest(TestCase):
+    def test_base_sintetica_consistente(self):
+        totais = popular(seed=7, barbearias=2, barbeiros=2, servicos=3, clientes=5, dias=3, meses=1)
+
+        self.assertEqual(totais["barbearias"], 2)
+        self.assertEqual(totais["usuarios"], 1 + 2 * (1 + 2) + 5)
+        self.assertEqual(totais["agendamentos"], Agendamento.objects.count())
+        barbeiros = Usuario.objects.filter(tipo="barbeiro").values_list("id", flat=True)
+        self.assertEqual(contar_sobreposicoes(barbeiros), 0)
+        # Os resumos gravados no fim batem com os agendamentos criados sem sinais
+        self.assertEqual(
+            ResumoDiario.objects.aggregate(n=Sum("agendamentos"))["n"],
+            Agendamento.objects.ativos().count(),
+        )
+
+    def test_percentil(self):
+        valores = list(range(1, 101))
+        self.assertEqual((percentil(valores, 50), percentil(valores, 95)), (50, 95))
+        self.assertEqual(percentil([3.0], 95), 3.0)
+
+
+# ------------------ IMAGENS ------------------
+def _jpeg_com_exif(largura, altura):
+    imagem = Image.new("RGB", (largura, altura), "navy")
+    exif = Image.Exif()
+    exif[0x010F] = "Câmera do cliente"  # Make
+    saida = BytesIO()
+    imagem.save(saida, "JPEG", exif=exif)
+    return SimpleUploadedFile("logo.jpg", saida.getvalue(), content_type="image/jpeg")
+
+
+@CONFIGURACAO_TESTES
+class ImagensTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        configuracao = override_settings(MEDIA_ROOT=self.media, AGENDA_IMAGEM_MAX_PX=1000)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_upload_gera_variantes_sem_metadados(self):
+        barbearia = Barbearia.objects.create(nome="Com Logo", logo=_jpeg_com_exif(2000, 1000))
+
+        with barbearia.logo.open("rb") as arquivo, Image.open(arquivo) as original:
+            self.assertEqual(original.size, (1000, 500))
+            self.assertFalse(original.getexif())
+        larguras = [largura for largura, _, _ in variantes(barbearia.logo)]
+        self.assertEqual(larguras, [160, 320, 640])
+        for largura in larguras:
+            with Image.open(os.path.join(self.media, nome_variante(barbearia.logo.name, largura, "webp"))) as webp:
+                self.assertEqual((webp.format, webp.width), ("WEBP", largura))
+
+    def test_tag_srcset_e_fallback(self):
+        barbearia = Barbearia.objects.create(nome="Com Logo", logo=_jpeg_com_exif(400, 400))
+        modelo = Template('{% load imagens %}{% imagem_responsiva b.logo alt=b.nome sizes="150px" class="x" %}')
+
+        html = modelo.render(Context({"b": barbearia}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn("_160w.webp 160w", html)
+        self.assertIn('sizes="150px"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="x"', html)
+
+        # Sem tocar no storage a cada renderização
+        with mock.patch.object(type(barbearia.logo.storage), "exists") as exists:
+            modelo.render(Context({"b": Barbearia.objects.get(pk=barbearia.pk)}))
+        exists.assert_not_called()
+
+        # Upload anterior ao pipeline (sem variantes registradas): usa o original
+        Barbearia.objects.filter(pk=barbearia.pk).update(logo_larguras=[])
+        barbearia = Barbearia.objects.get(pk=barbearia.pk)
+        html = modelo.render(Context({"b": barbearia}))
+        self.assertNotIn("srcset", html)
+        self.assertIn(barbearia.logo.url, html)
+
+    def test_trocar_imagem_apaga_variantes_antigas(self):
+        barbearia = Barbearia.objects.create(nome="A", logo=_jpeg_com_exif(300, 300))
+        antigo = barbearia.logo.name
+        compartilhada = Barbearia.objects.create(nome="B", logo=_jpeg_com_exif(400, 400))
+        Barbearia.objects.create(nome="C", logo=_jpeg_com_exif(400, 400))
+
+        def variante_existe(nome):
+            return os.path.exists(os.path.join(self.media, nome_variante(nome, 160, "webp")))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            barbearia = Barbearia.objects.get(pk=barbearia.pk)
+            barbearia.logo = _jpeg_com_exif(500, 500)
+            barbearia.save()
+            # Mesmo arquivo em outra barbearia: as variantes ficam
+            compartilhada = Barbearia.objects.get(pk=compartilhada.pk)
+            compartilhada.logo = None
+            compartilhada.save()
+
+        self.assertFalse(variante_existe(antigo))
+        self.assertTrue(variante_existe(barbearia.logo.name))
+        self.assertTrue(variante_existe(Barbearia.objects.get(nome="C").logo.name))
+        self.assertEqual(Barbearia.objects.get(pk=barbearia.pk).logo_larguras, [160, 320, 640])
+        self.assertEqual(Barbearia.objects.get(pk=compartilhada.pk).logo_larguras, [])
+
+    def test_nome_por_conteudo_deduplica(self):
+        primeira = Barbearia.objects.create(nome="A", logo=_jpeg_com_exif(300, 300))
+        segunda = Barbearia.objects.create(nome="B", logo=_jpeg_com_exif(300, 300))
+
+        self.assertRegex(primeira.logo.name, r"^logos/[0-9a-f]{20}\.jpg$")
+        self.assertEqual(primeira.logo.name, segunda.logo.name)
+        self.assertEqual(len([n for n in os.listdir(os.path.join(self.media, "logos")) if "_" not in n]), 1)
+
+    def test_midia_imutavel_com_304_e_range(self):
+        barbearia = Barbearia.objects.create(nome="A", logo=_jpeg_com_exif(300, 300))
+        url = barbearia.logo.url
+
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("immutable", resposta["Cache-Control"])
+        conteudo = b"".join(resposta.streaming_content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta["ETag"]).status_code, 304)
+
+        parcial = self.client.get(url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(b"".join(parcial.streaming_content), conteudo[:10])
+
+        # Nome sem hash (upload anterior): cache curto
+        os.makedirs(os.path.join(self.media, "logos"), exist_ok=True)
+        with open(os.path.join(self.media, "logos", "antigo.jpg"), "wb") as arquivo:
+            arquivo.write(conteudo)
+        with override_settings(AGENDA_MIDIA_MAX_AGE=60):
+            resposta = self.client_class().get("/media/logos/antigo.jpg")
+        self.assertEqual(resposta["Cache-Control"], "max-age=60, public")
+
+    async def test_midia_sob_asgi(self):
+        barbearia = await Barbearia.objects.acreate(nome="A", logo=_jpeg_com_exif(300, 300))
+
+        resposta = await self.async_client.get(barbearia.logo.url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("immutable", resposta["Cache-Control"])
+        self.assertEqual((await self.async_client.get("/media/logos/nada.jpg")).status_code, 404)
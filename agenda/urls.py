@@ -28,6 +28,8 @@ urlpatterns = [
     # ------------------ DISPONIBILIDADE DO BARBEIRO ------------------
     path("disponibilidade/", views.gerenciar_disponibilidade, name="gerenciar_disponibilidade"),
     path("disponibilidade/remover/<int:id>/", views.remover_disponibilidade, name="remover_disponibilidade"),
+    path("disponibilidade/semanal/remover/<int:id>/", views.remover_horario_semanal, name="remover_horario_semanal"),
+    path("disponibilidade/excecao/remover/<int:id>/", views.remover_excecao, name="remover_excecao"),
 
     # ------------------ CRUD DE SERVIÇOS ------------------
     path("servicos/adicionar/", views.adicionar_servico, name="adicionar_servico"),
@@ -45,7 +47,19 @@ urlpatterns = [
     # ------------------ NOTIFICAÇÕES ------------------
     path("notificacoes/", views.lista_notificacoes, name="lista_notificacoes"),
     path("notificacoes/lida/<int:id>/", views.marcar_notificacao_lida, name="marcar_notificacao_lida"),
+    path("notificacoes/lidas/", views.marcar_notificacoes_lidas, name="marcar_notificacoes_lidas"),
+    path("notificacoes/stream/", views.stream_notificacoes, name="stream_notificacoes"),
 
     # ------------------ API ------------------
     path("api/horarios_disponiveis/", views.horarios_disponiveis, name="horarios_disponiveis"),
+    path("api/calendario/", views.calendario_disponivel, name="calendario_disponivel"),
+    path("api/cache/", views.estatisticas_cache, name="estatisticas_cache"),
+
+    # ------------------ API PÚBLICA v1 (CATÁLOGO) ------------------
+    path("api/v1/barbearias/", views.api_barbearias, name="api_barbearias"),
+    path("api/v1/barbearias/proximas/", views.api_barbearias_proximas, name="api_barbearias_proximas"),
+    path("api/v1/barbearias/<int:barbearia_id>/", views.api_barbearia, name="api_barbearia"),
+    path("api/v1/barbearias/<int:barbearia_id>/barbeiros/", views.api_barbeiros, name="api_barbeiros"),
+    path("api/v1/barbearias/<int:barbearia_id>/servicos/", views.api_servicos, name="api_servicos"),
+    path("api/v1/barbearias/<int:barbearia_id>/disponibilidade/", views.api_disponibilidade, name="api_disponibilidade"),
 ]
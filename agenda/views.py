@@ -1,44 +1,87 @@
-from datetime import datetime, timedelta, date
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Sum
-from django.http import JsonResponse, HttpResponseForbidden
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils.timezone import now
-
-from .forms import RegistroClienteForm, RegistroBarbeiroForm, ServicoForm, BarbeariaForm
-from .models import Agendamento, Usuario, Servico, Disponibilidade, Notificacao, Barbearia
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.utils.http import http_date
+from django.utils.timezone import localdate, now
+from django.views.decorators.http import require_GET, require_POST
+
+from . import busca, cache as cache_agenda, catalogo, eventos, geo
+from .agendamentos import HorarioIndisponivel, criar_agendamento
+from .disponibilidades import gravar_em_lote, remover_em_lote
+from .forms import (
+    RegistroClienteForm, RegistroBarbeiroForm, ServicoForm, BarbeariaForm, HorarioSemanalForm, ExcecaoHorarioForm,
+    DisponibilidadeLoteForm, PeriodoDisponibilidadeForm,
+)
+from .horarios import ahorarios_livres, formatar_horarios, intervalo_padrao, livres_por_barbeiro
+from .metricas import AGRUPAMENTOS, PERIODOS, indicadores, serie_temporal
+from .models import (
+    Agendamento, Usuario, Servico, Disponibilidade, Notificacao, Barbearia, ResumoDiario, HorarioSemanal,
+    ExcecaoHorario,
+)
+from .paginacao import Pagina, paginar, paginar_por_id, primeiras_paginas
+
+# Maior intervalo aceito pela API de calendário
+CALENDARIO_MAX_DIAS = 31
+# Maior ?limit aceito nas listas da API do catálogo
+CATALOGO_MAX_ITENS = 100
+# Busca da home: o excedente de ?q é ignorado
+BUSCA_MAX_CARACTERES = 100
 
 # ------------------ HOME ------------------
 def home(request):
-    """Página inicial com lista de barbearias"""
-    barbearias = Barbearia.objects.all()
-    return render(request, "home.html", {"barbearias": barbearias})
-
-def barbearia_detail(request, barbearia_id):
-    """Detalhes da barbearia: barbeiros, serviços e horários disponíveis"""
+    """
+    Página inicial: barbearias paginadas, com busca por nome, endereço, cidade ou
+    serviço (?q=) ou as mais próximas do cliente (?lat=&lon=)
+    """
+    q = request.GET.get("q", "").strip()[:BUSCA_MAX_CARACTERES]
+    cursor = request.GET.get("cursor")
+    try:
+        perto = geo.coordenadas(request.GET)
+        if perto:
+            # Cada cliente tem sua posição: o ranking não passa pelo cache
+            pagina = Pagina(geo.barbearias_proximas(*perto), None)
+        else:
+            # Uma entrada de cache por busca normalizada e página
+            chave = hashlib.sha256(f"{busca.normalizar(q)}|{cursor or ''}".encode()).hexdigest()[:32]
+            pagina = cache_agenda.obter(f"home:{chave}", ["barbearias"], lambda: busca.buscar(q, cursor))
+    except ValueError:
+        return HttpResponse("Página inválida.", status=400)
+    return render(request, "home.html", {
+        "barbearias": pagina.itens,
+        "pagina": pagina,
+        "q": q,
+        "perto": perto,
+        "raio_km": settings.AGENDA_PROXIMIDADE_RAIO_KM,
+    })
+
+def _dados_barbearia(barbearia_id):
+    """Só o que a página mostra: senha, documentos e contatos dos barbeiros não vão para o cache."""
     barbearia = get_object_or_404(Barbearia, id=barbearia_id)
-    barbeiros = Usuario.objects.filter(barbearia=barbearia, tipo="barbeiro")
-    servicos = Servico.objects.filter(barbearia=barbearia)
-
-    hoje = date.today()
-    disponibilidades = Disponibilidade.objects.filter(
-        barbeiro__in=barbeiros, dia__gte=hoje
-    ).order_by("dia", "hora_inicio")
-
-    horarios_por_barbeiro = {b.id: disponibilidades.filter(barbeiro=b) for b in barbeiros}
+    servicos = list(Servico.objects.filter(barbearia=barbearia))
+    barbeiros = list(
+        Usuario.objects.filter(barbearia=barbearia, tipo="barbeiro")
+        .values("id", "username", "first_name", "last_name", "apelido")
+    )
+    return {"barbearia": barbearia, "barbeiros": barbeiros, "servicos": servicos}
 
-    return render(
-        request,
-        "barbearia_detail.html",
-        {
-            "barbearia": barbearia,
-            "barbeiros": barbeiros,
-            "servicos": servicos,
-            "disponibilidades": disponibilidades,
-            "horarios_por_barbeiro": horarios_por_barbeiro,
-        },
+def barbearia_detail(request, barbearia_id):
+    """Detalhes da barbearia: barbeiros e serviços; os horários vêm da API do calendário"""
+    dados = cache_agenda.obter(
+        f"barbearia_detail:{barbearia_id}",
+        [f"barbearia:{barbearia_id}"],
+        lambda: _dados_barbearia(barbearia_id),
     )
+    return render(request, "barbearia_detail.html", dados)
 
 # ------------------ CRIAR BARBEARIA ------------------
 @login_required
@@ -119,6 +162,15 @@ def login_cliente(request):
     return render(request, "login.html")
 
 # ------------------ CLIENTE ------------------
+def _mais_agendamentos(request, agendamentos, fragmento):
+    """Próxima página (?secao=proximos|anteriores&cursor=...) como JSON com o HTML das linhas."""
+    try:
+        pagina = paginar(agendamentos, request.GET["secao"], request.GET.get("cursor"))
+    except ValueError:
+        return JsonResponse({"erro": "Página inválida."}, status=400)
+    html = render_to_string(fragmento, {"agendamentos": pagina.itens}, request=request)
+    return JsonResponse({"html": html, "cursor": pagina.cursor})
+
 @login_required
 def agenda_cliente(request):
     if request.user.tipo != "cliente":
@@ -134,7 +186,9 @@ def agenda_cliente(request):
         barbeiros = Usuario.objects.filter(tipo="barbeiro")
         servicos = Servico.objects.all()
 
-    agendamentos = Agendamento.objects.filter(cliente=request.user).order_by("data")
+    agendamentos = Agendamento.objects.filter(cliente=request.user).ativos().com_relacoes()
+    if "secao" in request.GET:
+        return _mais_agendamentos(request, agendamentos, "parciais/agendamentos_cliente.html")
 
     if request.method == "POST":
         barbeiro_id = request.POST.get("barbeiro")
@@ -147,7 +201,7 @@ def agenda_cliente(request):
                 request,
                 "agenda_cliente.html",
                 {
-                    "agendamentos": agendamentos,
+                    "secoes": primeiras_paginas(agendamentos),
                     "barbeiros": barbeiros,
                     "servicos": servicos,
                     "barbearia": barbearia,
@@ -159,49 +213,27 @@ def agenda_cliente(request):
         servico = get_object_or_404(Servico, id=servico_id)
         data_hora = datetime.strptime(f"{data} {hora}", "%Y-%m-%d %H:%M")
 
-        disponivel = Disponibilidade.objects.filter(
-            barbeiro=barbeiro,
-            dia=data_hora.date(),
-            hora_inicio__lte=data_hora.time(),
-            hora_fim__gte=(datetime.combine(data_hora.date(), data_hora.time()) + servico.duracao).time(),
-        ).exists()
-
-        conflito = Agendamento.objects.filter(
-            barbeiro=barbeiro,
-            status="ativo",
-            data__lt=data_hora + servico.duracao,
-            data__gte=data_hora,
-        ).exists()
-
-        if disponivel and not conflito:
-            Agendamento.objects.create(
-                cliente=request.user,
-                barbeiro=barbeiro,
-                barbearia=barbeiro.barbearia,
-                servico=servico,
-                data=data_hora,
-                status="ativo",
-            )
-            return redirect("agenda:agenda_cliente")
-        else:
-            msg = "Horário não disponível." if not disponivel else "Esse horário já foi reservado."
+        try:
+            criar_agendamento(request.user, barbeiro, servico, data_hora)
+        except HorarioIndisponivel as e:
             return render(
                 request,
                 "agenda_cliente.html",
                 {
-                    "agendamentos": agendamentos,
+                    "secoes": primeiras_paginas(agendamentos),
                     "barbeiros": barbeiros,
                     "servicos": servicos,
                     "barbearia": barbearia,
-                    "error": msg
+                    "error": str(e)
                 },
             )
+        return redirect("agenda:agenda_cliente")
 
     return render(
         request,
         "agenda_cliente.html",
         {
-            "agendamentos": agendamentos,
+            "secoes": primeiras_paginas(agendamentos),
             "barbeiros": barbeiros,
             "servicos": servicos,
             "barbearia": barbearia,
@@ -214,21 +246,20 @@ def dashboard_barbeiro(request):
     if request.user.tipo != "barbeiro":
         return redirect("agenda:home")
 
-    agendamentos = Agendamento.objects.filter(barbeiro=request.user).order_by("data")
-    total_agendamentos = agendamentos.filter(status="ativo").count()
-    total_clientes = agendamentos.filter(status="ativo").values("cliente").distinct().count()
-    ticket_medio = agendamentos.filter(status="ativo").aggregate(avg=Avg("servico__preco"))["avg"] or 0
-
-    stats = []
-    for i in range(7):
-        dia = now().date() - timedelta(days=i)
-        dia_agendamentos = agendamentos.filter(data__date=dia, status="ativo")
-        stats.append({
-            "data": dia.strftime("%d/%m"),
-            "total": dia_agendamentos.count(),
-            "faturamento": dia_agendamentos.aggregate(total=Sum("servico__preco"))["total"] or 0
-        })
-    stats.reverse()
+    agendamentos = Agendamento.objects.filter(barbeiro=request.user)
+    ativos = agendamentos.ativos().com_relacoes()
+    if "secao" in request.GET:
+        return _mais_agendamentos(request, ativos, "parciais/agendamentos_barbeiro.html")
+
+    resumos = ResumoDiario.objects.filter(barbeiro=request.user)
+    kpis = indicadores(resumos, agendamentos)
+
+    periodo = request.GET.get("periodo", "7")
+    periodo = int(periodo) if periodo.isdigit() and int(periodo) in PERIODOS else 7
+    agrupamento = request.GET.get("agrupamento", "dia")
+    if agrupamento not in AGRUPAMENTOS:
+        agrupamento = "dia"
+    stats = serie_temporal(resumos, dias=periodo, agrupamento=agrupamento)
 
     servicos = Servico.objects.filter(barbeiro=request.user)
     form = ServicoForm()
@@ -246,11 +277,14 @@ def dashboard_barbeiro(request):
         request,
         "dashboard_barbeiro.html",
         {
-            "agendamentos": agendamentos,
-            "total_agendamentos": total_agendamentos,
-            "total_clientes": total_clientes,
-            "ticket_medio": ticket_medio,
+            "secoes": primeiras_paginas(ativos),
+            "total_agendamentos": kpis["total_agendamentos"],
+            "total_clientes": kpis["total_clientes"],
+            "ticket_medio": kpis["ticket_medio"] or 0,
             "stats": stats,
+            "periodo": periodo,
+            "periodos": PERIODOS,
+            "agrupamento": agrupamento,
             "servicos": servicos,
             "form": form
         },
@@ -277,8 +311,11 @@ def editar_servico(request, id):
     servico = get_object_or_404(Servico, id=id, barbeiro=request.user)
     form = ServicoForm(request.POST or None, instance=servico)
     if request.method == "POST" and form.is_valid():
-        form.save()
-        return redirect("agenda:dashboard_barbeiro")
+        try:
+            form.save()
+            return redirect("agenda:dashboard_barbeiro")
+        except HorarioIndisponivel as e:
+            form.add_error("duracao", str(e))
     return render(request, "form_servico.html", {"form": form, "titulo": "Editar Serviço"})
 
 @login_required
@@ -297,16 +334,52 @@ def gerenciar_disponibilidade(request):
     if request.user.tipo != "barbeiro":
         return redirect("agenda:home")
 
+    formularios = {
+        "semanal": HorarioSemanalForm(initial={"valido_de": localdate()}),
+        "excecao": ExcecaoHorarioForm(),
+        "lote": DisponibilidadeLoteForm(prefix="lote"),
+        "remover_lote": PeriodoDisponibilidadeForm(prefix="remover"),
+    }
+
     if request.method == "POST":
-        dia = request.POST.get("dia")
-        hora_inicio = request.POST.get("hora_inicio")
-        hora_fim = request.POST.get("hora_fim")
-        if all([dia, hora_inicio, hora_fim]):
-            Disponibilidade.objects.create(barbeiro=request.user, dia=dia, hora_inicio=hora_inicio, hora_fim=hora_fim)
-        return redirect("agenda:gerenciar_disponibilidade")
+        acao = request.POST.get("acao", "avulsa")
+        if acao == "avulsa":
+            dia = request.POST.get("dia")
+            hora_inicio = request.POST.get("hora_inicio")
+            hora_fim = request.POST.get("hora_fim")
+            if all([dia, hora_inicio, hora_fim]):
+                Disponibilidade.objects.create(barbeiro=request.user, dia=dia, hora_inicio=hora_inicio, hora_fim=hora_fim)
+            return redirect("agenda:gerenciar_disponibilidade")
+        if acao not in formularios:
+            return HttpResponse("Ação inválida.", status=400)
+
+        vazio = formularios[acao]
+        form = vazio.__class__(request.POST, prefix=vazio.prefix)
+        if form.is_valid():
+            dados = form.cleaned_data
+            if acao == "lote":
+                gravar_em_lote(request.user, dados["inicio"], dados["fim"], dados["dias_semana"], dados["janelas"])
+            elif acao == "remover_lote":
+                remover_em_lote(request.user, dados["inicio"], dados["fim"], dados["dias_semana"])
+            else:
+                registro = form.save(commit=False)
+                registro.barbeiro = request.user
+                registro.save()
+            return redirect("agenda:gerenciar_disponibilidade")
+        formularios[acao] = form
 
     disponibilidades = Disponibilidade.objects.filter(barbeiro=request.user).order_by("dia", "hora_inicio")
-    return render(request, "disponibilidade_barbeiro.html", {"disponibilidades": disponibilidades})
+    horarios_semanais = HorarioSemanal.objects.filter(barbeiro=request.user)
+    excecoes = ExcecaoHorario.objects.filter(barbeiro=request.user, dia__gte=localdate())
+    return render(request, "disponibilidade_barbeiro.html", {
+        "disponibilidades": disponibilidades,
+        "horarios_semanais": horarios_semanais,
+        "excecoes": excecoes,
+        "form_semanal": formularios["semanal"],
+        "form_excecao": formularios["excecao"],
+        "form_lote": formularios["lote"],
+        "form_remover_lote": formularios["remover_lote"],
+    })
 
 @login_required
 def remover_disponibilidade(request, id):
@@ -316,10 +389,24 @@ def remover_disponibilidade(request, id):
     disponibilidade.delete()
     return redirect("agenda:gerenciar_disponibilidade")
 
+@login_required
+def remover_horario_semanal(request, id):
+    if request.user.tipo != "barbeiro":
+        return redirect("agenda:home")
+    get_object_or_404(HorarioSemanal, id=id, barbeiro=request.user).delete()
+    return redirect("agenda:gerenciar_disponibilidade")
+
+@login_required
+def remover_excecao(request, id):
+    if request.user.tipo != "barbeiro":
+        return redirect("agenda:home")
+    get_object_or_404(ExcecaoHorario, id=id, barbeiro=request.user).delete()
+    return redirect("agenda:gerenciar_disponibilidade")
+
 # ------------------ CANCELAR AGENDAMENTO ------------------
 @login_required
 def cancelar_agendamento(request, id):
-    agendamento = get_object_or_404(Agendamento, id=id)
+    agendamento = get_object_or_404(Agendamento.objects.select_related("cliente", "barbeiro", "servico"), id=id)
     if request.user not in [agendamento.cliente, agendamento.barbeiro]:
         return HttpResponseForbidden("Você não tem permissão para cancelar este agendamento.")
 
@@ -334,50 +421,305 @@ def cancelar_agendamento(request, id):
     return render(request, "cancelar_agendamento.html", {"agendamento": agendamento})
 
 # ------------------ API: HORÁRIOS DISPONÍVEIS ------------------
+async def _aget_or_404(consulta, **filtros):
+    """get_object_or_404 com o ORM assíncrono."""
+    try:
+        return await consulta.aget(**filtros)
+    except consulta.model.DoesNotExist:
+        raise Http404(f"{consulta.model._meta.verbose_name} não encontrado.")
+
 @login_required
-def horarios_disponiveis(request):
+async def horarios_disponiveis(request):
+    """Assíncrona: sob ASGI o worker atende outras requisições enquanto espera o banco."""
     barbeiro_id = request.GET.get("barbeiro")
     dia_str = request.GET.get("dia")
     servico_id = request.GET.get("servico")
     if not barbeiro_id or not dia_str or not servico_id:
         return JsonResponse({"horarios": []})
 
-    barbeiro = get_object_or_404(Usuario, id=barbeiro_id)
-    servico = get_object_or_404(Servico, id=servico_id)
-    duracao = servico.duracao
+    barbeiro = await _aget_or_404(Usuario.objects.only("id"), id=barbeiro_id)
+    servico = await _aget_or_404(Servico.objects.only("id", "duracao"), id=servico_id)
     dia = datetime.strptime(dia_str, "%Y-%m-%d").date()
 
-    disponibilidades = Disponibilidade.objects.filter(barbeiro=barbeiro, dia=dia)
-    horarios_livres = []
-
-    for d in disponibilidades:
-        hora_atual = datetime.combine(d.dia, d.hora_inicio)
-        hora_fim = datetime.combine(d.dia, d.hora_fim) - duracao
-        while hora_atual <= hora_fim:
-            conflito = Agendamento.objects.filter(
-                barbeiro=barbeiro,
-                status="ativo",
-                data__lt=hora_atual + duracao,
-                data__gte=hora_atual,
-            ).exists()
-            if not conflito:
-                horarios_livres.append(hora_atual.strftime("%H:%M"))
-            hora_atual += timedelta(minutes=30)
-
-    return JsonResponse({"horarios": horarios_livres})
+    return JsonResponse({"horarios": await ahorarios_livres(barbeiro, dia, servico.duracao)})
+
+# ------------------ API: CALENDÁRIO DA BARBEARIA ------------------
+@login_required
+def calendario_disponivel(request):
+    """Horários livres de todos os barbeiros da barbearia em um intervalo de datas."""
+    barbearia_id = request.GET.get("barbearia")
+    if not barbearia_id:
+        return JsonResponse({"barbeiros": []})
+    return _calendario(request, get_object_or_404(Barbearia, id=barbearia_id))
+
+def _calendario(request, barbearia):
+    """Resposta do calendário (?inicio, ?fim, ?servico) da barbearia; compartilhada com a API v1."""
+    try:
+        inicio_str = request.GET.get("inicio")
+        fim_str = request.GET.get("fim")
+        inicio = datetime.strptime(inicio_str, "%Y-%m-%d").date() if inicio_str else now().date()
+        fim = datetime.strptime(fim_str, "%Y-%m-%d").date() if fim_str else inicio + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({"erro": "Datas devem estar no formato AAAA-MM-DD."}, status=400)
+    if fim < inicio or (fim - inicio).days >= CALENDARIO_MAX_DIAS:
+        return JsonResponse({"erro": f"Intervalo deve ter entre 1 e {CALENDARIO_MAX_DIAS} dias."}, status=400)
+
+    servico_id = request.GET.get("servico")
+    if servico_id:
+        duracao = get_object_or_404(Servico, id=servico_id, barbearia=barbearia).duracao
+    else:
+        duracao = intervalo_padrao()
+
+    barbeiros = list(
+        Usuario.objects.filter(barbearia=barbearia, tipo="barbeiro").values("id", "username", "first_name", "apelido")
+    )
+    livres = livres_por_barbeiro([b["id"] for b in barbeiros], inicio, fim, duracao)
+
+    dias = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+    return JsonResponse({
+        "barbearia": barbearia.id,
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "barbeiros": [
+            {
+                "id": b["id"],
+                "nome": b["apelido"] or b["first_name"] or b["username"],
+                "horarios": {
+                    dia.isoformat(): formatar_horarios(livres.get(b["id"], {}).get(dia, []))
+                    for dia in dias
+                },
+            }
+            for b in barbeiros
+        ],
+    })
+
+# ------------------ API PÚBLICA v1 (CATÁLOGO) ------------------
+def _limite(request):
+    try:
+        limite = int(request.GET.get("limit") or settings.AGENDA_ITENS_POR_PAGINA)
+    except ValueError:
+        limite = 0
+    if not 1 <= limite <= CATALOGO_MAX_ITENS:
+        raise ValueError(f"limit deve estar entre 1 e {CATALOGO_MAX_ITENS}.")
+    return limite
+
+def _resposta_catalogo(request, escopos, construir):
+    """
+    Conditional GET do catálogo: o ETag e o Last-Modified vêm das versões dos
+    escopos de cache (timestamp da última alteração, trocado pelos sinais), então
+    um 304 sai sem nenhuma consulta ao banco. Sem cache compartilhado cada worker
+    teria suas próprias versões e poderia confirmar dados velhos: não há validador.
+    """
+    resposta = etag = None
+    if settings.AGENDA_CACHE_COMPARTILHADO:
+        atuais = cache_agenda.versoes(escopos)
+        etag = '"{}"'.format("-".join(str(atuais[escopo]) for escopo in escopos))
+        modificado = max(atuais.values()) // 10**9
+        resposta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if resposta is None:
+        try:
+            resposta = JsonResponse(construir())
+        except ValueError as e:
+            return JsonResponse({"erro": str(e)}, status=400)
+    if etag:
+        resposta["ETag"] = etag
+        resposta["Last-Modified"] = http_date(modificado)
+    resposta["Cache-Control"] = f"public, max-age={settings.AGENDA_API_MAX_AGE}"
+    return resposta
+
+def _lista_catalogo(request, recurso, consulta, barbearia_id=None):
+    """Página (cursor por id) de `recurso` com os campos de ?fields=, serializada de values_list."""
+    nomes = catalogo.campos_pedidos(recurso, request.GET.get("fields"))
+    indice_id = nomes.index("id")
+    cursor = request.GET.get("cursor")
+    pagina = paginar_por_id(
+        catalogo.selecionar(consulta, recurso, nomes),
+        cursor=cursor,
+        tamanho=_limite(request),
+        chave=lambda linha: linha[indice_id],
+    )
+    # Lista vazia: só então confere se a barbearia existe
+    if barbearia_id and not pagina.itens and not cursor and not Barbearia.objects.filter(id=barbearia_id).exists():
+        raise Http404("Barbearia não encontrada.")
+    return {"resultados": catalogo.serializar(pagina.itens, recurso, nomes), "cursor": pagina.cursor}
+
+@require_GET
+def api_barbearias(request):
+    return _resposta_catalogo(
+        request, ["barbearias"], lambda: _lista_catalogo(request, "barbearias", Barbearia.objects.all())
+    )
+
+@require_GET
+def api_barbearias_proximas(request):
+    """Barbearias a até ?raio km de ?lat=&lon=, da mais próxima, com distancia_km."""
+    def construir():
+        perto = geo.coordenadas(request.GET)
+        if not perto:
+            raise ValueError("Informe lat e lon em graus decimais.")
+        nomes = catalogo.campos_pedidos("barbearias", request.GET.get("fields"))
+        ranking = geo.proximas(*perto, raio=geo.raio_km(request.GET), limite=_limite(request))
+        linhas = catalogo.selecionar(Barbearia.objects.filter(id__in=[id_ for id_, _ in ranking]), "barbearias", nomes)
+        por_id = {item["id"]: item for item in catalogo.serializar(linhas, "barbearias", nomes)}
+        return {"resultados": [
+            {**por_id[id_], "distancia_km": round(distancia, 2)} for id_, distancia in ranking if id_ in por_id
+        ]}
+
+    return _resposta_catalogo(request, ["barbearias"], construir)
+
+@require_GET
+def api_barbearia(request, barbearia_id):
+    def construir():
+        nomes = catalogo.campos_pedidos("barbearias", request.GET.get("fields"))
+        linhas = list(catalogo.selecionar(Barbearia.objects.filter(id=barbearia_id), "barbearias", nomes))
+        if not linhas:
+            raise Http404("Barbearia não encontrada.")
+        return catalogo.serializar(linhas, "barbearias", nomes)[0]
+
+    return _resposta_catalogo(request, [f"barbearia:{barbearia_id}"], construir)
+
+@require_GET
+def api_barbeiros(request, barbearia_id):
+    barbeiros = Usuario.objects.filter(barbearia_id=barbearia_id, tipo="barbeiro")
+    return _resposta_catalogo(
+        request, [f"barbearia:{barbearia_id}"], lambda: _lista_catalogo(request, "barbeiros", barbeiros, barbearia_id)
+    )
+
+@require_GET
+def api_servicos(request, barbearia_id):
+    def construir():
+        servicos = Servico.objects.filter(barbearia_id=barbearia_id)
+        if request.GET.get("barbeiro"):
+            try:
+                servicos = servicos.filter(barbeiro_id=int(request.GET["barbeiro"]))
+            except ValueError:
+                raise ValueError("barbeiro deve ser o id numérico de um barbeiro.") from None
+        return _lista_catalogo(request, "servicos", servicos, barbearia_id)
+
+    return _resposta_catalogo(request, [f"barbearia:{barbearia_id}"], construir)
+
+@require_GET
+def api_disponibilidade(request, barbearia_id):
+    """
+    Calendário público da barbearia. Depende também dos agendamentos, que não
+    versionam o cache, então o ETag é o hash do corpo: poupa banda, não o banco.
+    """
+    resposta = _calendario(request, get_object_or_404(Barbearia, id=barbearia_id))
+    if resposta.status_code != 200:
+        return resposta
+    set_response_etag(resposta)
+    resposta["Cache-Control"] = "public, no-cache"
+    return get_conditional_response(request, etag=resposta["ETag"], response=resposta)
+
+# ------------------ API: ESTATÍSTICAS DO CACHE ------------------
+@login_required
+def estatisticas_cache(request):
+    if request.user.tipo != "superadmin":
+        return HttpResponseForbidden("Apenas o super administrador pode ver as estatísticas do cache.")
+    return JsonResponse(cache_agenda.estatisticas())
 
 # ------------------ NOTIFICAÇÕES ------------------
 @login_required
-def lista_notificacoes(request):
-    notificacoes = Notificacao.objects.filter(usuario=request.user, lida=False)
-    data = [{"id": n.id, "mensagem": n.mensagem} for n in notificacoes]
-    return JsonResponse({"notificacoes": data})
+async def lista_notificacoes(request):
+    """
+    Notificações não lidas com id maior que ?since (cursor). Responde 304 via
+    ETag/Last-Modified quando nada mudou, com uma única consulta agregada.
+    """
+    try:
+        since = max(int(request.GET.get("since") or 0), 0)
+    except ValueError:
+        return JsonResponse({"erro": "Parâmetro since inválido."}, status=400)
+
+    usuario = await request.auser()
+    pendentes = Notificacao.objects.filter(usuario=usuario, lida=False, id__gt=since)
+    estado = await pendentes.aaggregate(ultimo=Max("id"), total=Count("id"), modificado=Max("criado_em"))
+    etag = f'"{since}-{estado["ultimo"] or 0}-{estado["total"]}"'
+    modificado = int(estado["modificado"].timestamp()) if estado["modificado"] else None
+
+    resposta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if resposta is None:
+        data = [
+            {"id": n.id, "mensagem": n.mensagem}
+            async for n in pendentes.order_by("id").only("id", "mensagem")
+        ]
+        resposta = JsonResponse({"notificacoes": data, "cursor": estado["ultimo"] or since})
+    resposta["ETag"] = etag
+    if modificado:
+        resposta["Last-Modified"] = http_date(modificado)
+    # O navegador guarda a resposta, mas sempre revalida (If-None-Match)
+    resposta["Cache-Control"] = "private, no-cache"
+    return resposta
+
+@login_required
+@require_POST
+async def marcar_notificacoes_lidas(request):
+    """Marca várias notificações como lidas com um único UPDATE (POST com ids=1,2,3 ou ate=<id>)."""
+    usuario = await request.auser()
+    notificacoes = Notificacao.objects.filter(usuario=usuario, lida=False)
+    try:
+        if request.POST.get("ate"):
+            notificacoes = notificacoes.filter(id__lte=int(request.POST["ate"]))
+        else:
+            ids = [int(i) for i in request.POST.get("ids", "").split(",") if i.strip()]
+            notificacoes = notificacoes.filter(id__in=ids)
+    except ValueError:
+        return JsonResponse({"erro": "Identificadores inválidos."}, status=400)
+    return JsonResponse({"status": "ok", "marcadas": await notificacoes.aupdate(lida=True)})
+
+def _evento_sse(mensagem):
+    return f"id: {mensagem['id']}\ndata: {json.dumps(mensagem)}\n\n"
+
+@login_required
+async def stream_notificacoes(request):
+    """
+    Server-sent events com as notificações não lidas e as novas, publicadas em
+    agenda.eventos. Sob WSGI devolve só as pendentes e pede nova conexão (retry).
+    """
+    usuario = await request.auser()
+    try:
+        ultimo_id = int(request.headers.get("Last-Event-ID") or 0)
+    except ValueError:
+        ultimo_id = 0  # cabeçalho do cliente: inválido, reenvia todas as pendentes
+
+    async def pendentes(enviados):
+        consulta = Notificacao.objects.filter(usuario_id=usuario.id, lida=False, id__gt=ultimo_id).order_by("id")
+        async for n in consulta:
+            enviados.add(n.id)
+            yield _evento_sse({"id": n.id, "mensagem": n.mensagem})
+
+    async def stream():
+        enviados = set()
+        yield "retry: 10000\n\n"
+        # Assina antes de ler as pendentes para não perder notificações criadas no meio
+        async with eventos.assinar(eventos.canal_notificacoes(usuario.id)) as fila:
+            async for evento in pendentes(enviados):
+                yield evento
+            loop = asyncio.get_running_loop()
+            limite = loop.time() + settings.AGENDA_SSE_DURACAO
+            while (restante := limite - loop.time()) > 0:
+                try:
+                    mensagem = await asyncio.wait_for(fila.get(), timeout=min(15, restante))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if mensagem["id"] not in enviados:
+                    enviados.add(mensagem["id"])
+                    yield _evento_sse(mensagem)
+
+    if isinstance(request, ASGIRequest):
+        resposta = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    else:
+        # WSGI: não segura o worker; o EventSource reconecta após o retry
+        conteudo = ["retry: 10000\n\n"] + [evento async for evento in pendentes(set())]
+        resposta = HttpResponse("".join(conteudo), content_type="text/event-stream")
+    resposta["Cache-Control"] = "no-cache"
+    resposta["X-Accel-Buffering"] = "no"
+    return resposta
 
 @login_required
-def marcar_notificacao_lida(request, id):
-    notif = get_object_or_404(Notificacao, id=id, usuario=request.user)
-    notif.lida = True
-    notif.save()
+async def marcar_notificacao_lida(request, id):
+    usuario = await request.auser()
+    if not await Notificacao.objects.filter(id=id, usuario=usuario).aupdate(lida=True):
+        raise Http404("Notificação não encontrada.")
     return JsonResponse({"status": "ok"})
 
 # ------------------ DASHBOARD ADMIN ------------------
@@ -390,13 +732,17 @@ def dashboard_admin(request):
     if not barbearia:
         return redirect("agenda:home")
 
-    agendamentos = Agendamento.objects.filter(barbearia=barbearia).order_by("data")
+    agendamentos = Agendamento.objects.da_barbearia(barbearia)
+    if "secao" in request.GET:
+        return _mais_agendamentos(request, agendamentos.com_relacoes(), "parciais/agendamentos_admin.html")
     barbeiros = Usuario.objects.filter(barbearia=barbearia, tipo="barbeiro")
     servicos = Servico.objects.filter(barbearia=barbearia)
     disponibilidades = Disponibilidade.objects.filter(barbeiro__in=barbeiros).order_by("dia", "hora_inicio")
 
-    clientes_ids = set(ag.cliente.id for ag in agendamentos)
-    total_clientes = len(clientes_ids)
+    total_clientes = agendamentos.aggregate(n=Count("cliente", distinct=True))["n"]
+    totais = ResumoDiario.objects.filter(barbearia=barbearia).aggregate(
+        ativos=Sum("agendamentos"), cancelados=Sum("cancelamentos")
+    )
 
     form_servico = ServicoForm()
 
@@ -422,12 +768,13 @@ def dashboard_admin(request):
         "dashboard_admin.html",
         {
             "barbearia": barbearia,
-            "agendamentos": agendamentos,
+            "secoes": primeiras_paginas(agendamentos.com_relacoes()),
             "barbeiros": barbeiros,
             "servicos": servicos,
             "disponibilidades": disponibilidades,
             "form_servico": form_servico,
-            "total_clientes": total_clientes
+            "total_clientes": total_clientes,
+            "total_agendamentos": (totais["ativos"] or 0) + (totais["cancelados"] or 0),
         },
     )
 
@@ -478,25 +825,38 @@ def dashboard_superadmin(request):
     barbeiros = Usuario.objects.filter(tipo="barbeiro")
 
     filtro = request.GET.get("filtro", "total")
-    hoje = now().date()
+    hoje = localdate()
+    resumos = ResumoDiario.objects.all()
     if filtro == "dia":
         agendamentos = agendamentos.filter(data__date=hoje)
+        resumos = resumos.filter(dia=hoje)
     elif filtro == "mes":
         agendamentos = agendamentos.filter(data__month=hoje.month, data__year=hoje.year)
+        resumos = resumos.filter(dia__month=hoje.month, dia__year=hoje.year)
 
-    faturamento_barbearias = []
-    for b in barbearias:
-        total = agendamentos.filter(barbearia=b).aggregate(total=Sum("servico__preco"))["total"] or 0
-        faturamento_barbearias.append({"barbearia": b, "total": total})
-    top5 = sorted(faturamento_barbearias, key=lambda x: x["total"], reverse=True)[:5]
+    # Faturamento vem do ResumoDiario; clientes distintos não se somam entre dias,
+    # então são contados nos agendamentos com uma consulta agrupada
+    faturamento_por_barbearia = dict(
+        resumos.order_by().values("barbearia").annotate(total=Sum("faturamento")).values_list("barbearia", "total")
+    )
+    clientes_por_barbearia = dict(
+        agendamentos.ativos().order_by().values("barbearia")
+        .annotate(clientes=Count("cliente", distinct=True)).values_list("barbearia", "clientes")
+    )
+    totais = resumos.aggregate(
+        ativos=Sum("agendamentos"), cancelados=Sum("cancelamentos"), faturamento=Sum("faturamento")
+    )
+    total_clientes = agendamentos.ativos().aggregate(n=Count("cliente", distinct=True))["n"]
 
+    faturamento_barbearias = []
     grafico_faturamento = []
     grafico_clientes = []
     for b in barbearias:
-        total = agendamentos.filter(barbearia=b).aggregate(total=Sum("servico__preco"))["total"] or 0
-        qtd_clientes = agendamentos.filter(barbearia=b).values("cliente").distinct().count()
+        total = faturamento_por_barbearia.get(b.id) or 0
+        faturamento_barbearias.append({"barbearia": b, "total": total})
         grafico_faturamento.append({"barbearia": b.nome, "total": total})
-        grafico_clientes.append({"barbearia": b.nome, "clientes": qtd_clientes})
+        grafico_clientes.append({"barbearia": b.nome, "clientes": clientes_por_barbearia.get(b.id, 0)})
+    top5 = sorted(faturamento_barbearias, key=lambda x: x["total"], reverse=True)[:5]
 
     return render(
         request,
@@ -509,6 +869,15 @@ def dashboard_superadmin(request):
             "top5": top5,
             "grafico_faturamento": grafico_faturamento,
             "grafico_clientes": grafico_clientes,
+            # Nomes vêm dos usuários: o template os serializa com json_script, que escapa <, > e &
+            "faturamento_labels": [g["barbearia"] for g in grafico_faturamento],
+            "faturamento_values": [float(g["total"]) for g in grafico_faturamento],
+            "clientes_labels": [g["barbearia"] for g in grafico_clientes],
+            "clientes_values": [g["clientes"] for g in grafico_clientes],
+            "total_agendamentos": (totais["ativos"] or 0) + (totais["cancelados"] or 0),
+            "total_clientes": total_clientes,
+            "total_barbeiros": barbeiros.count(),
+            "total_faturamento": totais["faturamento"] or 0,
             "filtro": filtro
         },
     )
@@ -0,0 +1,9 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barbearia.settings')
+
+# Sob ASGI (Procfile: gunicorn com workers do uvicorn) as views assíncronas — stream
+# de notificações via SSE e as APIs JSON de horários e notificações — esperam o banco
+# sem ocupar um worker; sob WSGI o stream degrada para respostas curtas com "retry".
+application = get_asgi_application()
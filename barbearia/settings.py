@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # servir estáticos no Render
+    'agenda.midia.MidiaMiddleware',  # uploads com cache imutável, ETag, 304 e Range
+    'agenda.instrumentacao.InstrumentacaoMiddleware',  # consultas/latência por requisição (amostrado)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,9 +81,10 @@ TEMPLATES = [
 ]
 
 # -----------------------
-# WSGI
+# WSGI / ASGI
 # -----------------------
 WSGI_APPLICATION = 'barbearia.wsgi.application'
+ASGI_APPLICATION = 'barbearia.asgi.application'
 
 # -----------------------
 # Banco de dados
@@ -89,11 +92,68 @@ WSGI_APPLICATION = 'barbearia.wsgi.application'
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",  # fallback local
-        conn_max_age=600,
+        # Sob ASGI cada requisição usa uma thread própria para o ORM e conexões persistentes
+        # se acumulariam; o padrão é 0 (Procfile sobe uvicorn). Sob WSGI pode-se usar 600.
+        conn_max_age=int(os.getenv("DB_CONN_MAX_AGE", "0")),
         ssl_require=True  # obrigatório no Render com Postgres
     )
 }
 
+# SQLite (fallback local): sem sslmode e com BEGIN IMMEDIATE, para que as transações
+# de agendamento peguem o lock de escrita antes de verificar conflitos
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE"}
+
+# -----------------------
+# Cache
+# -----------------------
+# CACHE_BACKEND: "file" (padrão: disco local, compartilhado pelos workers da máquina), "redis" (Redis ou
+# compatível, via CACHE_LOCATION; necessário com mais de uma instância) ou "locmem" (um cache por processo)
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "agendabarbearia"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / ".cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+_cache_nome = os.getenv("CACHE_BACKEND", "file")
+_cache_backend, _cache_location = CACHE_BACKENDS[_cache_nome]
+CACHES = {
+    "default": {
+        "BACKEND": _cache_backend,
+        "LOCATION": os.getenv("CACHE_LOCATION", _cache_location),
+    }
+}
+AGENDA_CACHE_SEGUNDOS = int(os.getenv("AGENDA_CACHE_SEGUNDOS", "600"))  # validade das páginas públicas em cache
+# As versões que invalidam o cache moram nele: com locmem, cada worker teria as suas e continuaria
+# servindo páginas velhas depois de uma alteração feita em outro. Sem cache compartilhado, as páginas
+# públicas são montadas a cada requisição e a sessão e o request.user vêm do banco
+AGENDA_CACHE_COMPARTILHADO = _cache_nome != "locmem"
+
+# -----------------------
+# Sessões e usuário autenticado
+# -----------------------
+# cached_db: sessão lida do cache e gravada também no banco. Só quando o cache é compartilhado
+# entre os workers (file/redis): com locmem, um logout não apagaria a sessão do cache dos outros
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if AGENDA_CACHE_COMPARTILHADO else "django.contrib.sessions.backends.db",
+)
+# request.user montado de uma projeção em cache (id, tipo, barbearia...), invalidada ao salvar o usuário.
+# Pelo mesmo motivo, só com cache compartilhado: com locmem, uma troca de senha, desativação ou mudança
+# de tipo só valeria no worker que salvou o usuário. Trocar de backend encerra as sessões abertas.
+AUTHENTICATION_BACKENDS = [
+    "agenda.autenticacao.UsuarioEmCacheBackend" if AGENDA_CACHE_COMPARTILHADO
+    else "django.contrib.auth.backends.ModelBackend"
+]
+AGENDA_USUARIO_CACHE_SEGUNDOS = int(os.getenv("AGENDA_USUARIO_CACHE_SEGUNDOS", "300"))
+
+# -----------------------
+# Eventos (notificações em tempo real)
+# -----------------------
+# Pub/sub das notificações: MemoriaBackend (um processo) ou RedisBackend (vários workers)
+AGENDA_EVENTOS_BACKEND = os.getenv("AGENDA_EVENTOS_BACKEND", "agenda.eventos.MemoriaBackend")
+AGENDA_EVENTOS_URL = os.getenv("AGENDA_EVENTOS_URL", "redis://127.0.0.1:6379/2")
+AGENDA_SSE_DURACAO = int(os.getenv("AGENDA_SSE_DURACAO", "55"))  # segundos até o cliente reconectar
+
 # -----------------------
 # Validação de senhas
 # -----------------------
@@ -125,6 +185,13 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # -----------------------
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads são gravados com o hash do conteúdo no nome (agenda/armazenamento.py) e servidos
+# como imutáveis por agenda.midia.MidiaMiddleware; arquivos antigos, sem hash, usam este max-age
+AGENDA_MIDIA_MAX_AGE = int(os.getenv("AGENDA_MIDIA_MAX_AGE", "3600"))
+# Miniaturas geradas no upload de logos e fotos (ver agenda/imagens.py)
+AGENDA_IMAGEM_LARGURAS = (160, 320, 640)  # larguras das variantes, em px
+AGENDA_IMAGEM_MAX_PX = 1600  # maior lado do original depois de limpo
+AGENDA_IMAGEM_QUALIDADE = 80  # JPEG e WebP
 
 # -----------------------
 # Tipo padrão para campos AutoField
@@ -143,11 +210,53 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/agenda/'
 LOGOUT_REDIRECT_URL = '/'
 
+# -----------------------
+# Agenda
+# -----------------------
+AGENDA_INTERVALO_MINUTOS = int(os.getenv("AGENDA_INTERVALO_MINUTOS", "30"))  # granularidade dos horários ofertados
+AGENDA_HORIZONTE_DIAS = int(os.getenv("AGENDA_HORIZONTE_DIAS", "30"))  # até quantos dias à frente se pode agendar
+AGENDA_ITENS_POR_PAGINA = int(os.getenv("AGENDA_ITENS_POR_PAGINA", "20"))  # agendamentos por página nas listas
+AGENDA_BARBEARIAS_POR_PAGINA = int(os.getenv("AGENDA_BARBEARIAS_POR_PAGINA", "12"))  # cards por página na home
+AGENDA_BUSCA_MAX_RESULTADOS = int(os.getenv("AGENDA_BUSCA_MAX_RESULTADOS", "120"))  # resultados navegáveis de uma busca
+AGENDA_PROXIMIDADE_RAIO_KM = float(os.getenv("AGENDA_PROXIMIDADE_RAIO_KM", "10"))  # raio padrão do "perto de mim"
+# Maior ?raio aceito: o custo cresce com a faixa de latitude lida do índice (benchmark_proximidade)
+AGENDA_PROXIMIDADE_RAIO_MAX_KM = 25
+AGENDA_API_MAX_AGE = int(os.getenv("AGENDA_API_MAX_AGE", "60"))  # segundos de cache das respostas do catálogo (API v1)
+
 # -----------------------
 # Email (apenas console no dev)
 # -----------------------
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# -----------------------
+# Instrumentação (consultas e latência por requisição)
+# -----------------------
+# Fração das requisições medidas (0 desliga); os testes medem todas (CONFIGURACAO_TESTES)
+AGENDA_INSTRUMENTACAO_AMOSTRA = float(os.getenv("AGENDA_INSTRUMENTACAO_AMOSTRA", "0.05"))
+# Máximo de consultas por view, contando BEGIN e savepoints; excedido gera warning
+AGENDA_ORCAMENTO_CONSULTAS = {
+    "agenda:home": 2,
+    "agenda:barbearia_detail": 5,
+    # POST de agendamento: sessão e usuário (2), barbeiro e serviço (2), BEGIN, trava do barbeiro,
+    # janelas (3), conflito, INSERT, agregado e upsert do resumo (2) = 13; dentro de outra
+    # transação (testes), o BEGIN vira SAVEPOINT e RELEASE: 14
+    "agenda:agenda_cliente": 14,
+    "agenda:dashboard_barbeiro": 10,
+    "agenda:dashboard_admin": 10,
+    "agenda:dashboard_super_admin": 10,
+    "agenda:horarios_disponiveis": 8,
+    "agenda:calendario_disponivel": 10,
+    "agenda:lista_notificacoes": 4,
+    "agenda:api_barbearias": 1,
+    "agenda:api_barbearias_proximas": 2,
+    "agenda:api_barbearia": 1,
+    "agenda:api_barbeiros": 2,
+    "agenda:api_servicos": 2,
+    "agenda:api_disponibilidade": 8,
+}
+# Com AGENDA_ORCAMENTO_ESTRITO=True, orçamento excedido vira exceção (ligado nos testes)
+AGENDA_ORCAMENTO_ESTRITO = os.getenv("AGENDA_ORCAMENTO_ESTRITO", "False") == "True"
+
 # -----------------------
 # Logging básico
 # -----------------------
@@ -163,4 +272,12 @@ LOGGING = {
         'handlers': ['console'],
         'level': 'INFO',
     },
+    'loggers': {
+        # Uma linha JSON por requisição amostrada (AGENDA_INSTRUMENTACAO_LOG=WARNING: só os orçamentos excedidos)
+        'agenda.instrumentacao': {
+            'handlers': ['console'],
+            'level': os.getenv("AGENDA_INSTRUMENTACAO_LOG", "INFO"),
+            'propagate': False,
+        },
+    },
 }
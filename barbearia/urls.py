@@ -16,7 +16,7 @@ urlpatterns = [
     path("", lambda request: redirect("agenda/")),
 ]
 
-# Servir arquivos de mídia e estáticos (somente durante desenvolvimento)
+# Servir arquivos estáticos (somente durante desenvolvimento); a mídia é servida
+# pelo agenda.midia.MidiaMiddleware em qualquer ambiente
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)